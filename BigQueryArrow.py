@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import importlib.util
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas
+
+
+def arrow_to_pandas(table, arrow_dtypes: bool = True) -> pandas.DataFrame:
+    """Converte um pyarrow.Table para DataFrame evitando cópias quando possível.
+
+    Com ``arrow_dtypes`` (pandas >= 2.0) as colunas do DataFrame usam
+    pd.ArrowDtype e apontam para os mesmos buffers do Arrow (sem cópia).
+    Caso contrário usa ``split_blocks``, que evita consolidar colunas num bloco
+    único e copia apenas o necessário para tipos NumPy.
+    """
+    import pandas as pd
+
+    if arrow_dtypes and hasattr(pd, "ArrowDtype"):
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    return table.to_pandas(split_blocks=True)
+
+
+def arrow_column_to_numpy(table, column: str):
+    """Retorna a coluna como array NumPy sem cópia quando o tipo permite (numérico, sem nulos)"""
+    chunked = table.column(column)
+    if chunked.num_chunks == 1:
+        try:
+            return chunked.chunk(0).to_numpy(zero_copy_only=True)
+        except Exception:
+            pass
+    return chunked.to_numpy()
+
+
+def storage_client_available() -> bool:
+    """True se o pacote google-cloud-bigquery-storage (Storage Read API) estiver instalado"""
+    try:
+        return importlib.util.find_spec("google.cloud.bigquery_storage") is not None
+    except ImportError:
+        return False
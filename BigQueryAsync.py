@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from BigQueryClasse import BigQuery
+from BigQueryCost import BudgetExceeded
+from BigQuerySql import referenced_tables
+
+if TYPE_CHECKING:
+    import pandas
+    from google.cloud import bigquery
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBigQuery:
+    """Fachada asyncio sobre a classe BigQuery.
+
+    As chamadas bloqueantes do cliente rodam num pool de threads próprio e no
+    máximo ``max_concurrency`` operações ficam em andamento ao mesmo tempo.
+    Consultas são acompanhadas por polling (``poll_interval``); se a task for
+    cancelada, o job correspondente também é cancelado no BigQuery.
+    """
+
+    def __init__(self, bigquery_client: BigQuery, max_concurrency: int = 8, poll_interval: float = 0.5):
+        if max_concurrency <= 0 or poll_interval <= 0:
+            raise ValueError("max_concurrency and poll_interval must be positive")
+
+        self.__bigquery = bigquery_client
+        self.max_concurrency = max_concurrency
+        self.poll_interval = poll_interval
+        self.__executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="AsyncBigQuery")
+        # Um semáforo por event loop: a mesma instância pode ser usada em vários asyncio.run
+        self.__semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    async def __aenter__(self) -> "AsyncBigQuery":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.__executor.shutdown(wait=False)
+
+    def get_bigquery(self) -> BigQuery:
+        return self.__bigquery
+
+    def __get_semaphore(self) -> asyncio.Semaphore:
+        # Criado sob demanda para ficar associado ao event loop em execução
+        loop = asyncio.get_running_loop()
+        semaphore = self.__semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self.__semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def __run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, functools.partial(func, *args, **kwargs))
+
+    async def __call(self, func, *args, **kwargs):
+        async with self.__get_semaphore():
+            return await self.__run(func, *args, **kwargs)
+
+    async def make_query(self, query: str, query_parameters: list = None, use_cache: bool = True,
+                         ttl: float = None) -> pandas.DataFrame:
+        bigquery_client = self.__bigquery
+        with bigquery_client.get_metrics().measure("make_query", ",".join(sorted(referenced_tables(query)))) as event:
+            if use_cache:
+                # O cache pode ler Parquet do disco: fora do event loop, como o resto
+                cached = await self.__run(bigquery_client.get_cached_result, query, query_parameters)
+                if cached is not None:
+                    event.cache_hit = True
+                    event.rows = len(cached)
+                    return cached
+
+            async with self.__get_semaphore():
+                job = await self.__submit(query, query_parameters)
+                try:
+                    while not await self.__run(job.done):
+                        await asyncio.sleep(self.poll_interval)
+                    frame = await self.__run(bigquery_client.finish_query, job, query, query_parameters,
+                                             use_cache=use_cache, ttl=ttl)
+                except asyncio.CancelledError:
+                    await self.__cancel_job(job)
+                    raise
+                except Exception as e:
+                    raise RuntimeError("Error executing BigQuery query") from e
+                event.record_job(job)
+                event.rows = len(frame)
+                return frame
+
+    async def __submit(self, query: str, query_parameters: list) -> bigquery.QueryJob:
+        submitted = self.__executor.submit(self.__bigquery.submit_query, query, query_parameters)
+        try:
+            return await asyncio.wrap_future(submitted)
+        except asyncio.CancelledError:
+            # A thread continua criando o job; ele é cancelado assim que existir
+            submitted.add_done_callback(_cancel_submitted)
+            raise
+        except BudgetExceeded:
+            raise
+        except Exception as e:
+            raise RuntimeError("Error executing BigQuery query") from e
+
+    async def __cancel_job(self, job) -> None:
+        try:
+            await self.__run(job.cancel)
+            logger.warning(f"⚠️ BigQuery: Job {getattr(job, 'job_id', '?')} cancelado")
+        except Exception as e:
+            logger.error(f"❌ BigQuery: Erro ao cancelar job {getattr(job, 'job_id', '?')}: {e}")
+
+    async def gather_queries(self, queries: list, return_exceptions: bool = False) -> list:
+        """Executa várias consultas em paralelo (limitado por max_concurrency).
+
+        ``queries`` aceita strings SQL ou tuplas (sql, query_parameters); os
+        resultados voltam na mesma ordem.
+        """
+        tasks = []
+        for query in queries:
+            if isinstance(query, str):
+                tasks.append(self.make_query(query))
+            else:
+                tasks.append(self.make_query(*query))
+        return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+
+    async def get_table(self, dataset_id: str, table_id: str, use_cache: bool = True) -> bigquery.Table:
+        return await self.__call(self.__bigquery.get_table, dataset_id, table_id, use_cache=use_cache)
+
+    async def get_dataset(self, dataset_id: str, use_cache: bool = True) -> bigquery.Dataset:
+        return await self.__call(self.__bigquery.get_dataset, dataset_id, use_cache=use_cache)
+
+    async def set_data(self, table, data: list, row_key=None) -> list:
+        return await self.__call(self.__bigquery.set_data, table, data, row_key)
+
+    async def saveLoginLogsInBigQuery(self, logs: list) -> None:
+        return await self.__call(self.__bigquery.saveLoginLogsInBigQuery, logs)
+
+    async def saveFrequencyLogsInBigQuery(self, logs: list) -> None:
+        return await self.__call(self.__bigquery.saveFrequencyLogsInBigQuery, logs)
+
+    async def saveUsersInBigQuery(self, users: list) -> None:
+        return await self.__call(self.__bigquery.saveUsersInBigQuery, users)
+
+
+def _cancel_submitted(submitted) -> None:
+    """Cancela o job de um submit_query cuja task foi cancelada enquanto ele ainda rodava"""
+    if submitted.cancelled() or submitted.exception() is not None:
+        return
+    job = submitted.result()
+    try:
+        job.cancel()
+        logger.warning(f"⚠️ BigQuery: Job {getattr(job, 'job_id', '?')} cancelado")
+    except Exception as e:
+        logger.error(f"❌ BigQuery: Erro ao cancelar job {getattr(job, 'job_id', '?')}: {e}")
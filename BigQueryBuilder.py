@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import datetime
+import decimal
+import hashlib
+import re
+from typing import TYPE_CHECKING
+
+from BigQuerySql import normalize_sql
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery
+
+_OPERATORS = ("=", "!=", "<>", "<", "<=", ">", ">=", "LIKE", "NOT LIKE")
+# Nomes dos parâmetros do período de where_window (usados por BigQueryCost.estimate_pruning)
+WINDOW_START = "window_start"
+WINDOW_END = "window_end"
+
+
+def infer_type(value) -> str:
+    """Tipo GoogleSQL de um valor Python (bool antes de int, datetime com fuso = TIMESTAMP)"""
+    if isinstance(value, bool):
+        return "BOOL"
+    if isinstance(value, int):
+        return "INT64"
+    if isinstance(value, float):
+        return "FLOAT64"
+    if isinstance(value, decimal.Decimal):
+        return "NUMERIC"
+    if isinstance(value, datetime.datetime):
+        return "TIMESTAMP" if value.tzinfo is not None else "DATETIME"
+    if isinstance(value, datetime.date):
+        return "DATE"
+    if isinstance(value, bytes):
+        return "BYTES"
+    return "STRING"
+
+
+def _as_datetime(value) -> datetime.datetime:
+    """date, datetime ou texto ISO ('2025-07-01', '2025-07-01T12:00:00Z') como datetime em UTC"""
+    if isinstance(value, str):
+        text = value.strip().replace("Z", "+00:00")
+        value = datetime.date.fromisoformat(text) if len(text) == 10 else datetime.datetime.fromisoformat(text)
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc)
+
+
+def _is_date(value) -> bool:
+    if isinstance(value, str):
+        return len(value.strip()) == 10
+    return isinstance(value, datetime.date) and not isinstance(value, datetime.datetime)
+
+
+def time_window(start, end=None) -> tuple:
+    """Período [início, fim) em UTC.
+
+    Datas (sem hora) valem o dia inteiro: ``end`` em data é inclusivo e, sem
+    ``end``, o período é o dia de ``start``. Com hora, ``end`` é exclusivo.
+    """
+    low = _as_datetime(start)
+    if end is None:
+        if not _is_date(start):
+            raise ValueError("end is required when start has a time of day")
+        return low, low + datetime.timedelta(days=1)
+    high = _as_datetime(end) + (datetime.timedelta(days=1) if _is_date(end) else datetime.timedelta(0))
+    if high <= low:
+        raise ValueError(f"empty time window: {start} .. {end}")
+    return low, high
+
+
+def parameter(name: str, value, type_: str = None):
+    """Cria um ScalarQueryParameter, ou ArrayQueryParameter para listas/tuplas/sets"""
+    from google.cloud import bigquery
+
+    if isinstance(value, (list, tuple, set, frozenset)):
+        values = list(value)
+        if type_ is None:
+            type_ = infer_type(values[0]) if values else "STRING"
+        return bigquery.ArrayQueryParameter(name, type_, values)
+    return bigquery.ScalarQueryParameter(name, type_ or infer_type(value), value)
+
+
+class Query:
+    """SQL com parâmetros nomeados (@nome); o texto não depende dos valores"""
+
+    def __init__(self, sql: str, parameters: list = None):
+        self.sql = sql
+        self.parameters = list(parameters or [])
+
+    def job_config(self, **kwargs) -> bigquery.QueryJobConfig:
+        from google.cloud import bigquery
+
+        return bigquery.QueryJobConfig(query_parameters=self.parameters, **kwargs)
+
+    @property
+    def template_key(self) -> str:
+        """Identifica o texto da consulta, independente dos valores dos parâmetros"""
+        return hashlib.sha256(normalize_sql(self.sql).encode("utf-8")).hexdigest()
+
+    @property
+    def cache_key(self) -> str:
+        """Chave de cache: texto normalizado + valores dos parâmetros"""
+        from BigQueryCache import QueryResultCache
+        return QueryResultCache.make_key(self.sql, self.parameters)
+
+    def __iter__(self):
+        # Permite bigquery.make_query(*query)
+        return iter((self.sql, self.parameters))
+
+    def __repr__(self) -> str:
+        values = {p.name: getattr(p, "value", getattr(p, "values", None)) for p in self.parameters}
+        return f"Query({self.sql!r}, {values!r})"
+
+
+class QueryBuilder:
+    """Monta SELECT/UPDATE/DELETE parametrizados.
+
+    Os nomes dos parâmetros vêm das colunas (``DATE(created_at)`` vira
+    ``@date_created_at``), então a mesma consulta lógica sempre gera o mesmo
+    texto e só os valores dos parâmetros mudam.
+    """
+
+    def __init__(self, statement: str, table: str, columns: list = None):
+        self.__statement = statement
+        self.__table = table
+        self.__columns = columns or ["*"]
+        self.__joins: list = []
+        self.__assignments: list = []
+        self.__conditions: list = []
+        self.__order_by: list = []
+        self.__limit: int = None
+        self.__parameters: dict = {}
+
+    @classmethod
+    def select(cls, table: str, columns: list = None) -> "QueryBuilder":
+        return cls("SELECT", table, columns)
+
+    @classmethod
+    def delete(cls, table: str) -> "QueryBuilder":
+        return cls("DELETE", table)
+
+    @classmethod
+    def update(cls, table: str) -> "QueryBuilder":
+        return cls("UPDATE", table)
+
+    def param(self, name: str, value, type_: str = None) -> str:
+        """Registra um parâmetro e retorna o marcador (@nome) com nome único"""
+        base = re.sub(r"\W+", "_", name).strip("_").lower() or "p"
+        unique, suffix = base, 2
+        while unique in self.__parameters:
+            unique = f"{base}_{suffix}"
+            suffix += 1
+        self.__parameters[unique] = parameter(unique, value, type_)
+        return f"@{unique}"
+
+    def unnest(self, column: str, alias: str) -> "QueryBuilder":
+        self.__joins.append(f"UNNEST({column}) AS {alias}")
+        return self
+
+    def set(self, column: str, value, type_: str = None) -> "QueryBuilder":
+        self.__assignments.append(f"{column} = {self.param(column, value, type_)}")
+        return self
+
+    def where(self, column: str, operator: str, value, type_: str = None, name: str = None) -> "QueryBuilder":
+        if operator.upper() not in _OPERATORS:
+            raise ValueError(f"unsupported operator: {operator}")
+        self.__conditions.append(f"{column} {operator.upper()} {self.param(name or column, value, type_)}")
+        return self
+
+    def where_eq(self, column: str, value, type_: str = None) -> "QueryBuilder":
+        return self.where(column, "=", value, type_)
+
+    def where_in(self, column: str, values, type_: str = None) -> "QueryBuilder":
+        self.__conditions.append(f"{column} IN UNNEST({self.param(column + '_list', list(values), type_)})")
+        return self
+
+    def where_between(self, column: str, start, end, type_: str = None) -> "QueryBuilder":
+        low = self.param(column + "_start", start, type_)
+        high = self.param(column + "_end", end, type_)
+        self.__conditions.append(f"{column} BETWEEN {low} AND {high}")
+        return self
+
+    def where_window(self, column: str, start, end=None, type_: str = "TIMESTAMP") -> "QueryBuilder":
+        """Período [início, fim) comparando a coluna direto com os parâmetros: ``coluna >= @window_start
+        AND coluna < @window_end``, forma que o BigQuery usa para ler só as partições do período.
+        
+        Sem função em volta da coluna e sem BETWEEN em texto; veja time_window para
+        o significado de ``start``/``end``. Para tabelas particionadas por ingestão
+        use ``_PARTITIONTIME`` como coluna; ``type_="DATE"`` para colunas DATE.
+        """
+        low, high = time_window(start, end)
+        if type_ == "DATE":
+            low, high = low.date(), high.date() + datetime.timedelta(days=1 if high.time() != datetime.time(0) else 0)
+        self.__conditions.append(f"{column} >= {self.param(WINDOW_START, low, type_)} "
+                                 f"AND {column} < {self.param(WINDOW_END, high, type_)}")
+        return self
+
+    def where_exists(self, array_column: str, alias: str, column: str, operator: str, value,
+                     type_: str = None) -> "QueryBuilder":
+        """EXISTS(SELECT 1 FROM UNNEST(array) AS alias WHERE alias.coluna <op> @valor)"""
+        if operator.upper() not in _OPERATORS:
+            raise ValueError(f"unsupported operator: {operator}")
+        marker = self.param(f"{alias}.{column}", value, type_)
+        self.__conditions.append(
+            f"EXISTS(SELECT 1 FROM UNNEST({array_column}) AS {alias} "
+            f"WHERE {alias}.{column} {operator.upper()} {marker})")
+        return self
+
+    def where_raw(self, condition: str, **parameters) -> "QueryBuilder":
+        """Condição livre; os valores em ``parameters`` viram @nome (o nome precisa ser único)"""
+        for name, value in parameters.items():
+            if name in self.__parameters:
+                raise ValueError(f"parameter already defined: {name}")
+            self.__parameters[name] = parameter(name, value)
+        self.__conditions.append(f"({condition})")
+        return self
+
+    def order_by(self, *columns: str) -> "QueryBuilder":
+        self.__order_by.extend(columns)
+        return self
+
+    def limit(self, limit: int) -> "QueryBuilder":
+        self.__limit = int(limit)
+        return self
+
+    def build(self) -> Query:
+        table = f"`{self.__table.strip('`')}`"
+        if self.__statement == "SELECT":
+            sources = ", ".join([table] + self.__joins)
+            sql = f"SELECT {', '.join(self.__columns)} FROM {sources}"
+        elif self.__statement == "DELETE":
+            sql = f"DELETE FROM {table}"
+        else:
+            if not self.__assignments:
+                raise ValueError("UPDATE requires at least one set()")
+            sql = f"UPDATE {table} SET {', '.join(self.__assignments)}"
+
+        if self.__conditions:
+            sql += " WHERE " + " AND ".join(self.__conditions)
+        elif self.__statement != "SELECT":
+            # DELETE/UPDATE no BigQuery exigem WHERE; "WHERE TRUE" precisa ser explícito
+            raise ValueError(f"{self.__statement} requires at least one condition")
+        if self.__order_by:
+            sql += " ORDER BY " + ", ".join(self.__order_by)
+        if self.__limit is not None:
+            sql += f" LIMIT {self.__limit}"
+        return Query(sql, list(self.__parameters.values()))
@@ -0,0 +1,295 @@
+import glob
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from BigQuerySql import normalize_sql, referenced_tables, same_table, table_name
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataCache:
+    """Cache LRU com TTL para metadados (tabelas e datasets), chave (dataset, tabela)"""
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 256):
+        if ttl < 0 or max_entries <= 0:
+            raise ValueError("ttl must be >= 0 and max_entries must be positive")
+
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__entries: OrderedDict = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, dataset_id: str, table_id: str = None):
+        key = (dataset_id, table_id)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if time.monotonic() < expires_at:
+                    self.__entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.__entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, dataset_id: str, table_id: str, value) -> None:
+        key = (dataset_id, table_id)
+        with self.__lock:
+            self.__entries[key] = (value, time.monotonic() + self.ttl)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, dataset_id: str, table_id: str, loader):
+        """Retorna o valor em cache ou chama ``loader()`` e guarda o resultado"""
+        value = self.get(dataset_id, table_id)
+        if value is None:
+            value = loader()
+            self.put(dataset_id, table_id, value)
+        return value
+
+    def invalidate(self, dataset_id: str = None, table_id: str = None) -> int:
+        """Remove uma tabela, um dataset inteiro (table_id=None) ou tudo (sem argumentos)"""
+        with self.__lock:
+            if dataset_id is None:
+                removed = len(self.__entries)
+                self.__entries.clear()
+                return removed
+            if table_id is not None:
+                return 1 if self.__entries.pop((dataset_id, table_id), None) is not None else 0
+            keys = [key for key in self.__entries if key[0] == dataset_id]
+            for key in keys:
+                del self.__entries[key]
+            return len(keys)
+
+    def stats(self) -> dict:
+        with self.__lock:
+            return {
+                "entries": len(self.__entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class QueryResultCache:
+    """Cache de resultados de consultas (DataFrames), chave = SQL normalizado + parâmetros.
+
+    A camada em memória é um LRU limitado em bytes. Com ``disk_dir`` os
+    resultados também são gravados em disco (Parquet ou Arrow IPC, requer
+    pyarrow) e sobrevivem a reinícios. ``ttl_rules`` é uma lista de
+    (regex, ttl em segundos) avaliada sobre o SQL normalizado; a primeira
+    regra que casar vence, senão vale ``default_ttl``. TTL 0 desliga o cache
+    para aquela consulta.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, default_ttl: float = 300.0, ttl_rules: list = None,
+                 disk_dir: str = None, disk_format: str = "parquet"):
+        if max_bytes <= 0 or default_ttl < 0:
+            raise ValueError("max_bytes must be positive and default_ttl must be >= 0")
+        if disk_format not in ("parquet", "arrow"):
+            raise ValueError("disk_format must be 'parquet' or 'arrow'")
+
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttl_rules = [(re.compile(pattern, re.IGNORECASE), ttl) for pattern, ttl in (ttl_rules or [])]
+        self.disk_dir = disk_dir
+        self.disk_format = disk_format
+        if disk_dir is not None:
+            if importlib.util.find_spec("pyarrow") is None:
+                raise ImportError("pyarrow is required for the on-disk query cache (pip install pyarrow)")
+            os.makedirs(disk_dir, exist_ok=True)
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.__entries: OrderedDict = OrderedDict()
+        self.__bytes = 0
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def make_key(sql: str, parameters: list = None) -> str:
+        params = [p.to_api_repr() if hasattr(p, "to_api_repr") else repr(p) for p in (parameters or [])]
+        payload = json.dumps([normalize_sql(sql), params], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def ttl_for(self, sql: str) -> float:
+        normalized = normalize_sql(sql)
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(normalized):
+                return ttl
+        return self.default_ttl
+
+    def get(self, sql: str, parameters: list = None):
+        """Retorna uma cópia do DataFrame em cache ou None"""
+        key = self.make_key(sql, parameters)
+        now = time.time()
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                if now < entry["expires_at"]:
+                    self.__entries.move_to_end(key)
+                    self.hits += 1
+                    return entry["frame"].copy()
+                self.__drop(key)
+
+        entry = self.__read_disk(key, now)
+        with self.__lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self.__store(key, entry)
+            return entry["frame"].copy()
+
+    def put(self, sql: str, parameters: list, frame, ttl: float = None) -> bool:
+        """Guarda o resultado; retorna False se a consulta não for cacheável"""
+        ttl = self.ttl_for(sql) if ttl is None else ttl
+        if not ttl or ttl <= 0:
+            return False
+
+        size = int(frame.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return False
+
+        key = self.make_key(sql, parameters)
+        entry = {
+            "frame": frame.copy(),
+            "bytes": size,
+            "expires_at": time.time() + ttl,
+            "tables": sorted(referenced_tables(sql)),
+        }
+        with self.__lock:
+            self.__store(key, entry)
+        self.__write_disk(key, entry)
+        return True
+
+    def invalidate_table(self, table) -> int:
+        """Descarta todos os resultados que leem da tabela informada"""
+        name = table_name(table)
+        removed = 0
+        with self.__lock:
+            keys = [key for key, entry in self.__entries.items()
+                    if any(same_table(name, t) for t in entry["tables"])]
+            for key in keys:
+                self.__drop(key)
+            removed += len(keys)
+
+            if self.disk_dir is not None:
+                for meta_path in glob.glob(os.path.join(self.disk_dir, "*.json")):
+                    try:
+                        with open(meta_path, "r", encoding="utf-8") as f:
+                            tables = json.load(f).get("tables", [])
+                    except (OSError, ValueError):
+                        continue
+                    if any(same_table(name, t) for t in tables):
+                        self.__remove_disk(meta_path[:-len(".json")])
+                        removed += 1
+            self.invalidations += removed
+        return removed
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+            self.__bytes = 0
+            if self.disk_dir is not None:
+                for meta_path in glob.glob(os.path.join(self.disk_dir, "*.json")):
+                    self.__remove_disk(meta_path[:-len(".json")])
+
+    def stats(self) -> dict:
+        with self.__lock:
+            return {
+                "entries": len(self.__entries),
+                "bytes": self.__bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def __store(self, key: str, entry: dict) -> None:
+        if key in self.__entries:
+            self.__drop(key)
+        self.__entries[key] = entry
+        self.__bytes += entry["bytes"]
+        while self.__bytes > self.max_bytes and self.__entries:
+            oldest = next(iter(self.__entries))
+            self.__drop(oldest)
+            self.evictions += 1
+
+    def __drop(self, key: str) -> None:
+        entry = self.__entries.pop(key)
+        self.__bytes -= entry["bytes"]
+
+    def __data_path(self, base: str) -> str:
+        return base + (".parquet" if self.disk_format == "parquet" else ".arrow")
+
+    def __write_disk(self, key: str, entry: dict) -> None:
+        if self.disk_dir is None:
+            return
+        import pyarrow as pa
+
+        base = os.path.join(self.disk_dir, key)
+        try:
+            table = pa.Table.from_pandas(entry["frame"], preserve_index=False)
+            if self.disk_format == "parquet":
+                import pyarrow.parquet as pq
+                pq.write_table(table, self.__data_path(base))
+            else:
+                with pa.OSFile(self.__data_path(base), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            with open(base + ".json", "w", encoding="utf-8") as f:
+                json.dump({"expires_at": entry["expires_at"], "tables": entry["tables"]}, f)
+        except Exception as e:
+            logger.warning(f"⚠️ BigQuery: Não foi possível gravar o cache em disco: {e}")
+            self.__remove_disk(base)
+
+    def __read_disk(self, key: str, now: float):
+        if self.disk_dir is None:
+            return None
+        import pyarrow as pa
+
+        base = os.path.join(self.disk_dir, key)
+        try:
+            with open(base + ".json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if now >= meta["expires_at"]:
+                self.__remove_disk(base)
+                return None
+            if self.disk_format == "parquet":
+                import pyarrow.parquet as pq
+                table = pq.read_table(self.__data_path(base))
+            else:
+                with pa.memory_map(self.__data_path(base), "r") as source:
+                    table = pa.ipc.open_file(source).read_all()
+        except (OSError, ValueError, KeyError):
+            return None
+        frame = table.to_pandas()
+        return {
+            "frame": frame,
+            "bytes": int(frame.memory_usage(deep=True).sum()),
+            "expires_at": meta["expires_at"],
+            "tables": meta.get("tables", []),
+        }
+
+    def __remove_disk(self, base: str) -> None:
+        for path in (base + ".json", self.__data_path(base)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
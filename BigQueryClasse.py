@@ -1,34 +1,179 @@
+from __future__ import annotations
+
+import functools
+import logging
 import os
-from google.cloud import bigquery
-from google.oauth2 import service_account
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+from BigQueryArrow import arrow_to_pandas
+from BigQueryBuilder import Query
+from BigQueryLoader import (DEFAULT_CHUNK_ROWS, DEFAULT_MAX_BUFFER_BYTES, DEFAULT_MAX_CONCURRENT,
+                            DEFAULT_SHARD_BYTES, load_files, load_records)
+from BigQueryMetrics import Metrics, OperationEvent
+from BigQueryPool import ClientPool, get_pool
+from BigQueryRetry import DeadLetterFile, RetryPolicy
+from BigQueryMutations import BatchMutation, DeleteResult, MutationResult, delete_where, insert_rows_dml
+from BigQueryCache import MetadataCache, QueryResultCache
+from BigQueryCost import BudgetExceeded, ByteBudget, CostEstimate, PruningEstimate, estimate_pruning, estimate_query
+from BigQuerySql import is_read_only, referenced_tables
+from BigQuerySummaries import DEFAULT_LOOKBACK_DAYS, RefreshResult, provision_summaries, refresh_summaries
+from BigQueryTables import (LOG_LAYOUT, MigrationResult, ProvisionResult, TableLayout, migrate_table,
+                            provision_table)
+from BigQueryWriter import (ChunkedWriter, SeenIdIndex, collect_errors, insert_id, row_content, DEFAULT_MAX_BYTES,
+                            DEFAULT_MAX_ROWS, DEFAULT_MAX_WORKERS)
+
+if TYPE_CHECKING:
+    import pandas
+    from google.cloud import bigquery
+
+logger = logging.getLogger(__name__)
+
+LOGS_DATASET = "GasMonitorLogs"
+LOGIN_LOGS_TABLE = "GASMONITOR_APP_LOGIN_LOGS"
+FREQUENCY_LOGS_TABLE = "GASMONITOR_APP_FREQUECY_LOGS"
+USERS_TABLE = "GASMONITOR_LOGS_USUARIOS"
+# Logs e usuários não têm _id: o insertId vem do conteúdo da linha (row_keys do construtor sobrescreve)
+DEFAULT_ROW_KEYS = {LOGIN_LOGS_TABLE: row_content, FREQUENCY_LOGS_TABLE: row_content, USERS_TABLE: row_content}
+# Layout (partição/clustering) usado por provision_table/migrate_table quando nenhum é informado
+TABLE_LAYOUTS = {LOGIN_LOGS_TABLE: LOG_LAYOUT, FREQUENCY_LOGS_TABLE: LOG_LAYOUT}
+
+
+@dataclass
+class PendingQuery:
+    key: object
+    query: str
+    query_parameters: list = None
+    job: object = None
+    started_at: float = None
+
+
+@dataclass
+class QueryOutcome:
+    """Resultado de uma consulta de um lote: DataFrame em ``result`` ou exceção em ``error``"""
+    key: object
+    result: object = None
+    error: Exception = None
+    elapsed: float = 0.0
+    cached: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class QueryBatch:
+    max_concurrency: int = None
+    waiting: deque = field(default_factory=deque)
+    running: list = field(default_factory=list)
+    ready: list = field(default_factory=list)
+
+def _measure_save(table_id: str):
+    """Mede um método save* (tempo, linhas recebidas e exceção) nas métricas da instância"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, rows: list, *args, **kwargs):
+            with self.get_metrics().measure(method.__name__, table_id) as event:
+                event.rows = len(rows)
+                return method(self, rows, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _iterate_rows(rows, batch_size: int = None):
+    if batch_size is not None and batch_size <= 0:
+        raise ValueError("batch_size must be positive")
+    
+    batch = []
+    for page in rows.pages:
+        for row in page:
+            if batch_size is None:
+                yield row
+                continue
+            batch.append(dict(row.items()))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
 
 class BigQuery:
     
-    def __init__(self, credentials_path: str = None):
-        if credentials_path is None or (not os.path.exists(credentials_path)):
+    def __init__(self, credentials_path: str = None, max_chunk_bytes: int = DEFAULT_MAX_BYTES,
+                 max_chunk_rows: int = DEFAULT_MAX_ROWS, max_insert_workers: int = DEFAULT_MAX_WORKERS,
+                 metadata_ttl: float = 300.0, metadata_cache_size: int = 256,
+                 query_cache: QueryResultCache = None, use_storage_api: bool = True, row_key="_id",
+                 row_keys: dict = None, seen_index: SeenIdIndex = None, retry: RetryPolicy = None,
+                 dead_letter_path: str = None, pool: ClientPool = None, metrics: Metrics = None,
+                 budget: ByteBudget = None, table_layouts: dict = None):
+        # Um pool próprio (ex.: LocalPool) decide o que fazer com o caminho; o padrão lê o arquivo
+        if pool is None and (credentials_path is None or (not os.path.exists(credentials_path))):
             raise ValueError("credentials_path is required")
         
         self.__credentials_path = credentials_path
         self.__client: bigquery.Client = None
+        self.__writer: ChunkedWriter = None
+        self.__writer_options = {
+            "max_bytes": max_chunk_bytes,
+            "max_rows": max_chunk_rows,
+            "max_workers": max_insert_workers,
+            "seen_index": seen_index,
+            # Streaming insert sempre com novas tentativas; retry=RetryPolicy(max_attempts=1) desativa
+            "retry": retry if retry is not None else RetryPolicy(),
+            "dead_letter": DeadLetterFile(dead_letter_path) if dead_letter_path else None,
+        }
+        # Chave que gera o insertId das linhas (padrão e por tabela); None desativa
+        self.__row_key = row_key
+        self.__row_keys = {**DEFAULT_ROW_KEYS, **(row_keys or {})}
+        self.__metadata_cache = MetadataCache(ttl=metadata_ttl, max_entries=metadata_cache_size)
+        self.__query_cache = query_cache
+        self.__credentials = None
+        # Clientes e credenciais vêm do pool do processo, compartilhados entre instâncias
+        self.__pool = pool if pool is not None else get_pool()
+        self.__metrics = metrics if metrics is not None else Metrics()
+        # Com orçamento, toda consulta passa antes por um dry run (ver submit_query)
+        self.__budget = budget
+        self.__table_layouts = {**TABLE_LAYOUTS, **(table_layouts or {})}
+        self.__use_storage_api = use_storage_api
+        self.__bqstorage_client = None
      
     def __del__(self):
-        self.terminate()
+        # Sem print: objetos de vida curta são coletados o tempo todo
+        if getattr(self, "_BigQuery__pool", None) is not None:
+            self.__release()
     
-    def terminate(self) -> None:
+    def __release(self) -> None:
         if self.__client:
-            self.__client.close()
+            self.__pool.release(self.__client)
             self.__client = None
-        print("BigQuery client terminated")
+        self.__writer = None
+        self.__bqstorage_client = None
+        self.__metadata_cache.invalidate()
+        seen_index = self.__writer_options["seen_index"]
+        if seen_index is not None and seen_index.path is not None:
+            seen_index.save()
+    
+    def terminate(self) -> None:
+        """Devolve o cliente ao pool (ele continua aberto para as próximas instâncias)"""
+        self.__release()
+        logger.info("BigQuery client terminated")
         
             
     def initialize(self, project_id: str = None) -> bool:
         try:
-            credentials = service_account.Credentials.from_service_account_file(self.__credentials_path)
-            self.__client = bigquery.Client(credentials=credentials, project=project_id)
-            print("BigQuery client initialized")
+            if self.__client is not None:
+                self.__pool.release(self.__client)
+            self.__client = self.__pool.acquire(self.__credentials_path, project_id)
+            self.__credentials = self.__pool.credentials(self.__credentials_path)
+            self.__writer = None
+            logger.info("BigQuery client initialized")
             return True
         except Exception as e:
-            print(e)
+            logger.error(e)
             raise Exception("Error initializing BigQuery client", e)
     
         
@@ -38,182 +183,788 @@ class BigQuery:
         
         return self.__client
     
-    def get_dataset(self, dataset_id: str) -> bigquery.Dataset:
+    def get_writer(self) -> ChunkedWriter:
+        if self.__writer is None:
+            self.__writer = ChunkedWriter(self.get_client(), **self.__writer_options)
+        
+        return self.__writer
+    
+    def get_budget(self) -> ByteBudget:
+        return self.__budget
+    
+    def get_metrics(self) -> Metrics:
+        return self.__metrics
+    
+    def get_seen_index(self) -> SeenIdIndex:
+        return self.__writer_options["seen_index"]
+    
+    def get_metadata_cache(self) -> MetadataCache:
+        return self.__metadata_cache
+    
+    def get_query_cache(self) -> QueryResultCache:
+        return self.__query_cache
+    
+    def invalidate_query_cache(self, table) -> int:
+        """Descarta os resultados em cache que leem da tabela (bigquery.Table ou 'dataset.tabela')"""
+        if self.__query_cache is None:
+            return 0
+        return self.__query_cache.invalidate_table(table)
+    
+    def invalidate_metadata(self, dataset_id: str = None, table_id: str = None) -> int:
+        return self.__metadata_cache.invalidate(dataset_id, table_id)
+    
+    def get_dataset(self, dataset_id: str, use_cache: bool = True) -> bigquery.Dataset:
         try:
-            return self.get_client().get_dataset(dataset_id)
+            if not use_cache:
+                return self.get_client().get_dataset(dataset_id)
+            return self.__metadata_cache.get_or_load(
+                dataset_id, None, lambda: self.get_client().get_dataset(dataset_id))
         except Exception as e:
-            print(e)
+            logger.error(e)
             raise Exception("Error getting BigQuery dataset", e)
         
     
-    def get_table(self, dataset_id: str, table_id: str) -> bigquery.Table:
+    def get_table(self, dataset_id: str, table_id: str, use_cache: bool = True) -> bigquery.Table:
         try:
             table_ref = f"{dataset_id}.{table_id}"  
-            return self.get_client().get_table(table_ref)
+            if not use_cache:
+                table = self.get_client().get_table(table_ref)
+                self.__metadata_cache.put(dataset_id, table_id, table)
+                return table
+            return self.__metadata_cache.get_or_load(
+                dataset_id, table_id, lambda: self.get_client().get_table(table_ref))
         except Exception as e:
             raise RuntimeError(f"Error getting table '{table_id}' from dataset '{dataset_id}'") from e
     
-    def make_query(self, query: str) -> bigquery.table.RowIterator:
+    def make_query(self, query: str, query_parameters: list = None, use_cache: bool = True,
+                   ttl: float = None) -> pandas.DataFrame:
+        """Executa a consulta e retorna um DataFrame.
+        
+        Com um QueryResultCache configurado, consultas de leitura são servidas do
+        cache (chave = SQL normalizado + parâmetros); DML/DDL invalida as tabelas citadas.
+        """
+        with self.__metrics.measure("make_query", ",".join(sorted(referenced_tables(query)))) as event:
+            try:
+                if use_cache:
+                    cached = self.get_cached_result(query, query_parameters)
+                    if cached is not None:
+                        event.cache_hit = True
+                        event.rows = len(cached)
+                        return cached
+                
+                job = self.submit_query(query, query_parameters)
+                frame = self.finish_query(job, query, query_parameters, use_cache=use_cache, ttl=ttl)
+                event.record_job(job)
+                event.rows = len(frame)
+                return frame
+            except BudgetExceeded:
+                raise
+            except Exception as e:
+                raise RuntimeError("Error executing BigQuery query") from e
+    
+    def get_cached_result(self, query: str, query_parameters: list = None) -> pandas.DataFrame:
+        if self.__query_cache is None or not is_read_only(query):
+            return None
+        return self.__query_cache.get(query, query_parameters)
+    
+    def estimate_query(self, query: str, query_parameters: list = None) -> CostEstimate:
+        """Dry run: bytes que a consulta leria e custo on-demand estimado, sem executar"""
+        estimate = estimate_query(self.get_client(), query, query_parameters)
+        if estimate.ok:
+            logger.debug(f"🔧 BigQuery: Consulta leria {estimate.bytes_processed} bytes "
+                         f"(US$ {estimate.cost_usd:.4f})")
+        return estimate
+    
+    def estimate_pruning(self, query: str, query_parameters: list) -> PruningEstimate:
+        """Dry runs com e sem o período (QueryBuilder.where_window): quanto da tabela a consulta realmente lê"""
+        estimate = estimate_pruning(self.get_client(), query, query_parameters)
+        if estimate.ok:
+            logger.info(f"💰 BigQuery: Período lê {estimate.window.bytes_processed} de "
+                        f"{estimate.full_scan.bytes_processed} bytes ({estimate.scanned_fraction:.1%})")
+        return estimate
+    
+    def submit_query(self, query: str, query_parameters: list = None) -> bigquery.QueryJob:
+        """Cria o job da consulta sem esperar o resultado (conferindo o orçamento de bytes, se houver)"""
+        from google.cloud import bigquery
+
+        if self.__budget is not None:
+            self.__budget.check(self.estimate_query(query, query_parameters))
+        job_config = bigquery.QueryJobConfig(query_parameters=query_parameters) if query_parameters else None
+        return self.get_client().query(query, job_config=job_config)
+    
+    def finish_query(self, job: bigquery.QueryJob, query: str, query_parameters: list = None,
+                     use_cache: bool = True, ttl: float = None, timeout: float = None) -> pandas.DataFrame:
+        """Espera o job, converte para DataFrame e atualiza o cache de resultados"""
+        frame = job.result(timeout=timeout).to_dataframe()
+        
+        if is_read_only(query):
+            if use_cache and self.__query_cache is not None:
+                self.__query_cache.put(query, query_parameters, frame, ttl)
+        else:
+            for table in referenced_tables(query):
+                self.invalidate_query_cache(table)
+        return frame
+        
+    def get_bqstorage_client(self):
+        """Cliente da BigQuery Storage Read API, ou None para usar a API REST"""
+        if not self.__use_storage_api:
+            return None
+        if self.__bqstorage_client is None:
+            try:
+                from google.cloud import bigquery_storage
+                self.__bqstorage_client = bigquery_storage.BigQueryReadClient(credentials=self.__credentials)
+            except Exception as e:
+                self.__use_storage_api = False
+                logger.warning(f"⚠️ BigQuery: Storage Read API indisponível, usando API REST: {e}")
+                return None
+        return self.__bqstorage_client
+    
+    def make_query_arrow(self, query: str, query_parameters: list = None, as_pandas: bool = False):
+        """Executa a consulta e retorna um pyarrow.Table (ou DataFrame com dtypes Arrow, sem cópia).
+        
+        Usa a Storage Read API quando disponível e cai para a API REST se o
+        pacote não estiver instalado ou a leitura pela Storage API falhar.
+        """
+        with self.__metrics.measure("make_query_arrow", ",".join(sorted(referenced_tables(query)))) as event:
+            try:
+                job = self.submit_query(query, query_parameters)
+                rows = job.result()
+            except BudgetExceeded:
+                raise
+            except Exception as e:
+                raise RuntimeError("Error executing BigQuery query") from e
+            
+            storage = self.get_bqstorage_client()
+            try:
+                table = rows.to_arrow(bqstorage_client=storage, create_bqstorage_client=False)
+            except Exception as e:
+                if storage is None:
+                    raise RuntimeError("Error reading BigQuery query result as Arrow") from e
+                logger.warning(f"⚠️ BigQuery: Falha na Storage Read API, usando API REST: {e}")
+                self.__use_storage_api = False
+                table = rows.to_arrow(create_bqstorage_client=False)
+            event.record_job(job)
+            event.rows = table.num_rows
+        
+        return arrow_to_pandas(table) if as_pandas else table
+    
+    def iter_query_arrow(self, query: str, query_parameters: list = None, page_size: int = None):
+        """Gera o resultado como pyarrow.RecordBatch, um lote por página/stream"""
         try:
-            job = self.get_client().query(query)
-            result = job.result()
-            return result.to_dataframe()
+            rows = self.submit_query(query, query_parameters).result(page_size=page_size)
+        except BudgetExceeded:
+            raise
         except Exception as e:
             raise RuntimeError("Error executing BigQuery query") from e
+        return rows.to_arrow_iterable(bqstorage_client=self.get_bqstorage_client())
+    
+    def submit_queries(self, queries, max_concurrency: int = None) -> QueryBatch:
+        """Dispara várias consultas de uma vez sem esperar os resultados.
+        
+        ``queries`` é um dict {chave: sql} ou uma lista de SQL (chave = posição);
+        o SQL pode vir como tupla (sql, query_parameters). Com ``max_concurrency``
+        apenas esse número de jobs fica ativo; os demais são disparados por
+        ``gather_results`` conforme os anteriores terminam.
+        """
+        if max_concurrency is not None and max_concurrency <= 0:
+            raise ValueError("max_concurrency must be positive")
+        
+        items = queries.items() if isinstance(queries, dict) else enumerate(queries)
+        batch = QueryBatch(max_concurrency=max_concurrency)
+        for key, query in items:
+            sql, parameters = (query, None) if isinstance(query, str) else query
+            cached = self.get_cached_result(sql, parameters)
+            if cached is not None:
+                batch.ready.append(QueryOutcome(key=key, result=cached, cached=True))
+            else:
+                batch.waiting.append(PendingQuery(key=key, query=sql, query_parameters=parameters))
+        
+        self.__start_waiting(batch)
+        logger.debug(f"🔧 BigQuery: {len(batch.running)} consultas disparadas, {len(batch.waiting)} na fila")
+        return batch
+    
+    def __start_waiting(self, batch: QueryBatch) -> None:
+        while batch.waiting and (batch.max_concurrency is None or len(batch.running) < batch.max_concurrency):
+            pending = batch.waiting.popleft()
+            try:
+                pending.job = self.submit_query(pending.query, pending.query_parameters)
+                pending.started_at = time.monotonic()
+                batch.running.append(pending)
+            except Exception as e:
+                batch.ready.append(QueryOutcome(key=pending.key, error=e))
+    
+    def gather_results(self, batch: QueryBatch, timeout: float = None, poll_interval: float = 0.5):
+        """Gera um QueryOutcome por consulta, na ordem em que cada uma termina.
+        
+        ``timeout`` é o limite em segundos de cada job, contado a partir do seu
+        disparo; jobs que estouram são cancelados e retornam TimeoutError.
+        """
+        while batch.ready or batch.waiting or batch.running:
+            self.__start_waiting(batch)
+            
+            finished, still_running = [], []
+            for pending in batch.running:
+                elapsed = time.monotonic() - pending.started_at
+                try:
+                    if pending.job.done():
+                        frame = self.finish_query(pending.job, pending.query, pending.query_parameters)
+                        finished.append(QueryOutcome(key=pending.key, result=frame, elapsed=elapsed))
+                        event = OperationEvent(operation="gather_results", target=str(pending.key),
+                                               seconds=elapsed, rows=len(frame))
+                        event.record_job(pending.job)
+                        self.__metrics.emit(event)
+                    elif timeout is not None and elapsed > timeout:
+                        pending.job.cancel()
+                        finished.append(QueryOutcome(key=pending.key, elapsed=elapsed, error=TimeoutError(
+                            f"Query {pending.key} exceeded {timeout}s and was cancelled")))
+                    else:
+                        still_running.append(pending)
+                except Exception as e:
+                    finished.append(QueryOutcome(key=pending.key, error=e, elapsed=elapsed))
+            batch.running = still_running
+            
+            finished = batch.ready + finished
+            batch.ready = []
+            for outcome in finished:
+                yield outcome
+            
+            if not finished and batch.running:
+                time.sleep(poll_interval)
+    
+    def run_queries(self, queries, max_concurrency: int = None, timeout: float = None,
+                    poll_interval: float = 0.5) -> dict:
+        """Atalho para submit_queries + gather_results; retorna {chave: QueryOutcome}"""
+        batch = self.submit_queries(queries, max_concurrency)
+        return {outcome.key: outcome for outcome in self.gather_results(batch, timeout, poll_interval)}
+    
+    def apply_mutations(self, batch: BatchMutation) -> MutationResult:
+        """Aplica um BatchMutation (MERGE único ou DML em lotes) e invalida o cache da tabela.
+        
+        Com orçamento de bytes, cada DML do lote passa antes por um dry run.
+        """
+        try:
+            pending = len(batch)
+            result = batch.apply(self.get_client(), budget=self.__budget)
+            self.invalidate_query_cache(batch.table)
+            logger.info(f"✅ BigQuery: {pending} mudanças aplicadas via {result.strategy} - "
+                        f"{result.affected_rows} linhas afetadas em {len(result.jobs)} job(s)")
+            return result
+        except BudgetExceeded:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Error applying batch mutation to {batch.table}") from e
+    
+    def delete_where(self, query: Query, dry_run: bool = False) -> DeleteResult:
+        """DELETE em um único job; com dry_run apenas estima os bytes lidos.
+        
+        Com orçamento de bytes, o DELETE passa antes por um dry run (como em submit_query).
+        """
+        with self.__metrics.measure("delete_where", ",".join(sorted(referenced_tables(query.sql)))) as event:
+            try:
+                result = delete_where(self.get_client(), query, dry_run=dry_run, budget=self.__budget)
+            except BudgetExceeded:
+                raise
+            except Exception as e:
+                raise RuntimeError("Error executing BigQuery delete") from e
+            event.bytes_processed = result.bytes_processed
+            event.rows = result.affected_rows or 0
+            event.jobs = 1
+        
+        if dry_run:
+            logger.debug(f"🔧 BigQuery: DELETE leria {result.bytes_processed} bytes (dry run)")
+        else:
+            for table in referenced_tables(query.sql):
+                self.invalidate_query_cache(table)
+            logger.info(f"✅ BigQuery: {result.affected_rows} linhas deletadas ({result.bytes_processed} bytes lidos)")
+        return result
+    
+    def load_files(self, dataset_id: str, table_id: str, sources, max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+                   target_shard_bytes: int = DEFAULT_SHARD_BYTES) -> list:
+        """Carrega arquivos NDJSON/CSV/Parquet (arquivo, diretório ou glob) com load jobs paralelos.
+        
+        Usa o esquema da tabela do cache de metadados e retorna um FileOutcome por arquivo.
+        """
+        with self.__metrics.measure("load_files", table_id) as event:
+            try:
+                table = self.get_table(dataset_id, table_id)
+                logger.debug(f"🔧 BigQuery: Carregando arquivos em {table.table_id}...")
+                outcomes = load_files(self.get_client(), sources, f"{dataset_id}.{table_id}", schema=table.schema,
+                                      max_concurrent=max_concurrent, target_shard_bytes=target_shard_bytes)
+                self.invalidate_query_cache(table)
+            except Exception as e:
+                raise RuntimeError(f"Error loading files into {dataset_id}.{table_id}") from e
+            shards = {outcome.shard: outcome for outcome in outcomes}
+            event.bytes_sent = sum(outcome.bytes for outcome in outcomes)
+            event.rows = sum(outcome.shard_rows or 0 for outcome in shards.values())
+            event.jobs = len(shards)
         
+        failed = [outcome for outcome in outcomes if not outcome.ok]
+        logger.info(f"✅ BigQuery: {len(outcomes) - len(failed)} arquivo(s) carregados, {len(failed)} com erro")
+        for outcome in failed:
+            logger.error(f"❌ BigQuery: {outcome.path}: {outcome.error}")
+        return outcomes
+    
+    def load_records(self, table: bigquery.Table, records, format: str = "NEWLINE_DELIMITED_JSON",
+                     chunk_rows: int = DEFAULT_CHUNK_ROWS, max_buffer_bytes: int = DEFAULT_MAX_BUFFER_BYTES) -> list:
+        """Carrega uma lista de dicts ou DataFrame via load job, codificando em memória.
+        
+        ``format`` é NEWLINE_DELIMITED_JSON ou PARQUET; retorna um LoadOutcome por load job.
+        """
+        with self.__metrics.measure("load_records", table.table_id) as event:
+            try:
+                outcomes = load_records(self.get_client(), table, records, source_format=format,
+                                        schema=table.schema, chunk_rows=chunk_rows, max_buffer_bytes=max_buffer_bytes)
+                self.invalidate_query_cache(table)
+            except Exception as e:
+                raise RuntimeError(f"Error loading records into {table.table_id}") from e
+            event.rows = sum(outcome.rows for outcome in outcomes)
+            event.bytes_sent = sum(outcome.bytes for outcome in outcomes)
+            event.jobs = len(outcomes)
+        
+        failed = [outcome for outcome in outcomes if not outcome.ok]
+        logger.info(f"✅ BigQuery: {sum(o.rows for o in outcomes) - sum(o.rows for o in failed)} registros carregados "
+                    f"em {len(outcomes)} load job(s), {len(failed)} com erro")
+        for outcome in failed:
+            logger.error(f"❌ BigQuery: Load job com {outcome.rows} registros falhou: {outcome.error}")
+        return outcomes
+    
+    def insert_rows_dml(self, table: bigquery.Table, rows: list) -> MutationResult:
+        """INSERT via DML com as linhas num parâmetro ARRAY<STRUCT> (linhas disponíveis para UPDATE/DELETE na hora)"""
+        with self.__metrics.measure("insert_rows_dml", table.table_id) as event:
+            try:
+                result = insert_rows_dml(self.get_client(), f"{table.project}.{table.dataset_id}.{table.table_id}",
+                                         rows, table.schema)
+                self.invalidate_query_cache(table)
+            except Exception as e:
+                raise RuntimeError(f"Error inserting rows via DML into {table.table_id}") from e
+            event.rows = result.affected_rows
+            event.jobs = len(result.jobs)
+            return result
+    
     def set_label(self, table: bigquery.Table, labels: dict) -> None:
         try:
             table.labels = labels
-            self.get_client().update_table(table, ["labels"])
+            updated = self.get_client().update_table(table, ["labels"])
+            self.__metadata_cache.put(table.dataset_id, table.table_id, updated)
         except Exception as e:
             raise RuntimeError(f"Error setting labels for table {table.table_id}") from e
+    
+    def __layout(self, table_id: str, layout: TableLayout) -> TableLayout:
+        layout = layout if layout is not None else self.__table_layouts.get(table_id)
+        if layout is None:
+            raise ValueError(f"no table layout for '{table_id}': pass one or register it in table_layouts")
+        return layout
+    
+    def provision_table(self, dataset_id: str, table_id: str, layout: TableLayout = None) -> ProvisionResult:
+        """Cria a tabela particionada/clusterizada ou ajusta clustering e filtro obrigatório de uma existente.
+        
+        Tabelas com outro particionamento voltam com ``needs_migration`` (ver migrate_table).
+        """
+        layout = self.__layout(table_id, layout)
+        try:
+            result = provision_table(self.get_client(), f"{dataset_id}.{table_id}", layout)
+        except Exception as e:
+            raise RuntimeError(f"Error provisioning table {dataset_id}.{table_id}") from e
+        self.invalidate_metadata(dataset_id, table_id)
+        return result
+    
+    def migrate_table(self, dataset_id: str, table_id: str, layout: TableLayout = None, swap: bool = True,
+                      keep_backup: bool = True, dry_run: bool = False) -> MigrationResult:
+        """Copia uma tabela sem partição para uma nova com o layout e troca os nomes (original vira backup)"""
+        layout = self.__layout(table_id, layout)
+        with self.__metrics.measure("migrate_table", table_id) as event:
+            try:
+                result = migrate_table(self.get_client(), f"{dataset_id}.{table_id}", layout, swap=swap,
+                                       keep_backup=keep_backup, dry_run=dry_run)
+            except Exception as e:
+                raise RuntimeError(f"Error migrating table {dataset_id}.{table_id}") from e
+            event.bytes_processed = result.bytes_processed
+            event.rows = result.copied_rows
+            event.jobs = len(result.jobs)
+        
+        if not dry_run:
+            self.invalidate_metadata(dataset_id, table_id)
+            self.invalidate_query_cache(f"{dataset_id}.{table_id}")
+        return result
         
         
-    def set_data(self, table: bigquery.Table, data: list) -> None:
+    def provision_summaries(self, dataset_id: str, table_id: str) -> list:
+        """Cria as tabelas de resumo diário (por dia/hora, cliente e produto) de uma tabela de vendas"""
         try:
-            client = self.get_client()
-            client.insert_rows_json(table, data)
+            return provision_summaries(self.get_client(), f"{self.get_client().project}.{dataset_id}.{table_id}")
         except Exception as e:
-            raise RuntimeError(f"Error setting data for table {table.table_id}") from e
+            raise RuntimeError(f"Error provisioning summaries of {dataset_id}.{table_id}") from e
+    
+    def refresh_summaries(self, dataset_id: str, table_id: str, lookback_days: int = DEFAULT_LOOKBACK_DAYS,
+                          since=None, full: bool = False) -> RefreshResult:
+        """Atualiza os resumos diários com os pedidos desde o último watermark (ver BigQuerySummaries)"""
+        with self.__metrics.measure("refresh_summaries", table_id) as event:
+            try:
+                result = refresh_summaries(self.get_client(), f"{self.get_client().project}.{dataset_id}.{table_id}",
+                                           lookback_days=lookback_days, since=since, full=full)
+            except Exception as e:
+                raise RuntimeError(f"Error refreshing summaries of {dataset_id}.{table_id}") from e
+            event.bytes_processed = result.bytes_processed
+            event.rows = sum(result.affected_rows.values())
+            event.jobs = len(result.jobs)
+        
+        for table in result.affected_rows:
+            self.invalidate_query_cache(table)
+        return result
+    
+    def set_data(self, table: bigquery.Table, data: list, row_key=None) -> list:
+        """Insere as linhas em lotes e retorna o resultado de cada lote (ChunkResult).
+        
+        O insertId de cada linha vem de ``row_key`` (ou da chave configurada para
+        a tabela), então reenviar as mesmas linhas não as duplica. Linhas sem a
+        chave recebem o insertId pelo conteúdo (row_content), com um aviso.
+        """
+        if row_key is None:
+            row_key = self.__row_keys.get(table.table_id, self.__row_key)
+        row_ids = None
+        if row_key is not None:
+            row_ids = [insert_id(row, row_key) for row in data]
+            missing = row_ids.count(None)
+            if missing:
+                logger.warning(f"⚠️ BigQuery: {missing} linha(s) de {table.table_id} sem a chave {row_key!r}; "
+                               f"insertId gerado pelo conteúdo da linha")
+                row_ids = [row_id or insert_id(row, row_content) for row, row_id in zip(data, row_ids)]
+        with self.__metrics.measure("set_data", table.table_id) as event:
+            try:
+                results = self.get_writer().write(table, data, row_ids=row_ids)
+                self.invalidate_query_cache(table)
+            except Exception as e:
+                raise RuntimeError(f"Error setting data for table {table.table_id}") from e
+            event.rows = sum(result.rows for result in results)
+            event.bytes_sent = sum(result.bytes for result in results)
+            return results
         
         
-    def get_data(self, table: bigquery.Table) -> list:
+    def get_data(self, table: bigquery.Table, page_size: int = None, max_results: int = None,
+                 selected_fields: list = None) -> bigquery.table.RowIterator:
+        """Retorna o RowIterator de list_rows; as páginas são buscadas sob demanda"""
         try:
-            return self.get_client().list_rows(table)
+            return self.get_client().list_rows(table, page_size=page_size, max_results=max_results,
+                                               selected_fields=selected_fields)
         except Exception as e:
             raise RuntimeError(f"Error getting data for table {table.table_id}") from e
+    
+    def iter_data(self, table: bigquery.Table, page_size: int = 1000, max_results: int = None,
+                  selected_fields: list = None, batch_size: int = None):
+        """Percorre a tabela página a página (linhas, ou listas de dicts com ``batch_size``)"""
+        rows = self.get_data(table, page_size=page_size, max_results=max_results, selected_fields=selected_fields)
+        return _iterate_rows(rows, batch_size)
+    
+    def iter_query(self, query: str, query_parameters: list = None, page_size: int = 1000,
+                   max_results: int = None, batch_size: int = None):
+        """Executa a consulta e gera o resultado aos poucos, sem montar um DataFrame.
         
+        Cada página (``page_size`` linhas) só é buscada quando a anterior foi
+        consumida, então a memória não cresce com o tamanho do resultado e parar
+        a iteração no meio evita buscar as páginas restantes. Sem ``batch_size``
+        gera objetos Row; com ``batch_size`` gera listas de dicts desse tamanho.
+        """
+        try:
+            job = self.submit_query(query, query_parameters)
+            rows = job.result(page_size=page_size, max_results=max_results)
+        except BudgetExceeded:
+            raise
+        except Exception as e:
+            raise RuntimeError("Error executing BigQuery query") from e
         
+        if not is_read_only(query):
+            for table in referenced_tables(query):
+                self.invalidate_query_cache(table)
+        return _iterate_rows(rows, batch_size)
+        
+        
+    @_measure_save(LOGIN_LOGS_TABLE)
     def saveLoginLogsInBigQuery(self, logs: list) -> None:
         try:
-            print(f"🔧 BigQuery: Iniciando salvamento de {len(logs)} logs de login...")
+            logger.debug(f"🔧 BigQuery: Iniciando salvamento de {len(logs)} logs de login...")
             
             if not logs:
-                print("⚠️ BigQuery: Nenhum log de login para salvar")
+                logger.warning("⚠️ BigQuery: Nenhum log de login para salvar")
                 return
                 
-            print("🔧 BigQuery: Obtendo tabela GASMONITOR_APP_LOGIN_LOGS...")
+            logger.debug("🔧 BigQuery: Obtendo tabela GASMONITOR_APP_LOGIN_LOGS...")
             login_table = self.get_table(dataset_id="GasMonitorLogs", table_id="GASMONITOR_APP_LOGIN_LOGS")
-            print(f"✅ BigQuery: Tabela obtida - {login_table.table_id}")
+            logger.info(f"✅ BigQuery: Tabela obtida - {login_table.table_id}")
             
-            print("🔧 BigQuery: Inserindo dados...")
-            errors = self.get_client().insert_rows_json(login_table, logs)
+            logger.debug("🔧 BigQuery: Inserindo dados...")
+            results = self.set_data(login_table, logs)
+            logger.debug(f"🔧 BigQuery: {len(results)} lote(s) enviados, "
+                         f"{sum(result.retried_rows for result in results)} linha(s) reenviada(s)")
+            errors = collect_errors(results)
             
             if errors:
-                print(f"❌ BigQuery: Erros ao inserir logs de login: {errors}")
+                logger.error(f"❌ BigQuery: Erros ao inserir logs de login: {errors}")
                 raise RuntimeError(f"Erros ao inserir logs de login no BigQuery: {errors}")
             else:
-                print(f"✅ BigQuery: Logs de login salvos com sucesso: {len(logs)} registros")
+                logger.info(f"✅ BigQuery: Logs de login salvos com sucesso: {len(logs)} registros")
                 
         except Exception as e:
-            print(f"❌ BigQuery: Erro ao salvar logs de login: {e}")
+            logger.error(f"❌ BigQuery: Erro ao salvar logs de login: {e}")
             raise RuntimeError(f"Error saving login logs in big query: {e}")
         
     
+    @_measure_save(FREQUENCY_LOGS_TABLE)
     def saveFrequencyLogsInBigQuery(self, logs: list) -> None:
         try:
-            print(f"🔧 BigQuery: Iniciando salvamento de {len(logs)} logs de frequência...")
+            logger.debug(f"🔧 BigQuery: Iniciando salvamento de {len(logs)} logs de frequência...")
             
             if not logs:
-                print("⚠️ BigQuery: Nenhum log de frequência para salvar")
+                logger.warning("⚠️ BigQuery: Nenhum log de frequência para salvar")
                 return
 
-            print("🔧 BigQuery: Obtendo tabela GASMONITOR_APP_FREQUECY_LOGS...")
+            logger.debug("🔧 BigQuery: Obtendo tabela GASMONITOR_APP_FREQUECY_LOGS...")
             frequency_table = self.get_table(dataset_id="GasMonitorLogs", table_id="GASMONITOR_APP_FREQUECY_LOGS")
-            print(f"✅ BigQuery: Tabela obtida - {frequency_table.table_id}")
+            logger.info(f"✅ BigQuery: Tabela obtida - {frequency_table.table_id}")
             
-            print("🔧 BigQuery: Inserindo dados...")
-            errors = self.get_client().insert_rows_json(frequency_table, logs)
+            logger.debug("🔧 BigQuery: Inserindo dados...")
+            results = self.set_data(frequency_table, logs)
+            logger.debug(f"🔧 BigQuery: {len(results)} lote(s) enviados, "
+                         f"{sum(result.retried_rows for result in results)} linha(s) reenviada(s)")
+            errors = collect_errors(results)
             
             if errors:
-                print(f"❌ BigQuery: Erros ao inserir logs de frequência: {errors}")
+                logger.error(f"❌ BigQuery: Erros ao inserir logs de frequência: {errors}")
                 raise RuntimeError(f"Erros ao inserir logs de frequência no BigQuery: {errors}")
             else:
-                print(f"✅ BigQuery: Logs de frequência salvos com sucesso: {len(logs)} registros")
+                logger.info(f"✅ BigQuery: Logs de frequência salvos com sucesso: {len(logs)} registros")
                 
         except Exception as e:
-            print(f"❌ BigQuery: Erro ao salvar logs de frequência: {e}")
+            logger.error(f"❌ BigQuery: Erro ao salvar logs de frequência: {e}")
             raise RuntimeError(f"Error saving frequency logs in big query: {e}")
         
+    @_measure_save(USERS_TABLE)
     def saveUsersInBigQuery(self, users: list) -> None:
         try:
-            print(f"🔧 BigQuery: Iniciando salvamento de {len(users)} usuários...")
+            logger.debug(f"🔧 BigQuery: Iniciando salvamento de {len(users)} usuários...")
             
             if not users:
-                print("⚠️ BigQuery: Nenhum usuário para salvar")
+                logger.warning("⚠️ BigQuery: Nenhum usuário para salvar")
                 return
-            schema  = self.get_table_schema(dataset_id="GasMonitorLogs", table_id="GASMONITOR_LOGS_USUARIOS")
-            print(schema)
+            schema  = self.get_table_schema(dataset_id=LOGS_DATASET, table_id=USERS_TABLE)
+            logger.debug(schema)
             
-            users_table = self.get_table(dataset_id="GasMonitorLogs", table_id="GASMONITOR_LOGS_USUARIOS")
-            print(f"✅ BigQuery: Tabela obtida - {users_table.table_id}")
+            users_table = self.get_table(dataset_id=LOGS_DATASET, table_id=USERS_TABLE)
+            logger.info(f"✅ BigQuery: Tabela obtida - {users_table.table_id}")
             
-            print("🔧 BigQuery: Inserindo dados...")
-            errors = self.get_client().insert_rows_json(users_table, users)
+            logger.debug("🔧 BigQuery: Inserindo dados...")
+            results = self.set_data(users_table, users)
+            logger.debug(f"🔧 BigQuery: {len(results)} lote(s) enviados, "
+                         f"{sum(result.retried_rows for result in results)} linha(s) reenviada(s)")
+            errors = collect_errors(results)
             
             if errors:
-                print(f"❌ BigQuery: Erros ao inserir usuários: {errors}")
+                logger.error(f"❌ BigQuery: Erros ao inserir usuários: {errors}")
+                raise RuntimeError(f"Erros ao inserir usuários no BigQuery: {errors}")
             else: 
-                print(f"✅ BigQuery: Usuários salvos com sucesso: {len(users)} registros")
+                logger.info(f"✅ BigQuery: Usuários salvos com sucesso: {len(users)} registros")
                 
         except Exception as e:
-            print(f"❌ BigQuery: Erro ao salvar usuários: {e}")
+            logger.error(f"❌ BigQuery: Erro ao salvar usuários: {e}")
             raise RuntimeError(f"Error saving users in big query: {e}")
         
         
     def test_connection(self) -> bool:
         """Testa se a conexão com BigQuery está funcionando"""
         try:
-            print("🔧 BigQuery: Testando conexão...")
+            logger.debug("🔧 BigQuery: Testando conexão...")
             
             # Testa se consegue listar datasets
             datasets = list(self.get_client().list_datasets())
-            print(f"✅ BigQuery: Conexão OK - {len(datasets)} datasets encontrados")
+            logger.info(f"✅ BigQuery: Conexão OK - {len(datasets)} datasets encontrados")
             
             # Testa se consegue acessar o dataset específico
             try:
                 dataset = self.get_dataset("GasMonitorLogs")
-                print(f"✅ BigQuery: Dataset GasMonitorLogs acessível")
+                logger.info("✅ BigQuery: Dataset GasMonitorLogs acessível")
                 
                 # Testa se consegue listar tabelas
                 tables = list(self.get_client().list_tables(dataset))
-                print(f"✅ BigQuery: {len(tables)} tabelas encontradas no dataset")
+                logger.info(f"✅ BigQuery: {len(tables)} tabelas encontradas no dataset")
                 
                 for table in tables:
-                    print(f"  - {table.table_id}")
+                    logger.debug(f"  - {table.table_id}")
                     
                 return True
                 
             except Exception as e:
-                print(f"❌ BigQuery: Erro ao acessar dataset GasMonitorLogs: {e}")
+                logger.error(f"❌ BigQuery: Erro ao acessar dataset GasMonitorLogs: {e}")
                 return False
                 
         except Exception as e:
-            print(f"❌ BigQuery: Erro na conexão: {e}")
+            logger.error(f"❌ BigQuery: Erro na conexão: {e}")
             return False
 
     def get_table_schema(self, dataset_id: str, table_id: str) -> list:
-        """Obtém o esquema (campos) de uma tabela específica"""
+        """Obtém o esquema (campos) de uma tabela específica - usa o cache de metadados de get_table"""
         try:
             table = self.get_table(dataset_id, table_id)
             schema = table.schema
             
-            print(f"📋 BigQuery: Esquema da tabela {table_id}:")
+            logger.debug(f"📋 BigQuery: Esquema da tabela {table_id}:")
             fields = []
-            for field in schema:
+            for schema_field in schema:
                 field_info = {
-                    "name": field.name,
-                    "type": field.field_type,
-                    "mode": field.mode
+                    "name": schema_field.name,
+                    "type": schema_field.field_type,
+                    "mode": schema_field.mode
                 }
                 fields.append(field_info)
-                print(f"  - {field.name} ({field.field_type}, {field.mode})")
+                logger.debug(f"  - {schema_field.name} ({schema_field.field_type}, {schema_field.mode})")
             
             return fields
             
         except Exception as e:
-            print(f"❌ BigQuery: Erro ao obter esquema da tabela {table_id}: {e}")
+            logger.error(f"❌ BigQuery: Erro ao obter esquema da tabela {table_id}: {e}")
             return []
-        
 
 
+class BufferedLogSink:
+    """Acumula eventos de log em memória e grava em lote numa thread de fundo.
+
+    Cada tabela é descarregada quando atinge ``batch_rows`` linhas ou quando o
+    evento mais antigo passa de ``flush_interval`` segundos. Com o buffer cheio
+    (``max_buffered_rows``), ``add`` bloqueia até haver espaço ou até o timeout.
+    """
+    
+    def __init__(self, bigquery_client: BigQuery, dataset_id: str = LOGS_DATASET, batch_rows: int = 500,
+                 flush_interval: float = 5.0, max_buffered_rows: int = 10000):
+        if batch_rows <= 0 or flush_interval <= 0 or max_buffered_rows < batch_rows:
+            raise ValueError("invalid buffer configuration")
+        
+        self.__bigquery = bigquery_client
+        self.__dataset_id = dataset_id
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self.max_buffered_rows = max_buffered_rows
+        
+        self.__buffers: dict = {}
+        self.__oldest: dict = {}
+        self.__buffered = 0
+        self.__in_flight = 0
+        self.__closed = False
+        self.__lock = threading.Lock()
+        self.__has_data = threading.Condition(self.__lock)
+        self.__has_space = threading.Condition(self.__lock)
+        
+        self.written_rows = 0
+        self.failed_rows = 0
+        self.dropped_rows = 0
+        
+        self.__thread = threading.Thread(target=self.__run, name="BufferedLogSink", daemon=True)
+        self.__thread.start()
+    
+    def add(self, table_id: str, row: dict, block: bool = True, timeout: float = None) -> bool:
+        """Enfileira um evento; retorna False se o buffer continuar cheio (evento descartado)"""
+        with self.__lock:
+            if self.__closed:
+                raise RuntimeError("BufferedLogSink already terminated")
+            
+            if self.__buffered >= self.max_buffered_rows:
+                if not block or not self.__has_space.wait_for(
+                        lambda: self.__buffered < self.max_buffered_rows or self.__closed, timeout):
+                    self.dropped_rows += 1
+                    return False
+                if self.__closed:
+                    raise RuntimeError("BufferedLogSink already terminated")
+            
+            buffer = self.__buffers.setdefault(table_id, [])
+            if not buffer:
+                self.__oldest[table_id] = time.monotonic()
+            buffer.append(row)
+            self.__buffered += 1
+            if len(buffer) >= self.batch_rows:
+                self.__has_data.notify()
+            return True
+    
+    def addLoginLog(self, log: dict, block: bool = True, timeout: float = None) -> bool:
+        return self.add(LOGIN_LOGS_TABLE, log, block, timeout)
+    
+    def addFrequencyLog(self, log: dict, block: bool = True, timeout: float = None) -> bool:
+        return self.add(FREQUENCY_LOGS_TABLE, log, block, timeout)
+    
+    def pending(self) -> int:
+        with self.__lock:
+            return self.__buffered + self.__in_flight
+    
+    def flush(self, timeout: float = None) -> bool:
+        """Força o envio de tudo que está no buffer e espera terminar"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.__lock:
+            for table_id in self.__oldest:
+                self.__oldest[table_id] = float("-inf")
+            self.__has_data.notify()
+            while self.__buffered or self.__in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.__has_space.wait(remaining)
+            return True
+    
+    def terminate(self, timeout: float = None) -> None:
+        """Para de aceitar eventos, descarrega o buffer e encerra a thread"""
+        with self.__lock:
+            if self.__closed:
+                return
+            self.__closed = True
+            self.__has_data.notify_all()
+            self.__has_space.notify_all()
+        self.__thread.join(timeout)
+        logger.info(f"BufferedLogSink terminated - {self.written_rows} gravados, {self.failed_rows} com erro")
+    
+    def __take_ready(self) -> list:
+        now = time.monotonic()
+        ready = []
+        for table_id, buffer in self.__buffers.items():
+            if not buffer:
+                continue
+            if self.__closed or len(buffer) >= self.batch_rows or now - self.__oldest[table_id] >= self.flush_interval:
+                ready.append((table_id, buffer))
+        for table_id, buffer in ready:
+            self.__buffers[table_id] = []
+            self.__oldest.pop(table_id, None)
+            self.__buffered -= len(buffer)
+            self.__in_flight += len(buffer)
+        return ready
+    
+    def __next_deadline(self) -> float:
+        if not self.__oldest:
+            return self.flush_interval
+        return max(0.0, min(self.__oldest.values()) + self.flush_interval - time.monotonic())
+    
+    def __run(self) -> None:
+        while True:
+            with self.__lock:
+                ready = self.__take_ready()
+                while not ready and not self.__closed:
+                    self.__has_data.wait(self.__next_deadline())
+                    ready = self.__take_ready()
+                if not ready and self.__closed:
+                    return
+            
+            for table_id, rows in ready:
+                self.__write(table_id, rows)
+            
+            with self.__lock:
+                self.__in_flight -= sum(len(rows) for _, rows in ready)
+                self.__has_space.notify_all()
+    
+    def __write(self, table_id: str, rows: list) -> None:
+        try:
+            table = self.__bigquery.get_table(dataset_id=self.__dataset_id, table_id=table_id)
+            errors = collect_errors(self.__bigquery.set_data(table, rows))
+        except Exception as e:
+            logger.error(f"❌ BigQuery: Erro ao gravar {len(rows)} logs em {table_id}: {e}")
+            self.failed_rows += len(rows)
+            return
+        
+        failed = len({error["index"] for error in errors if "index" in error})
+        failed += sum(error["rows"] for error in errors if "rows" in error)
+        if errors:
+            logger.error(f"❌ BigQuery: Erros ao inserir logs em {table_id}: {errors}")
+        self.failed_rows += failed
+        self.written_rows += len(rows) - failed
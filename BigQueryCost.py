@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import datetime
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from BigQueryBuilder import WINDOW_END, WINDOW_START
+from BigQuerySql import read_sql_file
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery
+
+logger = logging.getLogger(__name__)
+
+# Preço on-demand (US/EU multi-região) por TiB processado
+PRICE_PER_TIB = 6.25
+TIB = 1024 ** 4
+GIB = 1024 ** 3
+# O on-demand cobra no mínimo 10 MB por tabela referenciada
+MIN_BILLED_BYTES_PER_TABLE = 10 * 1024 * 1024
+
+
+class BudgetExceeded(RuntimeError):
+    """Consulta recusada porque passaria do limite de bytes da consulta ou da sessão"""
+
+
+@dataclass
+class CostEstimate:
+    """Resultado de um dry run: bytes que a consulta leria e o custo on-demand estimado"""
+    query: str
+    name: str = None
+    bytes_processed: int = 0
+    bytes_billed: int = 0
+    cost_usd: float = 0.0
+    referenced_tables: list = field(default_factory=list)
+    error: str = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def estimate_cost(bytes_processed: int, tables: int = 1, price_per_tib: float = PRICE_PER_TIB) -> tuple:
+    """(bytes faturados, custo em USD) para ``bytes_processed``, com o mínimo de 10 MB por tabela"""
+    if not bytes_processed:
+        return 0, 0.0
+    billed = max(bytes_processed, MIN_BILLED_BYTES_PER_TABLE * max(1, tables))
+    return billed, billed / TIB * price_per_tib
+
+
+def estimate_query(client: bigquery.Client, query: str, query_parameters: list = None, name: str = None,
+                   price_per_tib: float = PRICE_PER_TIB) -> CostEstimate:
+    """Dry run da consulta (nada é executado nem cobrado); erros de validação vão em ``error``"""
+    from google.cloud import bigquery
+
+    estimate = CostEstimate(query=query, name=name)
+    job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False,
+                                         query_parameters=query_parameters or [])
+    try:
+        job = client.query(query, job_config=job_config)
+    except Exception as e:
+        estimate.error = str(e)
+        return estimate
+
+    estimate.bytes_processed = job.total_bytes_processed or 0
+    estimate.referenced_tables = [f"{table.project}.{table.dataset_id}.{table.table_id}"
+                                  for table in (job.referenced_tables or [])]
+    estimate.bytes_billed, estimate.cost_usd = estimate_cost(
+        estimate.bytes_processed, len(estimate.referenced_tables), price_per_tib)
+    return estimate
+
+
+@dataclass
+class PruningEstimate:
+    """Dry run da consulta com o período e da mesma consulta sem limite de tempo"""
+    window: CostEstimate
+    full_scan: CostEstimate
+
+    @property
+    def ok(self) -> bool:
+        return self.window.ok and self.full_scan.ok
+
+    @property
+    def scanned_fraction(self) -> float:
+        """Fração dos bytes da tabela inteira que o período lê (1.0 = sem poda)"""
+        if not self.full_scan.bytes_processed:
+            return 0.0
+        return self.window.bytes_processed / self.full_scan.bytes_processed
+
+    @property
+    def pruned(self) -> bool:
+        return self.ok and (self.window.bytes_processed < self.full_scan.bytes_processed
+                            or not self.full_scan.bytes_processed)
+
+
+def _widest(parameter):
+    # Mesmo parâmetro com o maior valor possível do tipo (início ou fim do período)
+    from google.cloud import bigquery
+
+    if parameter.type_ == "DATE":
+        low, high = datetime.date.min, datetime.date.max
+    else:
+        low = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+        high = datetime.datetime.max.replace(tzinfo=datetime.timezone.utc)
+    return bigquery.ScalarQueryParameter(parameter.name, parameter.type_,
+                                         low if parameter.name == WINDOW_START else high)
+
+
+def estimate_pruning(client: bigquery.Client, query: str, query_parameters: list,
+                     price_per_tib: float = PRICE_PER_TIB) -> PruningEstimate:
+    """Confere, com dois dry runs, se o período da consulta (QueryBuilder.where_window) poda partições.
+
+    O mesmo SQL roda com os parâmetros @window_start/@window_end do período e
+    com eles abertos ao máximo; como as colunas lidas são as mesmas, a
+    diferença de bytes é só a das partições fora do período.
+    """
+    names = {parameter.name for parameter in query_parameters or []}
+    if not {WINDOW_START, WINDOW_END} <= names:
+        raise ValueError("query has no time window (use QueryBuilder.where_window)")
+
+    unbounded = [_widest(parameter) if parameter.name in (WINDOW_START, WINDOW_END) else parameter
+                 for parameter in query_parameters]
+    estimate = PruningEstimate(window=estimate_query(client, query, query_parameters, price_per_tib=price_per_tib),
+                               full_scan=estimate_query(client, query, unbounded, price_per_tib=price_per_tib))
+    if estimate.ok and not estimate.pruned:
+        logger.warning("⚠️ BigQuery: O período não reduziu os bytes lidos (ele cobre todas as partições ou a "
+                       "tabela não é particionada pela coluna do filtro)")
+    return estimate
+
+
+class ByteBudget:
+    """Limite de bytes por consulta e por sessão, conferido antes de executar.
+
+    ``check`` recebe o CostEstimate do dry run: com ``mode="raise"`` recusa a
+    consulta com BudgetExceeded, com ``mode="warn"`` só registra um aviso e
+    deixa executar. Cada consulta liberada soma os bytes estimados ao total
+    da sessão.
+    """
+
+    def __init__(self, per_query_bytes: int = None, per_session_bytes: int = None, mode: str = "raise"):
+        if mode not in ("raise", "warn"):
+            raise ValueError("mode must be 'raise' or 'warn'")
+        if (per_query_bytes is not None and per_query_bytes <= 0) or \
+                (per_session_bytes is not None and per_session_bytes <= 0):
+            raise ValueError("byte limits must be positive")
+
+        self.per_query_bytes = per_query_bytes
+        self.per_session_bytes = per_session_bytes
+        self.mode = mode
+        self.spent_bytes = 0
+        self.queries = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def remaining_bytes(self) -> int:
+        if self.per_session_bytes is None:
+            return None
+        return max(0, self.per_session_bytes - self.spent_bytes)
+
+    def check(self, estimate: CostEstimate) -> None:
+        if estimate.error is not None:
+            raise BudgetExceeded(f"dry run failed: {estimate.error}")
+
+        with self.__lock:
+            problems = []
+            if self.per_query_bytes is not None and estimate.bytes_billed > self.per_query_bytes:
+                problems.append(f"query would bill {estimate.bytes_billed / GIB:.2f} GiB, "
+                                f"limit is {self.per_query_bytes / GIB:.2f} GiB")
+            if self.per_session_bytes is not None and self.spent_bytes + estimate.bytes_billed > self.per_session_bytes:
+                problems.append(f"session would reach {(self.spent_bytes + estimate.bytes_billed) / GIB:.2f} GiB, "
+                                f"limit is {self.per_session_bytes / GIB:.2f} GiB")
+            if problems and self.mode == "raise":
+                raise BudgetExceeded("; ".join(problems))
+            for problem in problems:
+                logger.warning(f"⚠️ BigQuery: {problem} (US$ {estimate.cost_usd:.4f})")
+            self.spent_bytes += estimate.bytes_billed
+            self.queries += 1
+
+    def reset(self) -> None:
+        with self.__lock:
+            self.spent_bytes = 0
+            self.queries = 0
+
+
+def estimate_sql_file(client: bigquery.Client, path: str, price_per_tib: float = PRICE_PER_TIB) -> list:
+    """Estima todas as consultas de um arquivo .sql (ex.: queries_looker_studio.sql)"""
+    return [estimate_query(client, sql, name=name, price_per_tib=price_per_tib)
+            for name, sql in read_sql_file(path).items()]
+
+
+def format_report(estimates: list) -> str:
+    """Tabela em texto com bytes, custo por execução e o total, da consulta mais cara para a mais barata"""
+    lines = [f"{'CONSULTA':<12} {'GiB PROCESSADOS':>16} {'GiB FATURADOS':>14} {'US$':>10}  TABELAS"]
+    for estimate in sorted(estimates, key=lambda item: item.bytes_billed, reverse=True):
+        label = estimate.name or estimate.query[:12]
+        if estimate.error is not None:
+            lines.append(f"{label:<12} {'ERRO':>16}  {estimate.error.splitlines()[0][:80]}")
+            continue
+        lines.append(f"{label:<12} {estimate.bytes_processed / GIB:>16.4f} {estimate.bytes_billed / GIB:>14.4f} "
+                     f"{estimate.cost_usd:>10.4f}  {', '.join(estimate.referenced_tables)}")
+    total = sum(estimate.cost_usd for estimate in estimates)
+    billed = sum(estimate.bytes_billed for estimate in estimates)
+    lines.append(f"{'TOTAL':<12} {'':>16} {billed / GIB:>14.4f} {total:>10.4f}")
+    return "\n".join(lines)
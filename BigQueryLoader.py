@@ -0,0 +1,424 @@
+from __future__ import annotations
+
+import glob
+import io
+import json
+import math
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Mesmos valores de bigquery.SourceFormat/WriteDisposition, sem importar o cliente
+NEWLINE_DELIMITED_JSON = "NEWLINE_DELIMITED_JSON"
+CSV = "CSV"
+PARQUET = "PARQUET"
+WRITE_APPEND = "WRITE_APPEND"
+
+SOURCE_FORMATS = {
+    ".json": NEWLINE_DELIMITED_JSON,
+    ".jsonl": NEWLINE_DELIMITED_JSON,
+    ".ndjson": NEWLINE_DELIMITED_JSON,
+    ".csv": CSV,
+    ".parquet": PARQUET,
+}
+
+DEFAULT_SHARD_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_CONCURRENT = 4
+DEFAULT_CHUNK_ROWS = 50000
+DEFAULT_MAX_BUFFER_BYTES = 64 * 1024 * 1024
+
+
+@dataclass
+class FileOutcome:
+    path: str
+    shard: int
+    bytes: int
+    ok: bool = False
+    job_id: str = None
+    shard_rows: int = None
+    error: Exception = None
+
+
+@dataclass
+class LoadOutcome:
+    rows: int
+    bytes: int
+    ok: bool = False
+    job_id: str = None
+    output_rows: int = None
+    error: Exception = None
+
+
+def expand_sources(sources) -> list:
+    """Aceita arquivo, diretório, glob ou lista deles; retorna os arquivos com formato conhecido"""
+    if isinstance(sources, str):
+        sources = [sources]
+
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            candidates = sorted(os.path.join(source, name) for name in os.listdir(source))
+        elif any(char in source for char in "*?["):
+            candidates = sorted(glob.glob(source, recursive=True))
+        else:
+            candidates = [source]
+        for path in candidates:
+            if os.path.isfile(path) and os.path.splitext(path)[1].lower() in SOURCE_FORMATS and path not in paths:
+                paths.append(path)
+    return paths
+
+
+def plan_shards(paths: list, target_bytes: int = DEFAULT_SHARD_BYTES) -> list:
+    """Agrupa os arquivos em shards de tamanho parecido, um shard por load job.
+
+    NDJSON e CSV do mesmo formato podem ser concatenados num único upload; os
+    arquivos são distribuídos do maior para o menor sempre no shard mais leve.
+    Parquet não pode ser concatenado, então cada arquivo vira um shard.
+    """
+    by_format: dict = {}
+    for path in paths:
+        source_format = SOURCE_FORMATS[os.path.splitext(path)[1].lower()]
+        by_format.setdefault(source_format, []).append((path, os.path.getsize(path)))
+
+    shards = []
+    for source_format, files in by_format.items():
+        if source_format == PARQUET:
+            shards.extend((source_format, [entry]) for entry in files)
+            continue
+
+        total = sum(size for _, size in files)
+        count = max(1, min(len(files), math.ceil(total / target_bytes)))
+        bins = [[0, []] for _ in range(count)]
+        for entry in sorted(files, key=lambda item: item[1], reverse=True):
+            lightest = min(bins, key=lambda item: item[0])
+            lightest[0] += entry[1]
+            lightest[1].append(entry)
+        shards.extend((source_format, entries) for _, entries in bins if entries)
+    return shards
+
+
+class _ConcatenatedFiles(io.RawIOBase):
+    """Stream somente leitura com vários arquivos em sequência, copiado para o arquivo do shard.
+
+    Garante quebra de linha entre arquivos e, para CSV, pula o cabeçalho dos
+    arquivos depois do primeiro. Não aceita seek/tell, por isso não vai
+    direto para o upload (ver _shard_file).
+    """
+
+    def __init__(self, paths: list, skip_header: bool = False):
+        self.__paths = list(paths)
+        self.__skip_header = skip_header
+        self.__current = None
+        self.__index = -1
+        self.__pending_newline = False
+
+    def readable(self) -> bool:
+        return True
+
+    def __open_next(self) -> bool:
+        if self.__current is not None:
+            self.__current.close()
+        self.__index += 1
+        if self.__index >= len(self.__paths):
+            self.__current = None
+            return False
+        self.__current = open(self.__paths[self.__index], "rb")
+        if self.__skip_header and self.__index > 0:
+            self.__current.readline()
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.__pending_newline:
+            buffer[0:1] = b"\n"
+            self.__pending_newline = False
+            return 1
+        while True:
+            if self.__current is None and not self.__open_next():
+                return 0
+            data = self.__current.read(len(buffer))
+            if data:
+                buffer[:len(data)] = data
+                # Arquivo sem "\n" final: insere um antes do próximo arquivo
+                self.__pending_newline = not data.endswith(b"\n") and self.__at_eof()
+                return len(data)
+            self.__current.close()
+            self.__current = None
+            if not self.__open_next():
+                return 0
+
+    def __at_eof(self) -> bool:
+        position = self.__current.tell()
+        return position >= os.fstat(self.__current.fileno()).st_size
+
+    def close(self) -> None:
+        if self.__current is not None:
+            self.__current.close()
+            self.__current = None
+        super().close()
+
+
+def _shard_file(paths: list, skip_header: bool):
+    """Arquivo binário posicionável com o conteúdo do shard.
+
+    O upload do cliente usa tell()/seek() no arquivo: um arquivo sozinho vai
+    direto; vários são juntados num arquivo temporário (o TemporaryFile tem
+    modo "rb+", aceito pelo cliente, ao contrário do SpooledTemporaryFile).
+    """
+    if len(paths) == 1:
+        return open(paths[0], "rb")
+    shard = tempfile.TemporaryFile()
+    try:
+        with _ConcatenatedFiles(paths, skip_header=skip_header) as stream:
+            shutil.copyfileobj(stream, shard, 1024 * 1024)
+    except BaseException:
+        shard.close()
+        raise
+    return shard
+
+
+def load_files(client: bigquery.Client, sources, table: str, schema: list = None,
+               max_concurrent: int = DEFAULT_MAX_CONCURRENT, target_shard_bytes: int = DEFAULT_SHARD_BYTES,
+               csv_skip_header: bool = True,
+               write_disposition: str = WRITE_APPEND) -> list:
+    """Carrega vários arquivos locais em ``table`` com load jobs paralelos.
+
+    Retorna um FileOutcome por arquivo; todos os arquivos de um shard
+    compartilham o resultado do mesmo job.
+    """
+    from google.cloud import bigquery
+
+    if max_concurrent <= 0 or target_shard_bytes <= 0:
+        raise ValueError("max_concurrent and target_shard_bytes must be positive")
+
+    shards = plan_shards(expand_sources(sources), target_shard_bytes)
+    if not shards:
+        return []
+
+    def run(index: int, shard: tuple) -> list:
+        source_format, entries = shard
+        outcomes = [FileOutcome(path=path, shard=index, bytes=size) for path, size in entries]
+        job_config = bigquery.LoadJobConfig(source_format=source_format, write_disposition=write_disposition)
+        if schema is not None:
+            job_config.schema = schema
+        else:
+            job_config.autodetect = True
+        is_csv = source_format == CSV and csv_skip_header
+        if is_csv:
+            job_config.skip_leading_rows = 1
+
+        try:
+            with _shard_file([path for path, _ in entries], skip_header=is_csv) as stream:
+                job = client.load_table_from_file(stream, table, job_config=job_config, rewind=True)
+                job.result()
+            for outcome in outcomes:
+                outcome.ok = True
+                outcome.job_id = job.job_id
+                outcome.shard_rows = job.output_rows
+        except Exception as e:
+            for outcome in outcomes:
+                outcome.error = e
+        return outcomes
+
+    with ThreadPoolExecutor(max_workers=min(max_concurrent, len(shards))) as pool:
+        futures = [pool.submit(run, index, shard) for index, shard in enumerate(shards)]
+        return [outcome for future in futures for outcome in future.result()]
+
+
+def _is_dataframe(records) -> bool:
+    return hasattr(records, "iloc") and hasattr(records, "columns")
+
+
+def _record_chunks(records, chunk_rows: int):
+    if _is_dataframe(records):
+        for start in range(0, len(records), chunk_rows):
+            yield records.iloc[start:start + chunk_rows]
+        return
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def encode_ndjson(records) -> bytes:
+    """Serializa uma lista de dicts ou um DataFrame como NDJSON (usa orjson se instalado)"""
+    if _is_dataframe(records):
+        text = records.to_json(orient="records", lines=True, date_format="iso", force_ascii=False)
+        return text.encode("utf-8") + (b"\n" if text and not text.endswith("\n") else b"")
+    if orjson is not None:
+        return b"".join(orjson.dumps(record, default=str) + b"\n" for record in records)
+    return "".join(json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+                   for record in records).encode("utf-8")
+
+
+# Tipos do BigQuery (legados e GoogleSQL) para os tipos do Arrow gravados no Parquet
+_ARROW_TYPES = {
+    "STRING": lambda pa: pa.string(),
+    "BYTES": lambda pa: pa.binary(),
+    "INTEGER": lambda pa: pa.int64(),
+    "INT64": lambda pa: pa.int64(),
+    "FLOAT": lambda pa: pa.float64(),
+    "FLOAT64": lambda pa: pa.float64(),
+    "NUMERIC": lambda pa: pa.decimal128(38, 9),
+    "BIGNUMERIC": lambda pa: pa.decimal256(76, 38),
+    "BOOLEAN": lambda pa: pa.bool_(),
+    "BOOL": lambda pa: pa.bool_(),
+    "TIMESTAMP": lambda pa: pa.timestamp("us", tz="UTC"),
+    "DATETIME": lambda pa: pa.timestamp("us"),
+    "DATE": lambda pa: pa.date32(),
+    "TIME": lambda pa: pa.time64("us"),
+    "GEOGRAPHY": lambda pa: pa.string(),
+    "JSON": lambda pa: pa.string(),
+}
+
+
+def _arrow_field(schema_field):
+    import pyarrow as pa
+
+    field_type = schema_field.field_type.upper()
+    if field_type in ("RECORD", "STRUCT"):
+        arrow_type = pa.struct([_arrow_field(child) for child in schema_field.fields])
+    elif field_type in _ARROW_TYPES:
+        arrow_type = _ARROW_TYPES[field_type](pa)
+    else:
+        raise ValueError(f"column '{schema_field.name}' has type {field_type}, which has no Parquet mapping")
+    if schema_field.mode == "REPEATED":
+        arrow_type = pa.list_(arrow_type)
+    return pa.field(schema_field.name, arrow_type)
+
+
+def arrow_schema(schema: list):
+    """pyarrow.Schema equivalente ao esquema do BigQuery (SchemaField ou dicts no formato da API)"""
+    import pyarrow as pa
+    from google.cloud import bigquery
+
+    return pa.schema([_arrow_field(bigquery.SchemaField.from_api_repr(dict(schema_field))
+                                   if isinstance(schema_field, dict) else schema_field)
+                      for schema_field in schema])
+
+
+def _to_arrow(records, schema=None):
+    """Bloco de registros como pyarrow.Table; com ``schema`` todos os blocos saem com os mesmos tipos"""
+    import pyarrow as pa
+
+    if schema is None:
+        if _is_dataframe(records):
+            return pa.Table.from_pandas(records, preserve_index=False)
+        return pa.Table.from_pylist(records)
+
+    if _is_dataframe(records):
+        return pa.Table.from_pandas(records, preserve_index=False).select(schema.names).cast(schema)
+    columns = []
+    for arrow_field in schema:
+        values = [record.get(arrow_field.name) for record in records]
+        try:
+            columns.append(pa.array(values, type=arrow_field.type))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Ex.: created_at em texto ISO 8601 numa coluna TIMESTAMP
+            columns.append(pa.array(values).cast(arrow_field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def _table_schema(client: bigquery.Client, table) -> list:
+    try:
+        return client.get_table(table).schema
+    except Exception:
+        return None
+
+
+def load_records(client: bigquery.Client, table: str, records,
+                 source_format: str = NEWLINE_DELIMITED_JSON, schema: list = None,
+                 chunk_rows: int = DEFAULT_CHUNK_ROWS, max_buffer_bytes: int = DEFAULT_MAX_BUFFER_BYTES,
+                 write_disposition: str = WRITE_APPEND) -> list:
+    """Carrega uma lista de dicts (ou DataFrame) via load job, sem arquivo temporário.
+
+    Os registros são codificados em blocos de ``chunk_rows`` num buffer em
+    memória (NDJSON ou Parquet via pyarrow); quando o buffer passa de
+    ``max_buffer_bytes`` ele é enviado como um load job e um novo buffer é
+    iniciado, então a memória fica limitada a um buffer por vez. No Parquet
+    todos os blocos usam o esquema do Arrow derivado de ``schema`` (ou da
+    tabela). Retorna um LoadOutcome por load job; um bloco que não pôde ser
+    codificado vira um LoadOutcome com erro e os demais seguem.
+    """
+    from google.cloud import bigquery
+
+    if source_format not in (NEWLINE_DELIMITED_JSON, PARQUET):
+        raise ValueError("source_format must be NEWLINE_DELIMITED_JSON or PARQUET")
+    if chunk_rows <= 0 or max_buffer_bytes <= 0:
+        raise ValueError("chunk_rows and max_buffer_bytes must be positive")
+
+    is_parquet = source_format == PARQUET
+    parquet_schema = None
+    if is_parquet:
+        import pyarrow.parquet as pq
+
+        # Um único esquema para o arquivo inteiro: inferir bloco a bloco muda os tipos
+        # (ex.: products só com listas vazias vira list<null>) e o ParquetWriter recusa
+        table_schema = schema or _table_schema(client, table)
+        if table_schema:
+            parquet_schema = arrow_schema(table_schema)
+
+    outcomes = []
+    state = {"buffer": io.BytesIO(), "rows": 0, "writer": None}
+
+    def send() -> None:
+        if state["writer"] is not None:
+            state["writer"].close()
+            state["writer"] = None
+        buffer = state["buffer"]
+        outcome = LoadOutcome(rows=state["rows"], bytes=buffer.tell())
+        buffer.seek(0)
+        job_config = bigquery.LoadJobConfig(source_format=source_format, write_disposition=write_disposition)
+        if schema is not None:
+            job_config.schema = schema
+        elif not is_parquet:
+            job_config.autodetect = True
+        try:
+            job = client.load_table_from_file(buffer, table, job_config=job_config, rewind=True)
+            job.result()
+            outcome.ok = True
+            outcome.job_id = job.job_id
+            outcome.output_rows = job.output_rows
+        except Exception as e:
+            outcome.error = e
+        outcomes.append(outcome)
+        state["buffer"], state["rows"] = io.BytesIO(), 0
+
+    for chunk in _record_chunks(records, chunk_rows):
+        try:
+            if is_parquet:
+                arrow_table = _to_arrow(chunk, parquet_schema)
+                if state["writer"] is None:
+                    # Sem esquema da tabela, o primeiro bloco define o dos demais
+                    parquet_schema = arrow_table.schema
+                    state["writer"] = pq.ParquetWriter(state["buffer"], parquet_schema)
+                state["writer"].write_table(arrow_table)
+            else:
+                state["buffer"].write(encode_ndjson(chunk))
+        except Exception as e:
+            # O bloco não entra em nenhum load job: envia o que já estava no buffer e registra a falha
+            if state["rows"]:
+                send()
+            outcomes.append(LoadOutcome(rows=len(chunk), bytes=0, error=e))
+            continue
+        state["rows"] += len(chunk)
+        if state["buffer"].tell() >= max_buffer_bytes:
+            send()
+
+    if state["rows"]:
+        send()
+    return outcomes
@@ -0,0 +1,1118 @@
+from __future__ import annotations
+
+import collections
+import datetime
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from BigQuerySql import _TOKENS, is_read_only, normalize_sql, referenced_tables
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery
+
+# Tipos do esquema do BigQuery -> tipos do DuckDB
+_TYPES = {
+    "STRING": "VARCHAR", "INTEGER": "BIGINT", "INT64": "BIGINT", "FLOAT": "DOUBLE", "FLOAT64": "DOUBLE",
+    "NUMERIC": "DECIMAL(38, 9)", "BIGNUMERIC": "DOUBLE", "BOOLEAN": "BOOLEAN", "BOOL": "BOOLEAN",
+    "TIMESTAMP": "TIMESTAMPTZ", "DATETIME": "TIMESTAMP", "DATE": "DATE", "TIME": "TIME", "BYTES": "BLOB",
+    "JSON": "JSON", "GEOGRAPHY": "VARCHAR",
+}
+# ... e o caminho de volta, para tabelas criadas por SQL (CREATE TABLE AS SELECT)
+_SCHEMA_TYPES = {
+    "VARCHAR": "STRING", "BIGINT": "INTEGER", "INTEGER": "INTEGER", "SMALLINT": "INTEGER", "TINYINT": "INTEGER",
+    "HUGEINT": "INTEGER", "UBIGINT": "INTEGER", "UINTEGER": "INTEGER", "DOUBLE": "FLOAT", "FLOAT": "FLOAT",
+    "BOOLEAN": "BOOLEAN", "TIMESTAMP WITH TIME ZONE": "TIMESTAMP", "TIMESTAMP": "DATETIME", "DATE": "DATE",
+    "TIME": "TIME", "BLOB": "BYTES", "JSON": "JSON",
+}
+# Tamanho lógico por valor usado na estimativa de bytes processados (tipos de tamanho fixo)
+_FIXED_BYTES = {"BIGINT": 8, "INTEGER": 8, "DOUBLE": 8, "BOOLEAN": 1, "DATE": 8, "TIME": 8, "TIMESTAMP": 8,
+                "TIMESTAMP WITH TIME ZONE": 8}
+
+# Funções do BigQuery sem equivalente direto, criadas como macros em cada banco
+_MACROS = [
+    "CREATE OR REPLACE MACRO _bq_timestamp(x) AS CAST(x AS TIMESTAMPTZ)",
+    "CREATE OR REPLACE MACRO _bq_datetime(x) AS CAST(x AS TIMESTAMP)",
+    "CREATE OR REPLACE MACRO date(x) AS CAST(x AS DATE)",
+    "CREATE OR REPLACE MACRO format_date(fmt, d) AS strftime(CAST(d AS DATE), fmt)",
+    "CREATE OR REPLACE MACRO format_timestamp(fmt, t) AS strftime(t, fmt)",
+    "CREATE OR REPLACE MACRO date_sub(d, i) AS CAST(d - i AS DATE)",
+    "CREATE OR REPLACE MACRO date_add(d, i) AS CAST(d + i AS DATE)",
+    "CREATE OR REPLACE MACRO timestamp_sub(t, i) AS t - i",
+    "CREATE OR REPLACE MACRO timestamp_add(t, i) AS t + i",
+    "CREATE OR REPLACE MACRO array_length(a) AS len(a)",
+    "CREATE OR REPLACE MACRO safe_divide(a, b) AS CASE WHEN b = 0 THEN NULL ELSE a / b END",
+    "CREATE OR REPLACE MACRO parse_json(x) AS CAST(x AS JSON)",
+    "CREATE OR REPLACE MACRO to_json_string(x) AS CAST(to_json(x) AS VARCHAR)",
+    "CREATE OR REPLACE MACRO generate_uuid() AS CAST(gen_random_uuid() AS VARCHAR)",
+    "CREATE OR REPLACE MACRO logical_or(x) AS bool_or(x)",
+    "CREATE OR REPLACE MACRO logical_and(x) AS bool_and(x)",
+]
+
+_CLAUSE_WORDS = {"WHERE", "ON", "JOIN", "LEFT", "RIGHT", "INNER", "CROSS", "FULL", "GROUP", "ORDER", "LIMIT",
+                 "HAVING", "WINDOW", "QUALIFY", "UNION", "EXCEPT", "INTERSECT", "AND", "OR", "USING", "WITH",
+                 "WHEN", "THEN", "SET"}
+_PLACEHOLDER = re.compile(r"\x00(\d+)\x00")
+_UNNEST_ALIAS = re.compile(r"\bUNNEST\s*(\((?:[^()]|\([^()]*\))*\))\s+(?:AS\s+)?([A-Za-z_]\w*)", re.IGNORECASE)
+_STRUCT = re.compile(r"\bSTRUCT\s*\(", re.IGNORECASE)
+_IN_UNNEST = re.compile(r"\bIN\s+UNNEST\s*(\((?:[^()]|\([^()]*\))*\))", re.IGNORECASE)
+_STRING_AGG_LIMIT = re.compile(r"\bSTRING_AGG\s*\(\s*(DISTINCT\s+)?([^,()]+?)\s*,\s*(\x00\d+\x00)\s+LIMIT\s+(\d+)\s*\)",
+                               re.IGNORECASE)
+_TRUNC = re.compile(r"\b(?:DATE|TIMESTAMP|DATETIME)_TRUNC\s*\(\s*([^,()]+(?:\([^()]*\))?)\s*,\s*([A-Za-z]+)\s*\)",
+                    re.IGNORECASE)
+_THREE_PART = re.compile(r"\b(FROM|JOIN|INTO|UPDATE|MERGE|USING|TABLE)\s+[A-Za-z_][\w\-]*\.([A-Za-z_]\w*)\.([A-Za-z_]\w*)",
+                         re.IGNORECASE)
+_CAST_TYPES = re.compile(r"\bAS\s+(STRING|INT64|FLOAT64|BOOL|TIMESTAMP|DATETIME|BYTES|NUMERIC|BIGNUMERIC)\b(?!\s*')",
+                         re.IGNORECASE)
+_TABLE_OPTIONS = re.compile(
+    r"\s+PARTITION\s+BY\s+.*?(?=\s+CLUSTER\s+BY\b|\s+OPTIONS\s*\(|$)"
+    r"|\s+CLUSTER\s+BY\s+[\w\s,]+?(?=\s+OPTIONS\s*\(|$)"
+    r"|\s+OPTIONS\s*\((?:[^()]|\([^()]*\))*\)",
+    re.IGNORECASE | re.DOTALL,
+)
+_BOUND_VALUE = r"(?:(?:TIMESTAMP|DATETIME|DATE)\s*\(?\s*)?(@\w+|'[^']*')(?:\s*\))?"
+_INSERT_TARGET = re.compile(r"\s*INSERT\s+(?:INTO\s+)?(`[^`]+`|[\w.\-]+)", re.IGNORECASE)
+_RENAME = re.compile(r"\s*ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(`[^`]+`|[\w.\-]+)\s+RENAME\s+TO\s+(`[^`]+`|[\w\-]+)\s*$",
+                     re.IGNORECASE)
+
+
+def _duckdb():
+    try:
+        import duckdb
+    except ImportError as e:
+        raise RuntimeError("Error importing duckdb: pip install duckdb to use LocalClient") from e
+    return duckdb
+
+
+def duckdb_type(field: bigquery.SchemaField) -> str:
+    """Tipo DuckDB de um SchemaField (RECORD vira STRUCT, REPEATED vira lista)"""
+    if field.field_type in ("RECORD", "STRUCT"):
+        members = ", ".join(f'"{sub.name}" {duckdb_type(sub)}' for sub in field.fields)
+        column = f"STRUCT({members})"
+    else:
+        column = _TYPES.get(field.field_type, "VARCHAR")
+    return f"{column}[]" if field.mode == "REPEATED" else column
+
+
+def _column_definition(field: bigquery.SchemaField) -> str:
+    """Coluna do CREATE TABLE; REQUIRED vira NOT NULL, então cargas com NULL falham como no BigQuery"""
+    definition = f'"{field.name}" {duckdb_type(field)}'
+    return f"{definition} NOT NULL" if field.mode == "REQUIRED" else definition
+
+
+def _schema_field(name: str, column_type) -> bigquery.SchemaField:
+    from google.cloud import bigquery
+
+    mode = "NULLABLE"
+    if column_type.id == "list":
+        mode = "REPEATED"
+        column_type = column_type.child
+    if column_type.id == "struct":
+        return bigquery.SchemaField(name, "RECORD", mode=mode, fields=[
+            _schema_field(sub_name, sub_type) for sub_name, sub_type in column_type.children])
+    base = str(column_type).split("(")[0].strip()
+    field_type = "NUMERIC" if base == "DECIMAL" else _SCHEMA_TYPES.get(base, "STRING")
+    return bigquery.SchemaField(name, field_type, mode=mode)
+
+
+def _parameter_type(parameter_type: dict) -> str:
+    kind = parameter_type["type"]
+    if kind == "ARRAY":
+        return f"{_parameter_type(parameter_type['arrayType'])}[]"
+    if kind == "STRUCT":
+        members = ", ".join(f'"{member["name"]}" {_parameter_type(member["type"])}'
+                            for member in parameter_type["structTypes"])
+        return f"STRUCT({members})"
+    return _TYPES.get(kind, "VARCHAR")
+
+
+def _parameter_value(parameter_type: dict, parameter_value: dict):
+    kind = parameter_type["type"]
+    if kind == "ARRAY":
+        return [_parameter_value(parameter_type["arrayType"], item)
+                for item in parameter_value.get("arrayValues") or []]
+    if kind == "STRUCT":
+        values = parameter_value.get("structValues") or {}
+        return {member["name"]: _parameter_value(member["type"], values.get(member["name"], {}))
+                for member in parameter_type["structTypes"]}
+    return parameter_value.get("value")
+
+
+def query_parameters(parameters: list) -> tuple:
+    """Parâmetros do BigQuery como ({nome: valor}, {nome: tipo DuckDB}), a partir do to_api_repr de cada um"""
+    values, types = {}, {}
+    for parameter in parameters or []:
+        representation = parameter.to_api_repr()
+        name = representation["name"]
+        values[name] = _parameter_value(representation["parameterType"], representation["parameterValue"])
+        types[name] = _parameter_type(representation["parameterType"])
+    return values, types
+
+
+def _split_arguments(text: str) -> list:
+    """Argumentos separados pelas vírgulas do nível de cima (fora de parênteses)"""
+    arguments, depth, start = [], 0, 0
+    for position, char in enumerate(text):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            arguments.append(text[start:position])
+            start = position + 1
+    arguments.append(text[start:])
+    return [argument.strip() for argument in arguments]
+
+
+def _struct_constructors(text: str) -> str:
+    """STRUCT(expr AS nome, ...) do BigQuery vira struct_pack(nome := expr, ...)"""
+    output, last = [], 0
+    for match in _STRUCT.finditer(text):
+        if match.start() < last:
+            continue
+        depth, end = 1, match.end()
+        while depth and end < len(text):
+            depth += {"(": 1, ")": -1}.get(text[end], 0)
+            end += 1
+        members = []
+        for argument in _split_arguments(text[match.end():end - 1]):
+            alias = re.match(r"(.*)\s+AS\s+([A-Za-z_]\w*)$", argument, re.IGNORECASE | re.DOTALL)
+            if alias is None:
+                break
+            members.append(f"{alias.group(2)} := {_struct_constructors(alias.group(1))}")
+        else:
+            output.append(f"{text[last:match.start()]}struct_pack({', '.join(members)})")
+            last = end
+    output.append(text[last:])
+    return "".join(output)
+
+
+def translate_sql(sql: str, parameter_types: dict = None) -> str:
+    """Reescreve o SQL do BigQuery no dialeto do DuckDB (só o subconjunto usado no projeto).
+
+    Nomes entre crases viram "dataset"."tabela" (o projeto é ignorado),
+    @parâmetros viram $parâmetros com CAST para o tipo declarado, ``UNNEST(x)
+    AS p`` ganha alias de coluna, ``IN UNNEST(@lista)`` vira subconsulta,
+    ``STRUCT(expr AS nome)`` vira struct_pack e PARTITION BY/CLUSTER BY/OPTIONS
+    de CREATE TABLE são descartados.
+    """
+    parameter_types = parameter_types or {}
+    literals = []
+
+    def hide(text: str) -> str:
+        literals.append(text)
+        return f"\x00{len(literals) - 1}\x00"
+
+    parts, last = [], 0
+    for match in _TOKENS.finditer(sql):
+        parts.append(sql[last:match.start()])
+        kind, text = match.lastgroup, match.group()
+        if kind == "string":
+            if text.startswith('"'):
+                text = "'" + text[1:-1].replace("\\\"", "\"").replace("'", "''") + "'"
+            parts.append(hide(text))
+        elif kind == "quoted":
+            names = text.strip("`").split(".")
+            parts.append(hide(".".join(f'"{name}"' for name in names[-2:])))
+        else:
+            parts.append(" ")
+        last = match.end()
+    parts.append(sql[last:])
+    text = re.sub(r" +", " ", "".join(parts)).strip().rstrip(";")
+
+    text = _THREE_PART.sub(lambda m: f'{m.group(1)} "{m.group(2)}"."{m.group(3)}"', text)
+    text = re.sub(r"^\s*MERGE\s+(?!INTO\b)", "MERGE INTO ", text, flags=re.IGNORECASE)
+    if re.match(r"^\s*CREATE\b", text, re.IGNORECASE):
+        body = re.search(r"\bAS\s*\(?\s*(?:SELECT|WITH)\b", text, re.IGNORECASE)
+        split = body.start() if body else len(text)
+        header = _TABLE_OPTIONS.sub("", text[:split])
+        header = re.sub(r"\b(STRING|INT64|FLOAT64|BOOL|TIMESTAMP|BYTES)\b",
+                        lambda m: _TYPES[m.group(1).upper()], header, flags=re.IGNORECASE)
+        text = header + " " + text[split:]
+
+    text = _IN_UNNEST.sub(lambda m: f"IN (SELECT UNNEST{m.group(1)})", text)
+    text = _struct_constructors(text)
+
+    def unnest_alias(match) -> str:
+        alias = match.group(2)
+        if alias.upper() in _CLAUSE_WORDS:
+            return match.group()
+        return f"UNNEST{match.group(1)} AS _unnest_{alias}({alias})"
+
+    text = _UNNEST_ALIAS.sub(unnest_alias, text)
+    text = _STRING_AGG_LIMIT.sub(
+        lambda m: f"array_to_string(list_slice(list({m.group(1) or ''}{m.group(2)}), 1, {m.group(4)}), {m.group(3)})",
+        text)
+    text = _TRUNC.sub(lambda m: f"date_trunc('{m.group(2).lower()}', {m.group(1)})", text)
+    text = re.sub(r"\bCURRENT_(TIMESTAMP|DATETIME)\s*\(\s*\)", "current_timestamp", text, flags=re.IGNORECASE)
+    text = re.sub(r"\bTIMESTAMP\s*\(", "_bq_timestamp(", text, flags=re.IGNORECASE)
+    text = re.sub(r"\bDATETIME\s*\(", "_bq_datetime(", text, flags=re.IGNORECASE)
+    text = re.sub(r"\bSAFE_CAST\s*\(", "TRY_CAST(", text, flags=re.IGNORECASE)
+    text = re.sub(r"\bCOUNTIF\s*\(", "count_if(", text, flags=re.IGNORECASE)
+    text = _CAST_TYPES.sub(lambda m: f"AS {_TYPES[m.group(1).upper()]}", text)
+
+    def parameter(match) -> str:
+        name = match.group(1)
+        if name in parameter_types:
+            return f"CAST(${name} AS {parameter_types[name]})"
+        return f"${name}"
+
+    text = re.sub(r"@([A-Za-z_]\w*)", parameter, text)
+    return _PLACEHOLDER.sub(lambda m: literals[int(m.group(1))], text)
+
+
+def _table_key(table) -> tuple:
+    """(dataset, tabela) de um Table/TableReference ou de 'projeto.dataset.tabela'/'dataset.tabela'"""
+    if hasattr(table, "dataset_id") and hasattr(table, "table_id"):
+        return table.dataset_id, table.table_id
+    names = str(table).strip("`").split(".")
+    if len(names) < 2:
+        raise ValueError(f"table name must include the dataset: {table}")
+    return names[-2], names[-1]
+
+
+def _without_literals(sql: str) -> str:
+    """SQL normalizado sem strings (identificadores entre crases ficam)"""
+    return _TOKENS.sub(lambda m: " " if m.lastgroup != "quoted" else m.group(), normalize_sql(sql))
+
+
+def _bound_time(text) -> tuple:
+    """(datetime UTC, é só data) de um literal ou valor de parâmetro; None se não for uma data"""
+    text = str(text).strip()
+    try:
+        if len(text) == 10:
+            day = datetime.date.fromisoformat(text)
+            return datetime.datetime(day.year, day.month, day.day, tzinfo=datetime.timezone.utc), True
+        value = datetime.datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc), False
+
+
+def _partition_bounds(sql: str, column: str, values: dict = None) -> tuple:
+    """Período [início, fim) que o WHERE impõe à coluna de partição, como na poda estática do BigQuery.
+
+    Reconhece ``coluna <op> constante``, ``DATE(coluna) <op> constante`` e
+    BETWEEN, com literais ou parâmetros, todos ligados por AND; None se não
+    houver nenhum.
+    """
+    values = values or {}
+    target = rf"(DATE\s*\(\s*)?(?:\w+\.)?`?\b{re.escape(column)}\b`?(?(1)\s*\))"
+    comparison = re.compile(rf"{target}\s*(>=|<=|<>|!=|=|<|>)\s*{_BOUND_VALUE}", re.IGNORECASE)
+    between = re.compile(rf"{target}\s+BETWEEN\s+{_BOUND_VALUE}\s+AND\s+{_BOUND_VALUE}", re.IGNORECASE)
+
+    def resolve(token: str):
+        return _bound_time(values.get(token[1:]) if token.startswith("@") else token.strip("'"))
+
+    def after(bound: tuple, by_day: bool):
+        return bound[0] + (datetime.timedelta(days=1) if by_day or bound[1] else datetime.timedelta(microseconds=1))
+
+    low, high, found = None, None, False
+    normalized = normalize_sql(sql)
+    for match in between.finditer(normalized):
+        first, last = resolve(match.group(2)), resolve(match.group(3))
+        if first is None or last is None:
+            continue
+        low = max(low or first[0], first[0])
+        high = min(high or after(last, bool(match.group(1))), after(last, bool(match.group(1))))
+        found = True
+    for match in comparison.finditer(normalized):
+        bound, operator = resolve(match.group(3)), match.group(2)
+        if bound is None or operator in ("<>", "!="):
+            continue
+        by_day = bool(match.group(1))
+        if operator in (">=", "="):
+            low = max(low or bound[0], bound[0])
+        if operator == ">":
+            low = max(low or after(bound, by_day), after(bound, by_day))
+        if operator == "<":
+            high = min(high or bound[0], bound[0])
+        if operator in ("<=", "="):
+            high = min(high or after(bound, by_day), after(bound, by_day))
+        found = True
+    return (low, high) if found else None
+
+
+def _partition_end(start: datetime.datetime, partition_type: str) -> datetime.datetime:
+    if partition_type == "HOUR":
+        return start + datetime.timedelta(hours=1)
+    if partition_type == "MONTH":
+        return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    if partition_type == "YEAR":
+        return start.replace(year=start.year + 1)
+    return start + datetime.timedelta(days=1)
+
+
+def _statement_type(sql: str) -> str:
+    words = normalize_sql(sql).lstrip("(").split(None, 4)
+    first = words[0].upper() if words else ""
+    if first in ("SELECT", "WITH"):
+        return "SELECT"
+    if first == "CREATE":
+        rest = " ".join(words[1:]).upper()
+        if "TABLE" in rest:
+            return "CREATE_TABLE_AS_SELECT" if re.search(r"\bAS\b", normalize_sql(sql), re.IGNORECASE) \
+                else "CREATE_TABLE"
+        return "CREATE_" + (words[1].upper() if len(words) > 1 else "")
+    return first
+
+
+def _not_found(message: str):
+    from google.api_core import exceptions
+    return exceptions.NotFound(message)
+
+
+def _bad_request(message: str):
+    from google.api_core import exceptions
+    return exceptions.BadRequest(message)
+
+
+def _arrow(relation):
+    # to_arrow_table substituiu fetch_arrow_table no DuckDB 1.4
+    if hasattr(relation, "to_arrow_table"):
+        table = relation.to_arrow_table()
+    else:
+        table = relation.fetch_arrow_table()
+    return _integer_sums(table)
+
+
+def _integer_sums(table):
+    """SUM de inteiros sai como HUGEINT (DECIMAL(38, 0)) no DuckDB; no BigQuery o resultado é INT64.
+
+    NUMERIC vira DECIMAL(38, 9), então escala 0 só aparece nessas somas.
+    """
+    import pyarrow as pa
+
+    for i, arrow_field in enumerate(table.schema):
+        if pa.types.is_decimal(arrow_field.type) and arrow_field.type.scale == 0:
+            table = table.set_column(i, arrow_field.name, table.column(i).cast(pa.int64()))
+    return table
+
+
+class LocalRowIterator:
+    """Resultado já materializado (pyarrow.Table) com a interface do RowIterator usada no projeto.
+
+    As páginas são fatias de ``page_size`` linhas e cada página buscada paga a
+    latência simulada do cliente, como um getQueryResults/tabledata.list.
+    """
+
+    def __init__(self, table, page_size: int = None, max_results: int = None, fetch_page=None):
+        if max_results is not None:
+            table = table.slice(0, max_results)
+        self.__table = table
+        self.__page_size = page_size or max(1, table.num_rows)
+        self.__fetch_page = fetch_page
+        self.total_rows = table.num_rows
+
+    @property
+    def schema(self) -> list:
+        return [_schema_field(name, column_type) for name, column_type in self.__column_types()]
+
+    def __column_types(self) -> list:
+        duckdb = _duckdb()
+        relation = duckdb.from_arrow(self.__table.slice(0, 0))
+        return list(zip(relation.columns, relation.types))
+
+    def __batches(self):
+        for start in range(0, max(self.__table.num_rows, 1), self.__page_size):
+            page = self.__table.slice(start, self.__page_size)
+            if self.__fetch_page is not None:
+                self.__fetch_page(page.nbytes)
+            yield page
+
+    @property
+    def pages(self):
+        from google.cloud.bigquery.table import Row
+
+        field_to_index = {name: i for i, name in enumerate(self.__table.column_names)}
+        for page in self.__batches():
+            columns = [column.to_pylist() for column in page.columns]
+            yield [Row(values, field_to_index) for values in zip(*columns)] if columns else []
+
+    def __iter__(self):
+        for page in self.pages:
+            yield from page
+
+    def to_arrow(self, *args, **kwargs):
+        import pyarrow
+
+        batches = [batch for page in self.__batches() for batch in page.to_batches()]
+        return pyarrow.Table.from_batches(batches, schema=self.__table.schema)
+
+    def to_arrow_iterable(self, *args, **kwargs):
+        for page in self.__batches():
+            yield from page.to_batches()
+
+    def to_dataframe(self, *args, **kwargs):
+        return self.to_arrow().to_pandas()
+
+
+class LocalJob:
+    """QueryJob/LoadJob local: roda numa thread do cliente e expõe as estatísticas que o projeto lê"""
+
+    def __init__(self, job_type: str, query: str = None, dry_run: bool = False):
+        self.job_id = f"local_{uuid.uuid4().hex}"
+        self.job_type = job_type
+        self.query = query
+        self.dry_run = dry_run
+        self.statement_type = _statement_type(query) if query else None
+        self.created = time.time()
+        self.ended = None
+        self.total_bytes_processed = 0
+        self.total_bytes_billed = 0
+        self.slot_millis = 0
+        self.cache_hit = False
+        self.num_dml_affected_rows = None
+        self.output_rows = None
+        self.referenced_tables = []
+        self.errors = None
+        self.__future = None
+        self.__rows = None
+
+    @property
+    def state(self) -> str:
+        return "DONE" if self.done() else "RUNNING"
+
+    def _start(self, future) -> None:
+        self.__future = future
+
+    def _finish(self, rows=None, error: Exception = None) -> None:
+        self.ended = time.time()
+        self.__rows = rows
+        if error is not None:
+            self.errors = [{"reason": "invalidQuery", "message": str(error)}]
+
+    def done(self, *args, **kwargs) -> bool:
+        return self.__future is None or self.__future.done()
+
+    def running(self) -> bool:
+        return not self.done()
+
+    def cancel(self, *args, **kwargs) -> bool:
+        return self.__future is not None and self.__future.cancel()
+
+    def exception(self, *args, **kwargs):
+        if self.__future is None or not self.__future.done():
+            return None
+        return self.__future.exception()
+
+    def result(self, page_size: int = None, max_results: int = None, timeout: float = None, **kwargs):
+        if self.__future is not None:
+            self.__future.result(timeout=timeout)
+        if self.job_type != "query":
+            return self
+        table, fetch_page = self.__rows
+        return LocalRowIterator(table, page_size=page_size, max_results=max_results, fetch_page=fetch_page)
+
+    def to_dataframe(self, *args, **kwargs):
+        return self.result().to_dataframe()
+
+    def to_arrow(self, *args, **kwargs):
+        return self.result().to_arrow()
+
+
+class LocalClient:
+    """Substituto em processo do bigquery.Client, sobre um banco DuckDB, para medir sem a nuvem.
+
+    Implementa o subconjunto que o projeto usa (query, insert_rows_json,
+    load_table_from_file/json, get_table, list_rows, create/delete_table e
+    datasets). Cada dataset é um schema do DuckDB; o SQL passa por
+    ``translate_sql``. ``latency`` (segundos) é somada a cada requisição e
+    ``bandwidth`` (bytes/s), se informado, simula o tempo de envio/recebimento
+    dos corpos. Consultas rodam em ``max_concurrent_jobs`` threads: leituras em
+    paralelo e escritas uma por vez, como DML na mesma tabela no BigQuery. Os
+    insertIds do streaming insert são deduplicados dentro de ``dedup_window``
+    segundos. ``total_bytes_processed`` é uma aproximação: o tamanho lógico das
+    colunas citadas no SQL, só das partições que o WHERE não descarta
+    (comparações da coluna de partição com constantes). Tabelas criadas com
+    ``require_partition_filter`` recusam consultas sem filtro na coluna de
+    partição.
+    """
+
+    def __init__(self, project: str = "local-project", database: str = ":memory:", latency: float = 0.0,
+                 bandwidth: float = None, max_concurrent_jobs: int = 8, dedup_window: float = 60.0):
+        if latency < 0 or (bandwidth is not None and bandwidth <= 0):
+            raise ValueError("latency must be >= 0 and bandwidth positive")
+
+        duckdb = _duckdb()
+        self.project = project
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.dedup_window = dedup_window
+        self.__connection = duckdb.connect(database)
+        for macro in _MACROS:
+            self.__connection.execute(macro)
+        self.__local = threading.local()
+        self.__write_lock = threading.RLock()
+        self.__stats_lock = threading.Lock()
+        self.__executor = ThreadPoolExecutor(max_workers=max_concurrent_jobs, thread_name_prefix="local-bigquery")
+        self.__tables: dict = {}
+        self.__column_bytes: dict = {}
+        self.__partition_bytes: dict = {}
+        self.__insert_ids: dict = {}
+        self.__requests = collections.Counter()
+        self.__bytes_sent = 0
+        self.__bytes_received = 0
+
+    # ----- infraestrutura -----
+
+    def __cursor(self):
+        cursor = getattr(self.__local, "cursor", None)
+        if cursor is None:
+            cursor = self.__connection.cursor()
+            cursor.execute("SET TimeZone = 'UTC'")
+            self.__local.cursor = cursor
+        return cursor
+
+    def __request(self, method: str, sent: int = 0, received: int = 0) -> None:
+        """Conta a requisição e dorme a latência simulada (mais o tempo de transferência)"""
+        with self.__stats_lock:
+            self.__requests[method] += 1
+            self.__bytes_sent += sent
+            self.__bytes_received += received
+        delay = self.latency
+        if self.bandwidth:
+            delay += (sent + received) / self.bandwidth
+        if delay:
+            time.sleep(delay)
+
+    def __fetch_page(self, size: int) -> None:
+        self.__request("getQueryResults", received=size)
+
+    def stats(self) -> dict:
+        with self.__stats_lock:
+            return {"requests": dict(self.__requests), "total_requests": sum(self.__requests.values()),
+                    "bytes_sent": self.__bytes_sent, "bytes_received": self.__bytes_received}
+
+    def reset_stats(self) -> None:
+        with self.__stats_lock:
+            self.__requests.clear()
+            self.__bytes_sent = 0
+            self.__bytes_received = 0
+
+    def close(self) -> None:
+        self.__executor.shutdown(wait=True)
+        self.__connection.close()
+
+    def __exists(self, key: tuple) -> bool:
+        rows = self.__cursor().execute(
+            "SELECT 1 FROM information_schema.tables WHERE table_schema = ? AND table_name = ?", list(key)).fetchall()
+        return bool(rows)
+
+    def __require(self, key: tuple) -> None:
+        if not self.__exists(key):
+            raise _not_found(f"Not found: Table {self.project}:{key[0]}.{key[1]}")
+
+    def __schema(self, key: tuple) -> list:
+        properties = self.__tables.get(key)
+        if properties is not None and properties.get("schema"):
+            from google.cloud import bigquery
+            return bigquery.Table.from_api_repr(properties).schema
+        relation = self.__cursor().table(f'"{key[0]}"."{key[1]}"')
+        return [_schema_field(name, column_type) for name, column_type in zip(relation.columns, relation.types)]
+
+    def __changed(self, key: tuple) -> None:
+        self.__column_bytes.pop(key, None)
+        self.__partition_bytes.pop(key, None)
+
+    # ----- datasets e tabelas -----
+
+    def create_dataset(self, dataset, exists_ok: bool = False, **kwargs):
+        from google.api_core import exceptions
+        from google.cloud import bigquery
+
+        dataset_id = getattr(dataset, "dataset_id", None) or str(dataset).split(".")[-1]
+        self.__request("datasets.insert")
+        with self.__write_lock:
+            exists = self.__cursor().execute(
+                "SELECT 1 FROM information_schema.schemata WHERE schema_name = ?", [dataset_id]).fetchall()
+            if exists and not exists_ok:
+                raise exceptions.Conflict(f"Already Exists: Dataset {self.project}:{dataset_id}")
+            self.__cursor().execute(f'CREATE SCHEMA IF NOT EXISTS "{dataset_id}"')
+        return bigquery.Dataset(f"{self.project}.{dataset_id}")
+
+    def get_dataset(self, dataset, **kwargs):
+        from google.cloud import bigquery
+
+        dataset_id = getattr(dataset, "dataset_id", None) or str(dataset).split(".")[-1]
+        self.__request("datasets.get")
+        exists = self.__cursor().execute(
+            "SELECT 1 FROM information_schema.schemata WHERE schema_name = ?", [dataset_id]).fetchall()
+        if not exists:
+            raise _not_found(f"Not found: Dataset {self.project}:{dataset_id}")
+        return bigquery.Dataset(f"{self.project}.{dataset_id}")
+
+    def list_datasets(self, *args, **kwargs) -> list:
+        from google.cloud import bigquery
+
+        self.__request("datasets.list")
+        rows = self.__cursor().execute(
+            "SELECT schema_name FROM information_schema.schemata "
+            "WHERE catalog_name = current_database() AND schema_name NOT IN ('main', 'information_schema', "
+            "'pg_catalog') ORDER BY schema_name").fetchall()
+        return [bigquery.Dataset(f"{self.project}.{name}") for name, in rows]
+
+    def list_tables(self, dataset, **kwargs) -> list:
+        from google.cloud import bigquery
+
+        dataset_id = getattr(dataset, "dataset_id", None) or str(dataset).split(".")[-1]
+        self.__request("tables.list")
+        rows = self.__cursor().execute(
+            "SELECT table_name FROM information_schema.tables WHERE table_schema = ? ORDER BY table_name",
+            [dataset_id]).fetchall()
+        return [bigquery.Table(f"{self.project}.{dataset_id}.{name}") for name, in rows]
+
+    def create_table(self, table, exists_ok: bool = False, **kwargs) -> bigquery.Table:
+        """Cria a tabela com o esquema do bigquery.Table; particionamento, clustering e labels ficam só nos metadados"""
+        from google.api_core import exceptions
+        from google.cloud import bigquery
+
+        if isinstance(table, str):
+            table = bigquery.Table(table)
+        key = _table_key(table)
+        self.__request("tables.insert")
+        with self.__write_lock:
+            if self.__exists(key):
+                if exists_ok:
+                    return self.get_table(table)
+                raise exceptions.Conflict(f"Already Exists: Table {self.project}:{key[0]}.{key[1]}")
+            if not table.schema:
+                raise _bad_request(f"Table {key[0]}.{key[1]} needs a schema")
+            columns = ", ".join(_column_definition(field) for field in table.schema)
+            cursor = self.__cursor()
+            cursor.execute(f'CREATE SCHEMA IF NOT EXISTS "{key[0]}"')
+            cursor.execute(f'CREATE TABLE "{key[0]}"."{key[1]}" ({columns})')
+            properties = table.to_api_repr()
+            properties["tableReference"] = {"projectId": self.project, "datasetId": key[0], "tableId": key[1]}
+            self.__tables[key] = properties
+            self.__changed(key)
+        return self.get_table(table)
+
+    def get_table(self, table, **kwargs) -> bigquery.Table:
+        from google.cloud import bigquery
+
+        key = _table_key(table)
+        self.__request("tables.get")
+        self.__require(key)
+        properties = dict(self.__tables.get(key) or {})
+        properties["tableReference"] = {"projectId": self.project, "datasetId": key[0], "tableId": key[1]}
+        properties["schema"] = {"fields": [field.to_api_repr() for field in self.__schema(key)]}
+        rows, = self.__cursor().execute(f'SELECT count(*) FROM "{key[0]}"."{key[1]}"').fetchone()
+        properties["numRows"] = str(rows)
+        properties["numBytes"] = str(sum(self.__table_column_bytes(key).values()))
+        return bigquery.Table.from_api_repr(properties)
+
+    def update_table(self, table: bigquery.Table, fields: list, **kwargs) -> bigquery.Table:
+        key = _table_key(table)
+        self.__request("tables.patch")
+        self.__require(key)
+        stored = self.__tables.setdefault(key, {})
+        representation = table.to_api_repr()
+        for name in fields:
+            api_name = table._PROPERTY_TO_API_FIELD.get(name, name)
+            stored[api_name] = representation.get(api_name)
+        return self.get_table(table)
+
+    def delete_table(self, table, not_found_ok: bool = False, **kwargs) -> None:
+        key = _table_key(table)
+        self.__request("tables.delete")
+        with self.__write_lock:
+            if not self.__exists(key):
+                if not_found_ok:
+                    return
+                raise _not_found(f"Not found: Table {self.project}:{key[0]}.{key[1]}")
+            self.__cursor().execute(f'DROP TABLE "{key[0]}"."{key[1]}"')
+            self.__tables.pop(key, None)
+            self.__insert_ids.pop(key, None)
+            self.__changed(key)
+
+    def list_rows(self, table, selected_fields: list = None, max_results: int = None, page_size: int = None,
+                  start_index: int = None, **kwargs) -> LocalRowIterator:
+        key = _table_key(table)
+        self.__require(key)
+        names = [field.name for field in selected_fields] if selected_fields else None
+        columns = ", ".join(f'"{name}"' for name in names) if names else "*"
+        sql = f'SELECT {columns} FROM "{key[0]}"."{key[1]}"'
+        if max_results is not None:
+            sql += f" LIMIT {int(max_results)}"
+        if start_index:
+            sql += f" OFFSET {int(start_index)}"
+        result = _arrow(self.__cursor().execute(sql))
+        return LocalRowIterator(result, page_size=page_size,
+                                fetch_page=lambda size: self.__request("tabledata.list", received=size))
+
+    # ----- bytes processados -----
+
+    def __table_column_bytes(self, key: tuple) -> dict:
+        """Tamanho lógico de cada coluna (fixo por tipo; texto e aninhados pelo tamanho do texto)"""
+        cached = self.__column_bytes.get(key)
+        if cached is not None:
+            return cached
+        columns, expressions = self.__size_expressions(key)
+        sizes = self.__cursor().execute(f'SELECT {", ".join(expressions)} FROM "{key[0]}"."{key[1]}"').fetchone() \
+            if expressions else []
+        cached = dict(zip(columns, (int(size or 0) for size in sizes)))
+        self.__column_bytes[key] = cached
+        return cached
+
+    def __size_expressions(self, key: tuple) -> tuple:
+        relation = self.__cursor().table(f'"{key[0]}"."{key[1]}"')
+        expressions = []
+        for name, column_type in zip(relation.columns, relation.types):
+            base = str(column_type)
+            if base in _FIXED_BYTES:
+                expressions.append(f'count("{name}") * {_FIXED_BYTES[base]}')
+            else:
+                expressions.append(f'coalesce(sum(strlen(CAST("{name}" AS VARCHAR)) + 2), 0)')
+        return relation.columns, expressions
+
+    def __partition_column_bytes(self, key: tuple, column: str, partition_type: str) -> list:
+        """[(início da partição, {coluna: bytes})]; a partição das linhas com a coluna nula tem início None"""
+        cached = self.__partition_bytes.get(key)
+        if cached is not None:
+            return cached
+        columns, expressions = self.__size_expressions(key)
+        rows = self.__cursor().execute(
+            f"SELECT epoch_us(CAST(date_trunc('{partition_type.lower()}', \"{column}\") AS TIMESTAMP)), "
+            f'{", ".join(expressions)} FROM "{key[0]}"."{key[1]}" GROUP BY 1').fetchall()
+        epoch = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+        cached = [(None if start is None else epoch + datetime.timedelta(microseconds=start),
+                   dict(zip(columns, (int(size or 0) for size in sizes)))) for start, *sizes in rows]
+        self.__partition_bytes[key] = cached
+        return cached
+
+    def __scanned_column_bytes(self, key: tuple, sql: str, values: dict = None) -> dict:
+        """Bytes por coluna das partições que o WHERE não descarta (a tabela toda se não for particionada)"""
+        partitioning = (self.__tables.get(key) or {}).get("timePartitioning") or {}
+        column = partitioning.get("field")
+        bounds = _partition_bounds(sql, column, values) if column else None
+        if bounds is None:
+            return self.__table_column_bytes(key)
+        low, high = bounds
+        partition_type = partitioning.get("type", "DAY")
+        totals = collections.Counter()
+        for start, sizes in self.__partition_column_bytes(key, column, partition_type):
+            if start is None or (high is not None and start >= high) or \
+                    (low is not None and _partition_end(start, partition_type) <= low):
+                continue
+            totals.update(sizes)
+        return totals
+
+    def __estimate_bytes(self, sql: str, values: dict = None) -> tuple:
+        """(bytes lidos, tabelas citadas): colunas citadas (ou todas, com SELECT *) das partições lidas de cada tabela"""
+        literals_removed = _without_literals(sql)
+        words = {word.lower() for word in re.findall(r"[A-Za-z_]\w*", literals_removed)}
+        star = re.search(r"\bSELECT\s+(?:DISTINCT\s+)?(?:\w+\.)?\*", literals_removed, re.IGNORECASE)
+        insert_target = _INSERT_TARGET.match(normalize_sql(sql))
+        total, tables = 0, []
+        for name in sorted(referenced_tables(sql)):
+            key = _table_key(name)
+            if not self.__exists(key):
+                continue
+            tables.append(key)
+            if insert_target and _table_key(insert_target.group(1)) == key:
+                continue
+            for column, size in self.__scanned_column_bytes(key, sql, values).items():
+                if star or column.lower() in words:
+                    total += size
+        return total, tables
+
+    def __check_partition_filter(self, sql: str) -> None:
+        """Recusa, como o BigQuery, ler tabela com require_partition_filter sem filtrar a coluna de partição.
+
+        Aproximação: basta a coluna aparecer depois de um WHERE ou ON.
+        """
+        if _statement_type(sql) in ("ALTER", "DROP", "TRUNCATE", "CREATE_TABLE"):
+            return
+        literals_removed = _without_literals(sql)
+        insert_target = _INSERT_TARGET.match(normalize_sql(sql))
+        for name in referenced_tables(sql):
+            key = _table_key(name)
+            properties = self.__tables.get(key) or {}
+            if not properties.get("requirePartitionFilter"):
+                continue
+            if insert_target and _table_key(insert_target.group(1)) == key:
+                continue
+            column = (properties.get("timePartitioning") or {}).get("field") or "_PARTITIONTIME"
+            if not re.search(rf"\b(?:WHERE|ON)\b.*\b{re.escape(column)}\b", literals_removed, re.IGNORECASE):
+                raise _bad_request(f"Cannot query over table '{key[0]}.{key[1]}' without a filter over column(s) "
+                                   f"'{column}' that can be used for partition elimination")
+
+    def __renamed(self, source: tuple, target: tuple) -> None:
+        """Leva os metadados (particionamento, clustering, labels) e os insertIds para o novo nome"""
+        properties = self.__tables.pop(source, None)
+        if properties is not None:
+            properties["tableReference"] = {"projectId": self.project, "datasetId": target[0], "tableId": target[1]}
+            self.__tables[target] = properties
+        if source in self.__insert_ids:
+            self.__insert_ids[target] = self.__insert_ids.pop(source)
+        self.__changed(source)
+        self.__changed(target)
+
+    # ----- consultas -----
+
+    def query(self, query: str, job_config: bigquery.QueryJobConfig = None, job_id: str = None,
+              **kwargs) -> LocalJob:
+        """Cria o job (uma requisição) e executa em segundo plano; erros aparecem em result()"""
+        from google.cloud import bigquery
+
+        parameters = list(getattr(job_config, "query_parameters", None) or [])
+        dry_run = bool(getattr(job_config, "dry_run", False))
+        values, types = query_parameters(parameters)
+        sql = translate_sql(query, types)
+        self.__request("jobs.insert", sent=len(query.encode("utf-8")) + len(json.dumps(values, default=str)))
+
+        if dry_run:
+            job = LocalJob("query", query=query, dry_run=True)
+            try:
+                self.__cursor().execute("EXPLAIN " + sql, values or None)
+            except Exception as e:
+                if not self.__missing_table_in_ddl(query):
+                    raise _bad_request(str(e)) from e
+            self.__check_partition_filter(query)
+            job.total_bytes_processed, tables = self.__estimate_bytes(query, values)
+            job.referenced_tables = [bigquery.TableReference.from_string(f"{self.project}.{d}.{t}")
+                                     for d, t in tables]
+            job._finish()
+            return job
+
+        job = LocalJob("query", query=query)
+        if job_id:
+            job.job_id = job_id
+        job._start(self.__executor.submit(self.__run_query, job, query, sql, values))
+        return job
+
+    def __missing_table_in_ddl(self, query: str) -> bool:
+        # CREATE TABLE ... AS SELECT de uma tabela nova não passa no EXPLAIN antes do schema existir
+        return _statement_type(query).startswith("CREATE")
+
+    def __run_query(self, job: LocalJob, query: str, sql: str, values: dict) -> None:
+        from google.cloud import bigquery
+
+        started = time.perf_counter()
+        read_only = is_read_only(query)
+        try:
+            self.__check_partition_filter(query)
+            job.total_bytes_processed, tables = self.__estimate_bytes(query, values)
+            job.total_bytes_billed = job.total_bytes_processed
+            job.referenced_tables = [bigquery.TableReference.from_string(f"{self.project}.{d}.{t}")
+                                     for d, t in tables]
+            if read_only:
+                result = _arrow(self.__cursor().execute(sql, values or None))
+            else:
+                with self.__write_lock:
+                    cursor = self.__cursor()
+                    for dataset_id in {_table_key(name)[0] for name in referenced_tables(query)}:
+                        cursor.execute(f'CREATE SCHEMA IF NOT EXISTS "{dataset_id}"')
+                    result = _arrow(cursor.execute(sql, values or None))
+                    rename = _RENAME.match(normalize_sql(query))
+                    if rename:
+                        source = _table_key(rename.group(1))
+                        self.__renamed(source, (source[0], rename.group(2).strip("`")))
+                    for name in referenced_tables(query):
+                        key = _table_key(name)
+                        self.__changed(key)
+                        if job.statement_type.startswith(("CREATE", "DROP", "ALTER")) and not rename:
+                            self.__tables.pop(key, None)
+                if job.statement_type in ("INSERT", "UPDATE", "DELETE", "MERGE"):
+                    job.num_dml_affected_rows = int(result.column(0)[0].as_py()) if result.num_rows else 0
+                result = result.slice(0, 0).select([]) if result.num_columns else result
+        except Exception as e:
+            job._finish(error=e)
+            raise _bad_request(str(e)) from e
+        job.slot_millis = int((time.perf_counter() - started) * 1000)
+        job._finish(rows=(result, self.__fetch_page))
+
+    # ----- streaming insert e load jobs -----
+
+    def __insert_ndjson(self, key: tuple, path: str, schema: list = None, source_format: str = "NEWLINE_DELIMITED_JSON",
+                        write_disposition: str = None, skip_leading_rows: int = 0) -> int:
+        """Lê o arquivo com o leitor do DuckDB e insere por nome de coluna; cria a tabela se preciso"""
+        cursor = self.__cursor()
+        exists = self.__exists(key)
+        if schema is None and exists:
+            schema = self.__schema(key)
+        columns = {field.name: duckdb_type(field) for field in schema} if schema else None
+
+        if source_format == "PARQUET":
+            reader = "read_parquet(?)"
+        elif source_format == "CSV":
+            options = f", header = {'true' if skip_leading_rows else 'false'}"
+            if columns:
+                options += f", columns = {columns!r}"
+                options += f", skip = {max(0, skip_leading_rows - 1)}" if skip_leading_rows > 1 else ""
+            reader = f"read_csv(?{options})"
+        else:
+            options = f", columns = {columns!r}" if columns else ""
+            reader = f"read_json(?, format = 'newline_delimited'{options})"
+
+        table = f'"{key[0]}"."{key[1]}"'
+        cursor.execute(f'CREATE SCHEMA IF NOT EXISTS "{key[0]}"')
+        if not exists:
+            if columns:
+                definition = ", ".join(_column_definition(field) for field in schema)
+                cursor.execute(f"CREATE TABLE {table} ({definition})")
+            else:
+                cursor.execute(f"CREATE TABLE {table} AS SELECT * FROM {reader} LIMIT 0", [path])
+        elif write_disposition == "WRITE_TRUNCATE":
+            cursor.execute(f"DELETE FROM {table}")
+        elif write_disposition == "WRITE_EMPTY" and cursor.execute(f"SELECT count(*) FROM {table}").fetchone()[0]:
+            raise _bad_request(f"Table {key[0]}.{key[1]} is not empty")
+        rows, = cursor.execute(f"INSERT INTO {table} BY NAME SELECT * FROM {reader}", [path]).fetchone()
+        self.__changed(key)
+        return rows
+
+    def insert_rows_json(self, table, json_rows: list, row_ids: list = None, skip_invalid_rows: bool = None,
+                         ignore_unknown_values: bool = None, **kwargs) -> list:
+        """tabledata.insertAll: campo desconhecido ou REQUIRED vazio invalida a linha (as demais voltam "stopped")"""
+        key = _table_key(table)
+        body = [json.dumps(row, ensure_ascii=False, default=str) for row in json_rows]
+        self.__request("insertAll", sent=sum(len(line) for line in body) + 2 * len(body))
+        self.__require(key)
+        schema = self.__schema(key)
+        names = {field.name for field in schema}
+        required = [field.name for field in schema if field.mode == "REQUIRED"]
+        row_ids = list(row_ids) if isinstance(row_ids, (list, tuple)) else [None] * len(json_rows)
+
+        errors = []
+        keep = []
+        for index, row in enumerate(json_rows):
+            unknown = [name for name in row if name not in names]
+            missing = [name for name in required if row.get(name) is None]
+            if unknown and not ignore_unknown_values:
+                errors.append({"index": index, "errors": [
+                    {"reason": "invalid", "location": unknown[0], "message": f"no such field: {unknown[0]}."}]})
+            elif missing:
+                errors.append({"index": index, "errors": [{"reason": "invalid", "location": missing[0],
+                                                           "message": f"Missing required field: {missing[0]}."}]})
+            else:
+                keep.append(index)
+        if errors and not skip_invalid_rows:
+            failed = {error["index"] for error in errors}
+            errors.extend({"index": index, "errors": [{"reason": "stopped", "message": ""}]}
+                          for index in range(len(json_rows)) if index not in failed)
+            return sorted(errors, key=lambda error: error["index"])
+
+        with self.__write_lock:
+            seen = self.__insert_ids.setdefault(key, collections.OrderedDict())
+            now = time.monotonic()
+            while seen and next(iter(seen.values())) < now - self.dedup_window:
+                seen.popitem(last=False)
+            lines = []
+            for index in keep:
+                insert_id = row_ids[index]
+                if insert_id is not None:
+                    if insert_id in seen:
+                        continue
+                    seen[insert_id] = now
+                row = json_rows[index]
+                if ignore_unknown_values:
+                    row = {name: value for name, value in row.items() if name in names}
+                    lines.append(json.dumps(row, ensure_ascii=False, default=str))
+                else:
+                    lines.append(body[index])
+            if lines:
+                self.__load_lines(key, lines)
+        return errors
+
+    def __load_lines(self, key: tuple, lines: list, schema: list = None, write_disposition: str = None) -> int:
+        handle, path = tempfile.mkstemp(suffix=".json", prefix="local_bigquery_")
+        try:
+            with os.fdopen(handle, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines))
+            return self.__insert_ndjson(key, path, schema=schema, write_disposition=write_disposition)
+        finally:
+            os.remove(path)
+
+    def load_table_from_file(self, file_obj, destination, rewind: bool = False, size: int = None, job_config=None,
+                             **kwargs) -> LocalJob:
+        """Lê o arquivo como o cliente real: modo binário, e sem ``size`` o upload resumável começa em tell()"""
+        if rewind:
+            file_obj.seek(0, os.SEEK_SET)
+        mode = getattr(file_obj, "mode", None)
+        if mode is not None and mode not in ("rb", "r+b", "rb+"):
+            raise ValueError("Cannot upload files opened in text mode:  use "
+                             "open(filename, mode='rb') or open(filename, mode='r+b')")
+        if size is None:
+            file_obj.tell()
+            data = file_obj.read()
+        else:
+            data = file_obj.read(size)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.__request("jobs.insert(load)", sent=len(data))
+
+        source_format = getattr(job_config, "source_format", None) or "CSV"
+        suffix = {"PARQUET": ".parquet", "CSV": ".csv"}.get(source_format, ".json")
+        handle, path = tempfile.mkstemp(suffix=suffix, prefix="local_bigquery_")
+        try:
+            with os.fdopen(handle, "wb") as f:
+                f.write(data)
+            return self.__load(destination, path, job_config, source_format)
+        finally:
+            os.remove(path)
+
+    def load_table_from_json(self, json_rows: list, destination, job_config=None, **kwargs) -> LocalJob:
+        lines = [json.dumps(row, ensure_ascii=False, default=str) for row in json_rows]
+        self.__request("jobs.insert(load)", sent=sum(len(line) + 1 for line in lines))
+        handle, path = tempfile.mkstemp(suffix=".json", prefix="local_bigquery_")
+        try:
+            with os.fdopen(handle, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines))
+            return self.__load(destination, path, job_config, "NEWLINE_DELIMITED_JSON")
+        finally:
+            os.remove(path)
+
+    def __load(self, destination, path: str, job_config, source_format: str) -> LocalJob:
+        key = _table_key(destination)
+        schema = list(getattr(job_config, "schema", None) or []) or None
+        job = LocalJob("load")
+        started = time.perf_counter()
+        try:
+            with self.__write_lock:
+                job.output_rows = self.__insert_ndjson(
+                    key, path, schema=schema, source_format=source_format,
+                    write_disposition=getattr(job_config, "write_disposition", None),
+                    skip_leading_rows=getattr(job_config, "skip_leading_rows", None) or 0)
+        except Exception as e:
+            job._finish(error=e)
+            raise _bad_request(str(e)) from e
+        job.slot_millis = int((time.perf_counter() - started) * 1000)
+        job._finish()
+        return job
+
+
+class LocalPool:
+    """Pool com a interface do ClientPool que entrega sempre o mesmo LocalClient.
+
+    Passado como ``BigQuery(pool=LocalPool(...))`` dispensa o arquivo de
+    credenciais: todas as operações da classe rodam contra o banco local.
+    """
+
+    def __init__(self, client: LocalClient = None, **client_options):
+        self.client = client if client is not None else LocalClient(**client_options)
+        self.references = 0
+        self.__lock = threading.Lock()
+
+    def acquire(self, credentials_path: str = None, project: str = None) -> LocalClient:
+        with self.__lock:
+            self.references += 1
+            return self.client
+
+    def release(self, client: LocalClient) -> None:
+        with self.__lock:
+            self.references = max(0, self.references - 1)
+
+    def credentials(self, credentials_path: str = None):
+        return None
+
+    def stats(self) -> dict:
+        return {"clients": 1, "credentials": 0, "references": self.references}
@@ -0,0 +1,193 @@
+import contextlib
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+
+logger = logging.getLogger(__name__)
+
+# Limites (segundos) do histograma de latência exportado
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+@dataclass
+class OperationEvent:
+    """Uma chamada medida (make_query, set_data, load_records...) e o que ela custou"""
+    operation: str
+    target: str = None
+    seconds: float = 0.0
+    ok: bool = True
+    error: str = None
+    rows: int = 0
+    bytes_sent: int = 0
+    bytes_processed: int = 0
+    bytes_billed: int = 0
+    slot_millis: int = 0
+    cache_hit: bool = False
+    jobs: int = 0
+    job_id: str = None
+    started_at: float = field(default_factory=time.time)
+
+    def record_job(self, job) -> None:
+        """Soma as estatísticas de um QueryJob/LoadJob terminado (campos ausentes contam como 0)"""
+        self.jobs += 1
+        self.job_id = getattr(job, "job_id", None) or self.job_id
+        self.bytes_processed += getattr(job, "total_bytes_processed", None) or 0
+        self.bytes_billed += getattr(job, "total_bytes_billed", None) or 0
+        self.slot_millis += getattr(job, "slot_millis", None) or 0
+        self.cache_hit = self.cache_hit or bool(getattr(job, "cache_hit", False))
+
+
+class Metrics:
+    """Distribui cada OperationEvent para os hooks registrados.
+
+    Um hook é qualquer função que recebe o evento (InMemoryCollector,
+    LoggingHook ou um exportador próprio). Sem hooks, medir custa só o
+    relógio. Erros dentro de um hook são registrados no log e não afetam a
+    operação medida.
+    """
+
+    def __init__(self, hooks: list = None):
+        self.__hooks = list(hooks or [])
+        self.__lock = threading.Lock()
+
+    def add_hook(self, hook) -> None:
+        with self.__lock:
+            self.__hooks = self.__hooks + [hook]
+
+    def remove_hook(self, hook) -> None:
+        with self.__lock:
+            self.__hooks = [registered for registered in self.__hooks if registered is not hook]
+
+    def emit(self, event: OperationEvent) -> None:
+        for hook in self.__hooks:
+            try:
+                hook(event)
+            except Exception:
+                logger.exception("metrics hook %r failed", hook)
+
+    @contextlib.contextmanager
+    def measure(self, operation: str, target: str = None):
+        """Mede o bloco; o evento é entregue para ser completado (rows, record_job...) e emitido no fim"""
+        event = OperationEvent(operation=operation, target=target)
+        started = time.perf_counter()
+        try:
+            yield event
+        except BaseException as e:
+            event.ok = False
+            event.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            event.seconds = time.perf_counter() - started
+            self.emit(event)
+
+
+class InMemoryCollector:
+    """Guarda os últimos ``max_events`` eventos e agrega totais por (operação, alvo)"""
+
+    def __init__(self, max_events: int = 10000, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.events = deque(maxlen=max_events)
+        self.__totals: dict = {}
+        self.__lock = threading.Lock()
+
+    def __call__(self, event: OperationEvent) -> None:
+        key = (event.operation, event.target or "")
+        with self.__lock:
+            self.events.append(event)
+            totals = self.__totals.get(key)
+            if totals is None:
+                totals = self.__totals[key] = {
+                    "count": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0, "rows": 0, "bytes_sent": 0,
+                    "bytes_processed": 0, "bytes_billed": 0, "slot_millis": 0, "cache_hits": 0, "jobs": 0,
+                    "buckets": [0] * len(self.buckets),
+                }
+            totals["count"] += 1
+            totals["errors"] += 0 if event.ok else 1
+            totals["seconds"] += event.seconds
+            totals["max_seconds"] = max(totals["max_seconds"], event.seconds)
+            for name in ("rows", "bytes_sent", "bytes_processed", "bytes_billed", "slot_millis", "jobs"):
+                totals[name] += getattr(event, name)
+            totals["cache_hits"] += 1 if event.cache_hit else 0
+            for i, limit in enumerate(self.buckets):
+                if event.seconds <= limit:
+                    totals["buckets"][i] += 1
+
+    def totals(self) -> dict:
+        """{(operação, alvo): totais}; os buckets do histograma são cumulativos"""
+        with self.__lock:
+            return {key: {**totals, "buckets": list(totals["buckets"])} for key, totals in self.__totals.items()}
+
+    def slowest(self, limit: int = 10) -> list:
+        with self.__lock:
+            return sorted(self.events, key=lambda event: event.seconds, reverse=True)[:limit]
+
+    def costliest(self, limit: int = 10) -> list:
+        with self.__lock:
+            return sorted(self.events, key=lambda event: event.bytes_billed or event.bytes_processed,
+                          reverse=True)[:limit]
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.events.clear()
+            self.__totals.clear()
+
+    def to_prometheus(self, prefix: str = "bigquery") -> str:
+        return to_prometheus(self, prefix)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(operation: str, target: str, **extra) -> str:
+    values = {"operation": operation, **({"target": target} if target else {}), **extra}
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in values.items()) + "}"
+
+
+def to_prometheus(collector: InMemoryCollector, prefix: str = "bigquery") -> str:
+    """Totais do coletor no formato texto do Prometheus (aceito também por coletores OpenMetrics)"""
+    counters = [
+        ("operations_total", "count", "Operações executadas"),
+        ("operation_errors_total", "errors", "Operações que terminaram com exceção"),
+        ("rows_total", "rows", "Linhas enviadas ou carregadas"),
+        ("sent_bytes_total", "bytes_sent", "Bytes enviados nas requisições"),
+        ("processed_bytes_total", "bytes_processed", "Bytes processados informados pelos jobs"),
+        ("billed_bytes_total", "bytes_billed", "Bytes faturados informados pelos jobs"),
+        ("slot_milliseconds_total", "slot_millis", "Milissegundos de slot consumidos pelos jobs"),
+        ("cache_hits_total", "cache_hits", "Resultados servidos de cache (local ou do BigQuery)"),
+        ("jobs_total", "jobs", "Jobs do BigQuery criados"),
+    ]
+    totals = collector.totals()
+    lines = []
+    for name, key, description in counters:
+        lines.append(f"# HELP {prefix}_{name} {description}")
+        lines.append(f"# TYPE {prefix}_{name} counter")
+        for (operation, target), values in sorted(totals.items()):
+            lines.append(f"{prefix}_{name}{_labels(operation, target)} {values[key]}")
+
+    name = f"{prefix}_operation_duration_seconds"
+    lines.append(f"# HELP {name} Duração das operações")
+    lines.append(f"# TYPE {name} histogram")
+    for (operation, target), values in sorted(totals.items()):
+        for limit, count in zip(collector.buckets, values["buckets"]):
+            lines.append(f"{name}_bucket{_labels(operation, target, le=limit)} {count}")
+        lines.append(f"{name}_bucket{_labels(operation, target, le='+Inf')} {values['count']}")
+        lines.append(f"{name}_sum{_labels(operation, target)} {values['seconds']}")
+        lines.append(f"{name}_count{_labels(operation, target)} {values['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class LoggingHook:
+    """Registra cada evento no log, com os campos em ``extra["bigquery"]`` para formatadores estruturados"""
+
+    def __init__(self, log: logging.Logger = None, level: int = logging.DEBUG):
+        self.log = log or logger
+        self.level = level
+
+    def __call__(self, event: OperationEvent) -> None:
+        level = self.level if event.ok else max(self.level, logging.WARNING)
+        self.log.log(level, "%s %s: %.3fs, %d linhas, %d bytes processados%s", event.operation,
+                     event.target or "-", event.seconds, event.rows, event.bytes_processed,
+                     "" if event.ok else f" ({event.error})", extra={"bigquery": asdict(event)})
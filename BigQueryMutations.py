@@ -0,0 +1,428 @@
+from __future__ import annotations
+
+import json
+import uuid
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from BigQueryBuilder import Query, QueryBuilder
+from BigQueryCost import estimate_query
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery
+
+    from BigQueryCost import ByteBudget
+
+DEFAULT_MERGE_THRESHOLD = 1000
+DEFAULT_CHUNK_SIZE = 10000
+# Limite de 10 MB por requisição de consulta; os parâmetros entram nessa conta
+DEFAULT_MAX_PARAMETER_BYTES = 8 * 1024 * 1024
+
+# Nomes legados do esquema -> tipos GoogleSQL aceitos em parâmetros
+_PARAMETER_TYPES = {
+    "INTEGER": "INT64",
+    "FLOAT": "FLOAT64",
+    "BOOLEAN": "BOOL",
+    "JSON": "STRING",
+}
+
+
+@dataclass
+class MutationResult:
+    strategy: str
+    affected_rows: int = 0
+    jobs: list = field(default_factory=list)
+    # Bytes estimados pelos dry runs (só quando há orçamento)
+    estimated_bytes: int = 0
+
+
+@dataclass
+class DeleteResult:
+    dry_run: bool
+    bytes_processed: int = 0
+    affected_rows: int = None
+    job_id: str = None
+
+
+def delete_where(client: bigquery.Client, query: Query, dry_run: bool = False,
+                 budget: ByteBudget = None) -> DeleteResult:
+    """Executa um DELETE com o filtro inteiro no WHERE (um único job, sem SELECT prévio).
+
+    Com ``dry_run`` o BigQuery só valida a consulta e informa quantos bytes
+    seriam lidos; nada é apagado. Com ``budget`` o DELETE passa antes por um
+    dry run e pelo ByteBudget.check.
+    """
+    if not query.sql.lstrip().upper().startswith("DELETE"):
+        raise ValueError("delete_where expects a DELETE statement")
+
+    if dry_run:
+        job = client.query(query.sql, job_config=query.job_config(dry_run=True, use_query_cache=False))
+        return DeleteResult(dry_run=True, bytes_processed=job.total_bytes_processed or 0)
+
+    if budget is not None:
+        budget.check(estimate_query(client, query.sql, query.parameters))
+    job = client.query(query.sql, job_config=query.job_config())
+    job.result()
+    return DeleteResult(dry_run=False, bytes_processed=job.total_bytes_processed or 0,
+                        affected_rows=job.num_dml_affected_rows or 0, job_id=job.job_id)
+
+
+class BatchMutation:
+    """Acumula updates (chave -> novos valores) e deletes e aplica tudo de uma vez.
+
+    Lotes pequenos viram poucos DML ``... WHERE chave IN UNNEST(@ids)`` (um por
+    grupo de valores iguais, em pedaços de ``chunk_size`` ids). A partir de
+    ``merge_threshold`` chaves, as mudanças são carregadas numa tabela
+    temporária com um único load job e aplicadas com um único MERGE.
+
+    Com ``budget`` (ByteBudget) cada DML passa antes por um dry run; no modo
+    em pedaços todos são conferidos antes do primeiro rodar, para um lote
+    recusado não ficar aplicado pela metade.
+    """
+
+    def __init__(self, table: str, key_column: str = "_id", merge_threshold: int = DEFAULT_MERGE_THRESHOLD,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        if merge_threshold <= 0 or chunk_size <= 0:
+            raise ValueError("merge_threshold and chunk_size must be positive")
+
+        self.table = table.strip("`")
+        self.key_column = key_column
+        self.merge_threshold = merge_threshold
+        self.chunk_size = chunk_size
+        self.__updates: dict = {}
+        self.__deletes: set = set()
+
+    def update(self, key, values: dict) -> "BatchMutation":
+        if not values:
+            raise ValueError("values must not be empty")
+        if self.key_column in values:
+            raise ValueError(f"cannot update the key column {self.key_column}")
+        if key not in self.__deletes:
+            self.__updates.setdefault(key, {}).update(values)
+        return self
+
+    def delete(self, key) -> "BatchMutation":
+        self.__updates.pop(key, None)
+        self.__deletes.add(key)
+        return self
+
+    def __len__(self) -> int:
+        return len(self.__updates) + len(self.__deletes)
+
+    def clear(self) -> None:
+        self.__updates.clear()
+        self.__deletes.clear()
+
+    def apply(self, client: bigquery.Client, budget: ByteBudget = None) -> MutationResult:
+        if not self:
+            return MutationResult(strategy="noop")
+        if len(self) >= self.merge_threshold:
+            result = self.__apply_merge(client, budget)
+        else:
+            result = self.__apply_chunked(client, budget)
+        self.clear()
+        return result
+
+    @staticmethod
+    def __check(client: bigquery.Client, budget: ByteBudget, result: MutationResult, statements: list) -> None:
+        if budget is None:
+            return
+        estimates = [estimate_query(client, sql, parameters) for sql, parameters in statements]
+        for estimate in estimates:
+            budget.check(estimate)
+            result.estimated_bytes += estimate.bytes_processed
+
+    def __run(self, client: bigquery.Client, result: MutationResult, sql: str, parameters: list) -> None:
+        from google.cloud import bigquery
+
+        job = client.query(sql, job_config=bigquery.QueryJobConfig(query_parameters=parameters))
+        job.result()
+        result.jobs.append(job.job_id)
+        result.affected_rows += job.num_dml_affected_rows or 0
+
+    def __chunks(self, keys: list):
+        for start in range(0, len(keys), self.chunk_size):
+            yield keys[start:start + self.chunk_size]
+
+    def __apply_chunked(self, client: bigquery.Client, budget: ByteBudget = None) -> MutationResult:
+        result = MutationResult(strategy="chunked")
+        statements = []
+
+        for keys in self.__chunks(sorted(self.__deletes, key=str)):
+            query = QueryBuilder.delete(self.table).where_in(self.key_column, keys).build()
+            statements.append((query.sql, query.parameters))
+
+        # Agrupa chaves que recebem exatamente os mesmos valores num único UPDATE
+        groups: dict = {}
+        for key, values in self.__updates.items():
+            signature = json.dumps(values, sort_keys=True, default=str)
+            groups.setdefault(signature, (values, []))[1].append(key)
+
+        for values, keys in groups.values():
+            for chunk in self.__chunks(keys):
+                builder = QueryBuilder.update(self.table)
+                for column, value in sorted(values.items()):
+                    builder.set(column, value)
+                query = builder.where_in(self.key_column, chunk).build()
+                statements.append((query.sql, query.parameters))
+
+        self.__check(client, budget, result, statements)
+        for sql, parameters in statements:
+            self.__run(client, result, sql, parameters)
+        return result
+
+    def __apply_merge(self, client: bigquery.Client, budget: ByteBudget = None) -> MutationResult:
+        from google.cloud import bigquery
+
+        result = MutationResult(strategy="merge")
+        target = client.get_table(self.table)
+        fields = {schema_field.name: schema_field for schema_field in target.schema}
+        if self.key_column not in fields:
+            raise ValueError(f"key column {self.key_column} not found in {self.table}")
+
+        columns = sorted({column for values in self.__updates.values() for column in values})
+        missing = [column for column in columns if column not in fields]
+        if missing:
+            raise ValueError(f"columns not found in {self.table}: {missing}")
+
+        schema = [
+            bigquery.SchemaField(self.key_column, fields[self.key_column].field_type, mode="REQUIRED"),
+            bigquery.SchemaField("_op", "STRING", mode="REQUIRED"),
+        ]
+        for column in columns:
+            # Linhas de DELETE e updates parciais deixam a coluna NULL: no staging ela nunca é REQUIRED
+            target_field = fields[column]
+            schema.append(bigquery.SchemaField(column, target_field.field_type,
+                                               mode="REPEATED" if target_field.mode == "REPEATED" else "NULLABLE",
+                                               fields=target_field.fields))
+            schema.append(bigquery.SchemaField(f"_set_{column}", "BOOL"))
+
+        rows = [{self.key_column: key, "_op": "DELETE"} for key in self.__deletes]
+        for key, values in self.__updates.items():
+            row = {self.key_column: key, "_op": "UPDATE"}
+            for column in columns:
+                row[f"_set_{column}"] = column in values
+                if column in values:
+                    row[column] = values[column]
+            rows.append(row)
+
+        dataset = self.table.rsplit(".", 1)[0]
+        staging = f"{dataset}._batch_mutation_{uuid.uuid4().hex}"
+        try:
+            load_job = client.load_table_from_json(rows, staging, job_config=bigquery.LoadJobConfig(
+                schema=schema, write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE))
+            load_job.result()
+            result.jobs.append(load_job.job_id)
+
+            sql = (f"MERGE `{self.table}` T USING `{staging}` S "
+                   f"ON T.{self.key_column} = S.{self.key_column} "
+                   f"WHEN MATCHED AND S._op = 'DELETE' THEN DELETE")
+            if columns:
+                assignments = ", ".join(f"{column} = IF(S._set_{column}, S.{column}, T.{column})"
+                                        for column in columns)
+                sql += f" WHEN MATCHED AND S._op = 'UPDATE' THEN UPDATE SET {assignments}"
+            self.__check(client, budget, result, [(sql, [])])
+            self.__run(client, result, sql, [])
+        finally:
+            client.delete_table(staging, not_found_ok=True)
+        return result
+
+
+def _plan(schema: list) -> list:
+    """Esquema como tuplas (nome, tipo, repetido, subcampos); ler SchemaField.fields recria objetos a cada acesso"""
+    plan = []
+    for schema_field in schema:
+        is_record = schema_field.field_type in ("RECORD", "STRUCT")
+        plan.append((schema_field.name, schema_field.field_type, schema_field.mode == "REPEATED",
+                     _plan(schema_field.fields) if is_record else None))
+    return plan
+
+
+def _scalar_type(field_type: str) -> str:
+    return _PARAMETER_TYPES.get(field_type, field_type)
+
+
+def _nullable_record(field: tuple) -> bool:
+    return field[3] is not None and not field[2]
+
+
+def _null_flag(name: str) -> str:
+    # Parâmetros STRUCT não têm valor NULL: cada RECORD não repetido leva uma
+    # marca BOOL irmã e o INSERT troca o STRUCT por NULL quando ela é verdadeira
+    return f"_null_{name}"
+
+
+def _struct_type(plan: list, name: str = None) -> bigquery.StructQueryParameterType:
+    from google.cloud import bigquery
+
+    members = []
+    for plan_field in plan:
+        members.append(_parameter_type(plan_field, plan_field[0]))
+        if _nullable_record(plan_field):
+            members.append(bigquery.ScalarQueryParameterType("BOOL", name=_null_flag(plan_field[0])))
+    return bigquery.StructQueryParameterType(*members, name=name)
+
+
+def _parameter_type(field: tuple, name: str = None):
+    from google.cloud import bigquery
+
+    _, field_type, repeated, subfields = field
+    if subfields is not None:
+        element = _struct_type(subfields)
+    else:
+        element = bigquery.ScalarQueryParameterType(_scalar_type(field_type))
+    if repeated:
+        return bigquery.ArrayQueryParameterType(element, name=name)
+    if subfields is not None:
+        return _struct_type(subfields, name)
+    return bigquery.ScalarQueryParameterType(_scalar_type(field_type), name=name)
+
+
+def _repeated_values(field: tuple, value) -> list:
+    """Itens de um campo REPEATED: lista/tupla, ou texto com um array JSON"""
+    if value is None:
+        return []
+    if isinstance(value, (str, bytes)):
+        try:
+            value = json.loads(value)
+        except ValueError as e:
+            raise ValueError(f"REPEATED field {field[0]} got a string that is not a JSON array") from e
+        if not isinstance(value, list):
+            raise ValueError(f"REPEATED field {field[0]} got a string that is not a JSON array")
+    elif isinstance(value, dict):
+        raise ValueError(f"REPEATED field {field[0]} got a dict, expected a list")
+    return list(value)
+
+
+def _field_parameter(field: tuple, value):
+    """Converte o valor de uma coluna num parâmetro tipado (campo de um STRUCT)"""
+    from google.cloud import bigquery
+
+    name, field_type, repeated, subfields = field
+    if repeated:
+        values = _repeated_values(field, value)
+        if subfields is not None:
+            return bigquery.ArrayQueryParameter(name, _struct_type(subfields),
+                                                [_struct_parameter(subfields, item) for item in values])
+        if field_type == "JSON":
+            values = [json.dumps(item, ensure_ascii=False, default=str) for item in values]
+        return bigquery.ArrayQueryParameter(name, _scalar_type(field_type), values)
+
+    if field_type == "JSON" and value is not None:
+        value = json.dumps(value, ensure_ascii=False, default=str)
+    if subfields is not None:
+        return _struct_parameter(subfields, value or {}, name)
+    return bigquery.ScalarQueryParameter(name, _scalar_type(field_type), value)
+
+
+def _struct_parameter(plan: list, row: dict, name: str = None) -> bigquery.StructQueryParameter:
+    from google.cloud import bigquery
+
+    members = []
+    for plan_field in plan:
+        value = row.get(plan_field[0])
+        members.append(_field_parameter(plan_field, value))
+        if _nullable_record(plan_field):
+            members.append(bigquery.ScalarQueryParameter(_null_flag(plan_field[0]), "BOOL", value is None))
+    return bigquery.StructQueryParameter(name, *members)
+
+
+def _rebuilt(field: tuple) -> bool:
+    """True se o valor do parâmetro não vai direto para a coluna (JSON ou RECORD que pode ser NULL)"""
+    _, field_type, repeated, subfields = field
+    if subfields is None:
+        return field_type == "JSON"
+    return not repeated or any(_rebuilt(sub) for sub in subfields)
+
+
+def _value_sql(field: tuple, parent: str, depth: int = 0) -> str:
+    """Expressão do INSERT para o campo: PARSE_JSON nas colunas JSON e NULL nos RECORDs marcados"""
+    name, field_type, repeated, subfields = field
+    ref = f"{parent}.{name}"
+    if not _rebuilt(field):
+        return ref
+    if subfields is None:
+        if not repeated:
+            return f"PARSE_JSON({ref})"
+        return (f"ARRAY(SELECT PARSE_JSON(j{depth}) FROM UNNEST({ref}) AS j{depth} "
+                f"WITH OFFSET AS o{depth} ORDER BY o{depth})")
+    if repeated:
+        members = ", ".join(f"{_value_sql(sub, f'e{depth}', depth + 1)} AS {sub[0]}" for sub in subfields)
+        return (f"ARRAY(SELECT AS STRUCT {members} FROM UNNEST({ref}) AS e{depth} "
+                f"WITH OFFSET AS o{depth} ORDER BY o{depth})")
+    value = ref
+    if any(_rebuilt(sub) for sub in subfields):
+        value = f"STRUCT({', '.join(f'{_value_sql(sub, ref, depth)} AS {sub[0]}' for sub in subfields)})"
+    return f"IF({parent}.{_null_flag(name)}, NULL, {value})"
+
+
+def _estimated_size(plan: list, row: dict) -> int:
+    """Estimativa barata do tamanho do valor STRUCT codificado (evita gerar o to_api_repr duas vezes)"""
+    size = 20
+    for plan_field in plan:
+        name, field_type, repeated, subfields = plan_field
+        value = row.get(name)
+        size += len(name) + 16
+        if subfields is not None and not repeated:
+            size += len(name) + 32
+        for item in _repeated_values(plan_field, value) if repeated else [value]:
+            if subfields is not None:
+                size += _estimated_size(subfields, item or {})
+            elif field_type == "JSON":
+                size += len(json.dumps(item, ensure_ascii=False, default=str)) * 2 + 16
+            else:
+                size += len(str(item).encode("utf-8")) + 16
+    return size
+
+
+def insert_rows_dml(client: bigquery.Client, table: str, rows: list, schema: list,
+                    max_parameter_bytes: int = DEFAULT_MAX_PARAMETER_BYTES) -> MutationResult:
+    """INSERT via DML enviando as linhas como um parâmetro ARRAY<STRUCT>.
+
+    O texto da consulta é fixo (INSERT ... SELECT ... FROM UNNEST(@rows)); as
+    linhas são divididas em vários jobs quando o parâmetro codificado passa de
+    ``max_parameter_bytes``. Colunas JSON são enviadas como texto e convertidas
+    com PARSE_JSON; RECORD com valor None entra como NULL (não como um STRUCT
+    de campos NULL) e campos REPEATED aceitam lista ou texto com um array
+    JSON. Ao contrário do streaming insert, as linhas ficam disponíveis para
+    UPDATE/DELETE imediatamente.
+    """
+    from google.cloud import bigquery
+
+    if max_parameter_bytes <= 0:
+        raise ValueError("max_parameter_bytes must be positive")
+
+    result = MutationResult(strategy="dml_array")
+    if not rows:
+        return result
+
+    present = set().union(*(row.keys() for row in rows))
+    fields = [field for field in _plan(schema) if field[0] in present]
+    unknown = present - {field[0] for field in fields}
+    if unknown:
+        raise ValueError(f"columns not found in {table}: {sorted(unknown)}")
+
+    columns = ", ".join(name for name, *_ in fields)
+    values = ", ".join(_value_sql(field, "r") for field in fields)
+    sql = f"INSERT INTO `{table.strip('`')}` ({columns}) SELECT {values} FROM UNNEST(@rows) AS r"
+    element_type = _struct_type(fields)
+
+    def send(chunk: list) -> None:
+        parameter = bigquery.ArrayQueryParameter("rows", element_type, chunk)
+        job = client.query(sql, job_config=bigquery.QueryJobConfig(query_parameters=[parameter]))
+        job.result()
+        result.jobs.append(job.job_id)
+        result.affected_rows += job.num_dml_affected_rows or 0
+
+    chunk, size = [], 0
+    for row in rows:
+        struct = _struct_parameter(fields, row)
+        struct_size = _estimated_size(fields, row)
+        if chunk and size + struct_size > max_parameter_bytes:
+            send(chunk)
+            chunk, size = [], 0
+        chunk.append(struct)
+        size += struct_size
+    if chunk:
+        send(chunk)
+    return result
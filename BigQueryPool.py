@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import contextlib
+import os
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery
+
+DEFAULT_MAX_CONNECTIONS = 32
+
+
+@dataclass
+class _SharedAuth:
+    """Credenciais e sessão HTTP (com pool de conexões) de um arquivo de credenciais"""
+    credentials: object
+    session: object
+    clients: int = 0
+
+
+@dataclass
+class _PooledClient:
+    client: bigquery.Client
+    credentials_path: str
+    references: int = 0
+
+
+class ClientPool:
+    """Pool de bigquery.Client por processo, chaveado por (arquivo de credenciais, projeto).
+
+    O arquivo de credenciais é lido uma única vez e todos os clientes criados a
+    partir dele compartilham as credenciais (e o token de acesso) e a mesma
+    sessão HTTP, com até ``max_connections`` conexões por host. ``acquire``
+    entrega sempre o mesmo cliente para a mesma chave e conta as referências;
+    ``release`` só devolve, sem fechar, para o próximo uso não pagar a criação
+    de novo. Depois de um fork o processo filho começa com o pool vazio, já que
+    conexões abertas herdadas do pai não podem ser usadas pelos dois.
+    """
+
+    def __init__(self, max_connections: int = DEFAULT_MAX_CONNECTIONS):
+        if max_connections <= 0:
+            raise ValueError("max_connections must be positive")
+
+        self.max_connections = max_connections
+        self.__reset()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self.__reset)
+
+    def __reset(self) -> None:
+        # Não fecha nada: sockets e locks herdados pertencem ao processo pai
+        self.__lock = threading.Lock()
+        self.__auth: dict = {}
+        self.__clients: dict = {}
+        self.__pid = os.getpid()
+
+    def __check_pid(self) -> None:
+        # Cobre forks sem os.register_at_fork (ex.: criados por código C)
+        if self.__pid != os.getpid():
+            self.__reset()
+
+    def __shared_auth(self, credentials_path: str) -> _SharedAuth:
+        auth = self.__auth.get(credentials_path)
+        if auth is None:
+            import requests
+            from google.auth.transport.requests import AuthorizedSession
+            from google.cloud import bigquery
+            from google.oauth2 import service_account
+
+            credentials = service_account.Credentials.from_service_account_file(
+                credentials_path, scopes=bigquery.Client.SCOPE)
+            session = AuthorizedSession(credentials)
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=self.max_connections)
+            session.mount("https://", adapter)
+            auth = _SharedAuth(credentials=credentials, session=session)
+            self.__auth[credentials_path] = auth
+        return auth
+
+    def credentials(self, credentials_path: str):
+        """Credenciais compartilhadas do arquivo (lido só na primeira chamada)"""
+        credentials_path = os.path.abspath(credentials_path)
+        with self.__lock:
+            self.__check_pid()
+            return self.__shared_auth(credentials_path).credentials
+
+    def acquire(self, credentials_path: str, project: str = None) -> bigquery.Client:
+        """Retorna o cliente da chave (criando na primeira vez) e incrementa as referências"""
+        credentials_path = os.path.abspath(credentials_path)
+        key = (credentials_path, project)
+        with self.__lock:
+            self.__check_pid()
+            pooled = self.__clients.get(key)
+            if pooled is None:
+                from google.cloud import bigquery
+
+                auth = self.__shared_auth(credentials_path)
+                client = bigquery.Client(credentials=auth.credentials, project=project, _http=auth.session)
+                pooled = _PooledClient(client=client, credentials_path=credentials_path)
+                self.__clients[key] = pooled
+                auth.clients += 1
+            pooled.references += 1
+            return pooled.client
+
+    def release(self, client: bigquery.Client) -> None:
+        """Devolve uma referência obtida com ``acquire`` (o cliente continua aberto no pool)"""
+        with self.__lock:
+            self.__check_pid()
+            for pooled in self.__clients.values():
+                if pooled.client is client:
+                    pooled.references = max(0, pooled.references - 1)
+                    return
+
+    @contextlib.contextmanager
+    def client(self, credentials_path: str, project: str = None):
+        client = self.acquire(credentials_path, project)
+        try:
+            yield client
+        finally:
+            self.release(client)
+
+    def close_idle(self) -> int:
+        """Fecha os clientes sem referências (e a sessão HTTP quando ninguém mais a usa)"""
+        with self.__lock:
+            self.__check_pid()
+            idle = [key for key, pooled in self.__clients.items() if pooled.references == 0]
+            for key in idle:
+                self.__remove(key)
+            return len(idle)
+
+    def clear(self) -> None:
+        """Fecha todos os clientes e sessões do pool"""
+        with self.__lock:
+            self.__check_pid()
+            for key in list(self.__clients):
+                self.__remove(key)
+            self.__auth.clear()
+
+    def __remove(self, key: tuple) -> None:
+        pooled = self.__clients.pop(key)
+        auth = self.__auth.get(pooled.credentials_path)
+        if auth is None:
+            return
+        auth.clients -= 1
+        if auth.clients <= 0:
+            # Client.close() fecharia a sessão compartilhada; ela só é fechada com o último cliente
+            auth.session.close()
+            del self.__auth[pooled.credentials_path]
+
+    def stats(self) -> dict:
+        with self.__lock:
+            self.__check_pid()
+            return {
+                "clients": len(self.__clients),
+                "credentials": len(self.__auth),
+                "references": sum(pooled.references for pooled in self.__clients.values()),
+            }
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_pool() -> ClientPool:
+    """Pool padrão do processo, usado por BigQuery.initialize"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ClientPool()
+        return _default_pool
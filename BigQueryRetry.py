@@ -0,0 +1,111 @@
+import datetime
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+
+from BigQuerySql import table_name
+
+# Motivos (errors[].reason do insertAll) que indicam falha temporária. "stopped"
+# marca linhas válidas que não foram gravadas porque outra linha do mesmo lote
+# falhou; reenviadas sozinhas elas entram.
+RETRYABLE_REASONS = frozenset({"backendError", "internalError", "rateLimitExceeded", "timeout", "stopped"})
+
+# Códigos HTTP de erros temporários quando a requisição inteira falha
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def is_retryable_row(error: dict) -> bool:
+    """True se todos os motivos de erro da linha forem temporários"""
+    reasons = [detail.get("reason") for detail in error.get("errors", [])]
+    return bool(reasons) and all(reason in RETRYABLE_REASONS for reason in reasons)
+
+
+def is_retryable_exception(exception: Exception) -> bool:
+    """Erros 5xx/429 da API, quota (rateLimitExceeded) e falhas de conexão/timeout"""
+    if isinstance(exception, (ConnectionError, TimeoutError)):
+        return True
+    if getattr(exception, "code", None) in RETRYABLE_STATUS:
+        return True
+    for detail in getattr(exception, "errors", None) or []:
+        if isinstance(detail, dict) and detail.get("reason") in RETRYABLE_REASONS:
+            return True
+    try:
+        import requests
+    except ImportError:
+        return False
+    return isinstance(exception, (requests.ConnectionError, requests.Timeout))
+
+
+@dataclass
+class RetryPolicy:
+    """Backoff exponencial com jitter completo e orçamento de tentativas/tempo.
+
+    A espera antes da tentativa ``n + 1`` é sorteada entre 0 e
+    ``min(max_delay, initial_delay * multiplier ** (n - 1))``; o jitter evita
+    que vários lotes que falharam juntos voltem todos ao mesmo tempo. Não há
+    nova tentativa depois de ``max_attempts`` envios ou ``deadline`` segundos
+    desde o primeiro envio.
+    """
+    max_attempts: int = 5
+    initial_delay: float = 0.5
+    max_delay: float = 32.0
+    multiplier: float = 2.0
+    deadline: float = 120.0
+
+    def __post_init__(self):
+        if self.max_attempts <= 0 or self.initial_delay < 0 or self.max_delay < 0 or self.multiplier < 1:
+            raise ValueError("invalid retry policy")
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.initial_delay * self.multiplier ** (attempt - 1)))
+
+    def allows(self, attempt: int, started: float) -> bool:
+        """True se ainda cabe outra tentativa depois de ``attempt`` envios iniciados em ``started``"""
+        return attempt < self.max_attempts and time.monotonic() - started < self.deadline
+
+    def wait(self, attempt: int, started: float) -> None:
+        remaining = self.deadline - (time.monotonic() - started)
+        time.sleep(max(0.0, min(self.delay(attempt), remaining)))
+
+
+class DeadLetterFile:
+    """Arquivo NDJSON local com as linhas que não foram gravadas nem depois das novas tentativas.
+
+    Cada linha guarda a tabela, o registro original, o insertId, os erros e o
+    número de tentativas, para inspeção ou reenvio com ``read``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__lock = threading.Lock()
+        self.rows = 0
+
+    def write(self, table, entries: list, attempts: int) -> None:
+        """Acrescenta ``entries`` (tuplas registro, insertId, erros) ao arquivo"""
+        if not entries:
+            return
+        failed_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        lines = [
+            json.dumps({"table": table_name(table), "row": row, "insert_id": insert_id, "errors": errors,
+                        "attempts": attempts, "failed_at": failed_at}, ensure_ascii=False, default=str) + "\n"
+            for row, insert_id, errors in entries
+        ]
+        with self.__lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+            self.rows += len(lines)
+
+    def read(self):
+        """Gera os registros gravados (dicts com table, row, insert_id, errors, attempts, failed_at)"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
@@ -0,0 +1,106 @@
+import re
+
+# Literais de string/identificadores entre crases e comentários, na ordem em que
+# precisam ser reconhecidos para não confundir "--" dentro de uma string com comentário.
+_TOKENS = re.compile(
+    r"""(?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")"""
+    r"""|(?P<quoted>`[^`]*`)"""
+    r"""|(?P<comment>--[^\n]*|#[^\n]*|/\*.*?\*/)"""
+    r"""|(?P<space>\s+)""",
+    re.DOTALL,
+)
+
+_TABLE_AFTER = re.compile(
+    r"\b(?:FROM|JOIN|INTO|UPDATE|MERGE|USING|TABLE)\s+(`[^`]+`|[A-Za-z_][\w\-]*(?:\.[A-Za-z_][\w\-]*){1,2})",
+    re.IGNORECASE,
+)
+
+_READ_ONLY = ("SELECT", "WITH", "(")
+
+
+def normalize_sql(sql: str) -> str:
+    """Remove comentários, colapsa espaços e o ';' final, preservando literais"""
+    parts = []
+    last = 0
+    for match in _TOKENS.finditer(sql):
+        parts.append(sql[last:match.start()])
+        kind = match.lastgroup
+        if kind in ("string", "quoted"):
+            parts.append(match.group())
+        else:
+            parts.append(" ")
+        last = match.end()
+    parts.append(sql[last:])
+    normalized = re.sub(r" +", " ", "".join(parts)).strip()
+    return normalized.rstrip(";").strip()
+
+
+def is_read_only(sql: str) -> bool:
+    """True para consultas (SELECT/WITH); False para DML/DDL e scripts"""
+    return normalize_sql(sql).upper().startswith(_READ_ONLY)
+
+
+def referenced_tables(sql: str) -> set:
+    """Nomes das tabelas citadas depois de FROM/JOIN/INTO/UPDATE/MERGE/USING"""
+    tables = set()
+    for match in _TABLE_AFTER.finditer(normalize_sql(sql)):
+        name = match.group(1).strip("`")
+        if "." in name:
+            tables.add(name)
+    return tables
+
+
+def table_name(table) -> str:
+    """Nome 'dataset.tabela' de um bigquery.Table/TableReference ou de uma string"""
+    if isinstance(table, str):
+        return table
+    return f"{table.dataset_id}.{table.table_id}"
+
+
+def same_table(a: str, b: str) -> bool:
+    """Compara nomes de tabela com ou sem projeto (projeto.dataset.tabela vs dataset.tabela)"""
+    left, right = a.strip("`").split("."), b.strip("`").split(".")
+    size = min(len(left), len(right))
+    return left[-size:] == right[-size:]
+
+
+_QUERY_HEADER = re.compile(r"--\W*(QUERY\s+\d+)\s*:?\s*(.*)", re.IGNORECASE)
+
+
+def split_statements(sql: str) -> list:
+    """Divide um script em comandos pelo ';', ignorando ';' dentro de strings e comentários"""
+    statements = []
+    start = 0
+    position = 0
+    while position < len(sql):
+        match = _TOKENS.match(sql, position)
+        if match:
+            position = match.end()
+            continue
+        if sql[position] == ";":
+            statements.append(sql[start:position])
+            start = position + 1
+        position += 1
+    statements.append(sql[start:])
+    return [statement for statement in statements if normalize_sql(statement)]
+
+
+def read_sql_file(path: str) -> dict:
+    """Lê um arquivo .sql como o queries_looker_studio.sql e retorna {"QUERY N": sql}.
+
+    O nome vem do comentário "-- ... QUERY N: título" que antecede cada comando;
+    comandos sem cabeçalho recebem "QUERY <posição>".
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        script = f.read()
+
+    queries = {}
+    for position, statement in enumerate(split_statements(script), start=1):
+        name = f"QUERY {position}"
+        for line in statement.splitlines():
+            header = _QUERY_HEADER.search(line)
+            if header:
+                name = re.sub(r"\s+", " ", header.group(1).upper())
+                break
+        queries[name] = normalize_sql(statement)
+    return queries
@@ -0,0 +1,477 @@
+from __future__ import annotations
+
+import argparse
+import datetime
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from BigQueryBuilder import parameter
+from BigQueryTables import ProvisionResult, TableLayout, provision_table
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery
+
+logger = logging.getLogger(__name__)
+
+# Dias antes do watermark recalculados a cada atualização, para pegar pedidos
+# gravados com atraso (created_at anterior ao último já resumido)
+DEFAULT_LOOKBACK_DAYS = 1
+STATE_SUFFIX = "_resumo_estado"
+
+_MIN_TIMESTAMP = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+
+# Valor de cada pedido calculado uma única vez, para os resumos por dia e por cliente.
+# primeiro_no_dia marca uma linha por _id e dia: somar as marcas dá o COUNT(DISTINCT _id)
+# exato do dia mesmo com o pedido gravado mais de uma vez (em horas diferentes, inclusive)
+_ORDERS = """SELECT _id, name, created_at, products,
+        (SELECT SUM(p.price * p.quantity) FROM UNNEST(products) AS p) AS valor,
+        _id IS NOT NULL AND ROW_NUMBER() OVER (
+            PARTITION BY DATE(created_at), _id ORDER BY created_at) = 1 AS primeiro_no_dia
+    FROM `{source}`
+    WHERE created_at >= @inicio"""
+
+
+@dataclass(frozen=True)
+class Summary:
+    """Tabela de resumo diário: chaves do MERGE, esquema (formato da API) e a consulta que a calcula.
+
+    Contagens guardadas para reproduzir as agregações do dashboard: ``pedidos``
+    conta linhas (COUNT(_id)), ``pedidos_com_valor`` os pedidos com valor (o
+    divisor do AVG, que ignora NULL) e as colunas de pedidos distintos somam
+    marcas de primeira ocorrência do _id no dia.
+    """
+    suffix: str
+    keys: tuple
+    schema: tuple
+    select: str
+    clustering_fields: tuple = ()
+
+    @property
+    def columns(self) -> list:
+        return [item["name"] for item in self.schema]
+
+    def layout(self) -> TableLayout:
+        # Resumos são pequenos: partição mensal e leitura sem filtro obrigatório (o dashboard lê tudo)
+        return TableLayout(partition_field="data", partition_type="MONTH", clustering_fields=self.clustering_fields,
+                           require_partition_filter=False, schema=self.schema)
+
+
+DAILY = Summary(
+    suffix="_resumo_diario",
+    keys=("data", "hora"),
+    schema=(
+        {"name": "data", "type": "DATE"},
+        {"name": "hora", "type": "INTEGER"},
+        {"name": "pedidos", "type": "INTEGER"},
+        {"name": "pedidos_distintos", "type": "INTEGER"},
+        {"name": "pedidos_com_valor", "type": "INTEGER"},
+        {"name": "itens", "type": "INTEGER"},
+        {"name": "receita", "type": "FLOAT"},
+    ),
+    select=f"""SELECT DATE(created_at) AS data, EXTRACT(HOUR FROM created_at) AS hora, COUNT(_id) AS pedidos,
+    COUNTIF(primeiro_no_dia) AS pedidos_distintos, COUNT(valor) AS pedidos_com_valor,
+    SUM(ARRAY_LENGTH(products)) AS itens, SUM(valor) AS receita
+FROM ({_ORDERS})
+GROUP BY data, hora""",
+    clustering_fields=("hora",),
+)
+
+CUSTOMERS = Summary(
+    suffix="_resumo_clientes",
+    keys=("data", "cliente"),
+    schema=(
+        {"name": "data", "type": "DATE"},
+        {"name": "cliente", "type": "STRING"},
+        {"name": "pedidos", "type": "INTEGER"},
+        {"name": "pedidos_com_valor", "type": "INTEGER"},
+        {"name": "itens", "type": "INTEGER"},
+        {"name": "receita", "type": "FLOAT"},
+    ),
+    select=f"""SELECT DATE(created_at) AS data, name AS cliente, COUNT(_id) AS pedidos,
+    COUNT(valor) AS pedidos_com_valor, SUM(ARRAY_LENGTH(products)) AS itens, SUM(valor) AS receita
+FROM ({_ORDERS})
+GROUP BY data, cliente""",
+    clustering_fields=("cliente",),
+)
+
+# Por produto e cliente: serve tanto o ranking de produtos quanto produtos por cliente.
+# pedidos conta cada _id uma vez por dia, produto e sku (ranking de produtos) e
+# pedidos_cliente uma vez por dia, cliente e nome do produto (produtos por cliente);
+# preço médio = soma_precos / linhas, como o AVG(price) sobre os itens com preço
+PRODUCTS = Summary(
+    suffix="_resumo_produtos",
+    keys=("data", "cliente", "produto", "sku"),
+    schema=(
+        {"name": "data", "type": "DATE"},
+        {"name": "cliente", "type": "STRING"},
+        {"name": "produto", "type": "STRING"},
+        {"name": "sku", "type": "STRING"},
+        {"name": "quantidade", "type": "INTEGER"},
+        {"name": "pedidos", "type": "INTEGER"},
+        {"name": "pedidos_cliente", "type": "INTEGER"},
+        {"name": "linhas", "type": "INTEGER"},
+        {"name": "soma_precos", "type": "FLOAT"},
+        {"name": "receita", "type": "FLOAT"},
+    ),
+    select="""SELECT data, cliente, produto, sku,
+    SUM(quantidade) AS quantidade, COUNTIF(primeiro_no_produto) AS pedidos,
+    COUNTIF(primeiro_no_cliente) AS pedidos_cliente, COUNT(preco) AS linhas,
+    SUM(preco) AS soma_precos, SUM(preco * quantidade) AS receita
+FROM (
+    SELECT DATE(created_at) AS data, name AS cliente, item.name AS produto, item.sku AS sku,
+        item.quantity AS quantidade, item.price AS preco,
+        _id IS NOT NULL AND ROW_NUMBER() OVER (
+            PARTITION BY DATE(created_at), item.name, item.sku, _id ORDER BY created_at) = 1 AS primeiro_no_produto,
+        _id IS NOT NULL AND ROW_NUMBER() OVER (
+            PARTITION BY DATE(created_at), name, item.name, _id ORDER BY created_at) = 1 AS primeiro_no_cliente
+    FROM `{source}`, UNNEST(products) AS item
+    WHERE created_at >= @inicio
+)
+GROUP BY data, cliente, produto, sku""",
+    clustering_fields=("produto", "cliente"),
+)
+
+SUMMARIES = (DAILY, CUSTOMERS, PRODUCTS)
+
+_STATE_SCHEMA = (
+    {"name": "tabela", "type": "STRING"},
+    {"name": "watermark", "type": "TIMESTAMP"},
+    {"name": "atualizado_em", "type": "TIMESTAMP"},
+)
+
+
+@dataclass
+class RefreshResult:
+    source: str
+    start: datetime.datetime = None
+    previous_watermark: datetime.datetime = None
+    watermark: datetime.datetime = None
+    bytes_processed: int = 0
+    affected_rows: dict = field(default_factory=dict)
+    jobs: list = field(default_factory=list)
+
+
+def summary_table(source: str, summary: Summary) -> str:
+    """Nome da tabela de resumo, no mesmo dataset da tabela de vendas"""
+    return f"{source.strip('`')}{summary.suffix}"
+
+
+def state_table(source: str) -> str:
+    return f"{source.strip('`')}{STATE_SUFFIX}"
+
+
+def merge_sql(source: str, summary: Summary) -> str:
+    """MERGE que substitui os dias a partir de @inicio_dia pelo recálculo da tabela de vendas.
+
+    Grupos que sumiram da origem (pedidos apagados) são removidos pelo WHEN NOT
+    MATCHED BY SOURCE, restrito ao mesmo período, então rodar de novo o mesmo
+    período dá o mesmo resultado.
+    """
+    keys = " AND ".join(f"T.{key} = S.{key}" for key in summary.keys)
+    values = [column for column in summary.columns if column not in summary.keys]
+    return (f"MERGE `{summary_table(source, summary)}` T\n"
+            f"USING ({summary.select.format(source=source.strip('`'))}) S\n"
+            f"ON T.data >= @inicio_dia AND {keys}\n"
+            f"WHEN MATCHED THEN UPDATE SET {', '.join(f'{column} = S.{column}' for column in values)}\n"
+            f"WHEN NOT MATCHED BY TARGET THEN INSERT ({', '.join(summary.columns)}) "
+            f"VALUES ({', '.join(f'S.{column}' for column in summary.columns)})\n"
+            f"WHEN NOT MATCHED BY SOURCE AND T.data >= @inicio_dia THEN DELETE")
+
+
+def provision_summaries(client: bigquery.Client, source: str) -> list:
+    """Cria (ou ajusta) as tabelas de resumo e a tabela de estado com o watermark.
+
+    Um resumo existente sem alguma coluna do schema atual volta com
+    ``needs_migration``: recrie a tabela e rode ``refresh --full``.
+    """
+    from google.cloud import bigquery
+
+    results = []
+    for summary in SUMMARIES:
+        result = provision_table(client, summary_table(source, summary), summary.layout())
+        if not result.created and not result.needs_migration:
+            existing = {item.name for item in client.get_table(result.table_id).schema}
+            missing = [column for column in summary.columns if column not in existing]
+            if missing:
+                result.needs_migration = True
+                result.reason = f"missing columns {', '.join(missing)}"
+                logger.warning(f"⚠️ BigQuery: {result.table_id} precisa de migração ({result.reason})")
+        results.append(result)
+    state = state_table(source)
+    if state.count(".") < 2:
+        state = f"{client.project}.{state}"
+    table = client.create_table(bigquery.Table(state, schema=[bigquery.SchemaField.from_api_repr(dict(item))
+                                                              for item in _STATE_SCHEMA]), exists_ok=True)
+    results.append(ProvisionResult(table_id=f"{table.project}.{table.dataset_id}.{table.table_id}"))
+    return results
+
+
+def read_watermark(client: bigquery.Client, source: str) -> datetime.datetime:
+    """Maior created_at já resumido (None antes da primeira atualização)"""
+    from google.cloud import bigquery
+
+    job = client.query(f"SELECT MAX(watermark) AS watermark FROM `{state_table(source)}` WHERE tabela = @tabela",
+                       job_config=bigquery.QueryJobConfig(query_parameters=[parameter("tabela", source.strip("`"))]))
+    rows = list(job.result())
+    return rows[0]["watermark"] if rows else None
+
+
+def refresh_summaries(client: bigquery.Client, source: str, lookback_days: int = DEFAULT_LOOKBACK_DAYS,
+                      since=None, full: bool = False) -> RefreshResult:
+    """Atualiza os resumos com os pedidos novos desde o último watermark.
+
+    Recalcula os dias a partir de ``DATE(watermark) - lookback_days`` (ou de
+    ``since``, para refazer um período; ``full`` refaz tudo), lendo da tabela
+    de vendas só as partições desse período, e grava o novo watermark por
+    último: se algo falhar no meio, a próxima execução refaz os mesmos dias.
+    Pedidos gravados com created_at anterior ao período recalculado só entram
+    com ``since`` ou ``full``.
+    """
+    from google.cloud import bigquery
+
+    source = source.strip("`")
+    result = RefreshResult(source=source)
+    result.previous_watermark = None if full else read_watermark(client, source)
+
+    if full:
+        start = _MIN_TIMESTAMP
+    elif since is not None:
+        start = datetime.datetime.combine(datetime.date.fromisoformat(str(since)[:10]), datetime.time(),
+                                          datetime.timezone.utc)
+    elif result.previous_watermark is not None:
+        day = result.previous_watermark.astimezone(datetime.timezone.utc).date()
+        start = datetime.datetime.combine(day - datetime.timedelta(days=lookback_days), datetime.time(),
+                                          datetime.timezone.utc)
+    else:
+        start = _MIN_TIMESTAMP
+    result.start = None if start == _MIN_TIMESTAMP else start
+
+    window = [parameter("inicio", start, "TIMESTAMP"), parameter("inicio_dia", start.date(), "DATE")]
+    job = client.query(f"SELECT MAX(created_at) AS watermark FROM `{source}` WHERE created_at >= @inicio",
+                       job_config=bigquery.QueryJobConfig(query_parameters=window[:1]))
+    newest = list(job.result())[0]["watermark"]
+    result.bytes_processed += job.total_bytes_processed or 0
+    result.jobs.append(job.job_id)
+
+    for summary in SUMMARIES:
+        job = client.query(merge_sql(source, summary), job_config=bigquery.QueryJobConfig(query_parameters=window))
+        job.result()
+        result.affected_rows[summary_table(source, summary)] = job.num_dml_affected_rows or 0
+        result.bytes_processed += job.total_bytes_processed or 0
+        result.jobs.append(job.job_id)
+
+    result.watermark = max(filter(None, (newest, result.previous_watermark)), default=None)
+    if result.watermark is not None and result.watermark != result.previous_watermark:
+        job = client.query(
+            f"MERGE `{state_table(source)}` T\n"
+            f"USING (SELECT @tabela AS tabela, @watermark AS watermark) S\n"
+            f"ON T.tabela = S.tabela\n"
+            f"WHEN MATCHED THEN UPDATE SET watermark = S.watermark, atualizado_em = CURRENT_TIMESTAMP()\n"
+            f"WHEN NOT MATCHED THEN INSERT (tabela, watermark, atualizado_em) "
+            f"VALUES (S.tabela, S.watermark, CURRENT_TIMESTAMP())",
+            job_config=bigquery.QueryJobConfig(query_parameters=[
+                parameter("tabela", source), parameter("watermark", result.watermark, "TIMESTAMP")]))
+        job.result()
+        result.jobs.append(job.job_id)
+
+    logger.info(f"✅ BigQuery: Resumos de {source} atualizados desde "
+                f"{result.start.date() if result.start else 'o início'} "
+                f"({result.bytes_processed} bytes lidos, watermark {result.watermark})")
+    return result
+
+
+# Consultas do queries_looker_studio.sql reescritas sobre os resumos ({diario},
+# {clientes}, {produtos}). QUERY 7 e QUERY 11 listam pedidos individuais e
+# continuam na tabela de vendas. Os resultados são os mesmos das originais, com
+# uma diferença: os COUNT(DISTINCT _id) das QUERY 3 e 8 (que não agrupam por
+# dia) contam uma vez por dia o mesmo _id gravado em dias diferentes
+DASHBOARD_QUERIES = {
+    "QUERY 1": ("📊", "RESUMO GERAL (KPIs)", """SELECT
+    SUM(pedidos) as total_pedidos,
+    (SELECT COUNT(DISTINCT cliente) FROM `{clientes}`) as clientes_unicos,
+    SUM(itens) as total_itens_vendidos,
+    ROUND(SUM(receita), 2) as receita_total,
+    ROUND(SAFE_DIVIDE(SUM(receita), SUM(pedidos_com_valor)), 2) as ticket_medio,
+    MIN(data) as primeira_venda,
+    MAX(data) as ultima_venda
+FROM `{diario}`"""),
+    "QUERY 2": ("📈", "VENDAS DIÁRIAS", """SELECT
+    data,
+    EXTRACT(YEAR FROM data) as ano,
+    EXTRACT(MONTH FROM data) as mes,
+    EXTRACT(DAY FROM data) as dia,
+    FORMAT_DATE('%A', data) as dia_semana,
+    SUM(pedidos_distintos) as num_pedidos,
+    SUM(itens) as total_itens,
+    ROUND(SUM(receita), 2) as receita_dia
+FROM `{diario}`
+GROUP BY data, ano, mes, dia, dia_semana
+ORDER BY data"""),
+    "QUERY 3": ("🏆", "TOP PRODUTOS MAIS VENDIDOS", """SELECT
+    produto,
+    sku,
+    SUM(quantidade) as total_vendido,
+    SUM(pedidos) as num_pedidos,
+    ROUND(SAFE_DIVIDE(SUM(soma_precos), SUM(linhas)), 2) as preco_medio,
+    ROUND(SUM(receita), 2) as receita_total
+FROM `{produtos}`
+GROUP BY produto, sku
+ORDER BY total_vendido DESC"""),
+    "QUERY 4": ("💰", "RANKING DE CLIENTES", """SELECT
+    cliente,
+    SUM(pedidos) as num_pedidos,
+    SUM(itens) as total_itens,
+    ROUND(SUM(receita), 2) as total_gasto,
+    ROUND(SAFE_DIVIDE(SUM(receita), SUM(pedidos_com_valor)), 2) as ticket_medio
+FROM `{clientes}`
+GROUP BY cliente
+ORDER BY total_gasto DESC"""),
+    "QUERY 5": ("🕐", "VENDAS POR HORA E DIA DA SEMANA", """SELECT
+    FORMAT_DATE('%A', data) as dia_semana,
+    hora,
+    SUM(pedidos) as num_pedidos,
+    ROUND(SUM(receita), 2) as receita,
+    ROUND(SAFE_DIVIDE(SUM(receita), SUM(pedidos_com_valor)), 2) as ticket_medio
+FROM `{diario}`
+GROUP BY dia_semana, hora
+ORDER BY
+    CASE dia_semana
+        WHEN 'Monday' THEN 1
+        WHEN 'Tuesday' THEN 2
+        WHEN 'Wednesday' THEN 3
+        WHEN 'Thursday' THEN 4
+        WHEN 'Friday' THEN 5
+        WHEN 'Saturday' THEN 6
+        WHEN 'Sunday' THEN 7
+    END, hora"""),
+    "QUERY 6": ("📅", "VENDAS DOS ÚLTIMOS 30 DIAS", """WITH dias AS (
+    SELECT data, SUM(pedidos) as pedidos, SUM(itens) as itens, SUM(receita) as receita
+    FROM `{diario}`
+    WHERE data >= DATE_SUB(CURRENT_DATE(), INTERVAL 30 DAY)
+    GROUP BY data
+),
+clientes AS (
+    SELECT data, STRING_AGG(DISTINCT cliente, ', ' LIMIT 3) as clientes_exemplo
+    FROM `{clientes}`
+    WHERE data >= DATE_SUB(CURRENT_DATE(), INTERVAL 30 DAY)
+    GROUP BY data
+)
+SELECT
+    dias.data,
+    FORMAT_DATE('%A', dias.data) as dia_semana,
+    dias.pedidos,
+    dias.itens,
+    ROUND(dias.receita, 2) as receita,
+    clientes.clientes_exemplo
+FROM dias
+LEFT JOIN clientes ON clientes.data = dias.data
+ORDER BY data DESC"""),
+    "QUERY 8": ("👤", "PRODUTOS POR CLIENTE", """SELECT
+    cliente,
+    produto,
+    SUM(quantidade) as qtd_comprada,
+    SUM(pedidos_cliente) as vezes_comprou,
+    ROUND(SUM(receita), 2) as valor_gasto_produto,
+    ROUND(SAFE_DIVIDE(SUM(soma_precos), SUM(linhas)), 2) as preco_medio_pago
+FROM `{produtos}`
+GROUP BY cliente, produto
+ORDER BY cliente, qtd_comprada DESC"""),
+    "QUERY 9": ("📈", "CRESCIMENTO MENSAL", """WITH vendas_mensais AS (
+    SELECT
+        FORMAT_DATE('%Y-%m', data) as mes,
+        SUM(pedidos) as pedidos,
+        ROUND(SUM(receita), 2) as receita
+    FROM `{diario}`
+    GROUP BY mes
+),
+vendas_com_lag AS (
+    SELECT
+        mes,
+        pedidos,
+        receita,
+        LAG(receita) OVER (ORDER BY mes) as receita_mes_anterior
+    FROM vendas_mensais
+)
+SELECT
+    mes,
+    pedidos,
+    receita,
+    receita_mes_anterior,
+    CASE
+        WHEN receita_mes_anterior IS NOT NULL THEN
+            ROUND(((receita - receita_mes_anterior) / receita_mes_anterior) * 100, 2)
+        ELSE NULL
+    END as crescimento_percentual
+FROM vendas_com_lag
+ORDER BY mes"""),
+    "QUERY 10": ("⏰", "VENDAS POR HORA (SIMPLES)", """SELECT
+    hora,
+    SUM(pedidos) as num_pedidos,
+    ROUND(SUM(receita), 2) as receita_hora,
+    ROUND(SAFE_DIVIDE(SUM(receita), SUM(pedidos_com_valor)), 2) as ticket_medio_hora
+FROM `{diario}`
+GROUP BY hora
+ORDER BY hora"""),
+}
+
+
+def dashboard_queries(source: str) -> dict:
+    """{"QUERY N": sql} das consultas do dashboard lendo as tabelas de resumo de ``source``"""
+    tables = {"diario": summary_table(source, DAILY), "clientes": summary_table(source, CUSTOMERS),
+              "produtos": summary_table(source, PRODUCTS)}
+    return {name: sql.format(**tables) for name, (_, _, sql) in DASHBOARD_QUERIES.items()}
+
+
+def dashboard_sql(source: str) -> str:
+    """Arquivo .sql (mesmo formato do queries_looker_studio.sql) com as consultas sobre os resumos"""
+    source = source.strip("`")
+    separator = "-- ==============================================="
+    parts = [separator,
+             "-- QUERIES PARA LOOKER STUDIO - ANÁLISE DE VENDAS (TABELAS DE RESUMO)",
+             f"-- Origem: {source}",
+             "-- Gerado por: python BigQuerySummaries.py sql <tabela>",
+             "-- Atualize os resumos antes com: python BigQuerySummaries.py refresh <tabela>",
+             "-- As consultas 7 e 11 listam pedidos individuais e ficam em queries_looker_studio.sql",
+             separator, ""]
+    queries = dashboard_queries(source)
+    for name, (icon, title, _) in DASHBOARD_QUERIES.items():
+        parts += [f"-- {icon} {name}: {title}", queries[name] + ";", "", separator, ""]
+    return "\n".join(parts[:-3]) + "\n"
+
+
+def main(argv: list = None) -> int:
+    """Linha de comando: provisiona/atualiza os resumos ou gera o .sql do dashboard"""
+    parser = argparse.ArgumentParser(description="Resumos diários da tabela de vendas para o Looker Studio")
+    parser.add_argument("command", choices=["provision", "refresh", "sql"])
+    parser.add_argument("source", help="tabela de vendas (projeto.dataset.tabela)")
+    parser.add_argument("--credentials", help="arquivo JSON da conta de serviço (provision/refresh)")
+    parser.add_argument("--lookback-days", type=int, default=DEFAULT_LOOKBACK_DAYS)
+    parser.add_argument("--since", help="refaz os resumos a partir desta data (AAAA-MM-DD)")
+    parser.add_argument("--full", action="store_true", help="refaz os resumos de todo o histórico")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "sql":
+        print(dashboard_sql(args.source), end="")
+        return 0
+    if not args.credentials:
+        parser.error("--credentials is required for provision and refresh")
+
+    from BigQueryPool import get_pool
+
+    client = get_pool().acquire(args.credentials)
+    if args.command == "provision":
+        for result in provision_summaries(client, args.source):
+            status = "criada" if result.created else f"migração ({result.reason})" if result.needs_migration else "ok"
+            print(f"{result.table_id}: {status}")
+        return 0
+    result = refresh_summaries(client, args.source, lookback_days=args.lookback_days, since=args.since,
+                               full=args.full)
+    for table, rows in result.affected_rows.items():
+        print(f"{table}: {rows} linhas")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery
+
+logger = logging.getLogger(__name__)
+
+PARTITION_TYPES = ("HOUR", "DAY", "MONTH", "YEAR")
+# Tipos de coluna aceitos no particionamento por coluna de tempo
+_PARTITION_COLUMN_TYPES = ("TIMESTAMP", "DATE", "DATETIME")
+# O BigQuery aceita no máximo 4 colunas de clustering
+MAX_CLUSTERING_FIELDS = 4
+STAGING_SUFFIX = "__particionada"
+BACKUP_SUFFIX = "__backup_"
+
+# Esquema da tabela de vendas (VendasLBC2) no formato da API, para criar a tabela
+# sem carregar a biblioteca do BigQuery no import
+SALES_SCHEMA = (
+    {"name": "_id", "type": "STRING"},
+    {"name": "name", "type": "STRING"},
+    {"name": "created_at", "type": "TIMESTAMP"},
+    {"name": "products", "type": "RECORD", "mode": "REPEATED", "fields": [
+        {"name": "name", "type": "STRING"},
+        {"name": "sku", "type": "STRING"},
+        {"name": "price", "type": "FLOAT"},
+        {"name": "quantity", "type": "INTEGER"},
+    ]},
+)
+
+
+@dataclass(frozen=True)
+class TableLayout:
+    """Particionamento por tempo, clustering e filtro de partição obrigatório de uma tabela.
+
+    ``schema`` (campos no formato da API) só é usado para criar a tabela quando
+    ela ainda não existe; numa migração vale o esquema da tabela atual.
+    ``require_partition_filter`` é opcional: com ele o BigQuery recusa toda
+    consulta, UPDATE ou DELETE sem filtro na coluna de partição, então só
+    deve ser ligado quando todos os leitores da tabela informam um período.
+    """
+    partition_field: str = "created_at"
+    partition_type: str = "DAY"
+    clustering_fields: tuple = ()
+    require_partition_filter: bool = False
+    partition_expiration_days: int = None
+    schema: tuple = None
+
+    def __post_init__(self):
+        if self.partition_type not in PARTITION_TYPES:
+            raise ValueError(f"partition_type must be one of {', '.join(PARTITION_TYPES)}")
+        if len(self.clustering_fields) > MAX_CLUSTERING_FIELDS:
+            raise ValueError(f"at most {MAX_CLUSTERING_FIELDS} clustering fields are allowed")
+        if self.partition_expiration_days is not None and self.partition_expiration_days <= 0:
+            raise ValueError("partition_expiration_days must be positive")
+
+    @property
+    def expiration_ms(self) -> int:
+        if self.partition_expiration_days is None:
+            return None
+        return self.partition_expiration_days * 24 * 60 * 60 * 1000
+
+
+# Vendas: consultas por período (created_at) e por cliente/pedido (name, _id)
+SALES_LAYOUT = TableLayout(clustering_fields=("name", "_id"), schema=SALES_SCHEMA)
+# Logs do GasMonitor: mesmas chaves; as que não existirem no esquema são ignoradas
+LOG_LAYOUT = TableLayout(clustering_fields=("name", "_id"))
+
+LAYOUTS = {"sales": SALES_LAYOUT, "logs": LOG_LAYOUT}
+
+
+@dataclass
+class ProvisionResult:
+    table_id: str
+    created: bool = False
+    updated_fields: list = field(default_factory=list)
+    needs_migration: bool = False
+    reason: str = None
+
+
+@dataclass
+class MigrationResult:
+    source: str
+    target: str
+    dry_run: bool = False
+    backup: str = None
+    source_rows: int = 0
+    copied_rows: int = 0
+    bytes_processed: int = 0
+    swapped: bool = False
+    jobs: list = field(default_factory=list)
+
+
+def _full_name(table) -> str:
+    return f"{table.project}.{table.dataset_id}.{table.table_id}"
+
+
+def _qualified(client: bigquery.Client, table_ref: str) -> str:
+    # bigquery.Table exige projeto.dataset.tabela; 'dataset.tabela' usa o projeto do cliente
+    table_ref = table_ref.strip("`")
+    return table_ref if table_ref.count(".") >= 2 else f"{client.project}.{table_ref}"
+
+
+def clustering_for(layout: TableLayout, schema: list) -> list:
+    """Colunas de clustering do layout que existem no esquema (None se nenhuma)"""
+    names = {schema_field.name for schema_field in schema}
+    missing = [name for name in layout.clustering_fields if name not in names]
+    if missing:
+        logger.warning(f"⚠️ BigQuery: Colunas de clustering ausentes no esquema ignoradas: {', '.join(missing)}")
+    return [name for name in layout.clustering_fields if name in names] or None
+
+
+def check_partition_field(layout: TableLayout, schema: list) -> None:
+    """Confere que a coluna de partição existe e é TIMESTAMP, DATE ou DATETIME"""
+    for schema_field in schema:
+        if schema_field.name == layout.partition_field:
+            if schema_field.field_type not in _PARTITION_COLUMN_TYPES or schema_field.mode == "REPEATED":
+                raise ValueError(f"partition column '{layout.partition_field}' must be TIMESTAMP, DATE or DATETIME, "
+                                 f"not {schema_field.field_type}")
+            if layout.partition_type == "HOUR" and schema_field.field_type == "DATE":
+                raise ValueError("HOUR partitioning needs a TIMESTAMP or DATETIME column")
+            return
+    raise ValueError(f"partition column '{layout.partition_field}' is not in the table schema")
+
+
+def build_table(table_ref: str, layout: TableLayout, schema: list = None) -> bigquery.Table:
+    """bigquery.Table com particionamento, clustering e filtro obrigatório do layout"""
+    from google.cloud import bigquery
+
+    if schema is None:
+        if layout.schema is None:
+            raise ValueError(f"no schema to create {table_ref}: pass one or use a layout with schema")
+        schema = [bigquery.SchemaField.from_api_repr(dict(item)) for item in layout.schema]
+    check_partition_field(layout, schema)
+
+    table = bigquery.Table(table_ref, schema=schema)
+    table.time_partitioning = bigquery.TimePartitioning(type_=layout.partition_type, field=layout.partition_field,
+                                                        expiration_ms=layout.expiration_ms)
+    table.clustering_fields = clustering_for(layout, schema)
+    table.require_partition_filter = layout.require_partition_filter
+    return table
+
+
+def partitioning_mismatch(table: bigquery.Table, layout: TableLayout) -> str:
+    """Motivo pelo qual a tabela precisa ser recriada para seguir o layout (None se não precisa)"""
+    partitioning = table.time_partitioning
+    if partitioning is None:
+        return "table is not partitioned" if table.range_partitioning is None else "table uses range partitioning"
+    if partitioning.field != layout.partition_field:
+        return f"partitioned by {partitioning.field or '_PARTITIONTIME'}, layout uses {layout.partition_field}"
+    if partitioning.type_ != layout.partition_type:
+        return f"partitioned by {partitioning.type_}, layout uses {layout.partition_type}"
+    return None
+
+
+def provision_table(client: bigquery.Client, table_ref: str, layout: TableLayout,
+                    schema: list = None) -> ProvisionResult:
+    """Cria a tabela com o layout ou ajusta uma existente.
+
+    Clustering, filtro obrigatório e expiração das partições mudam sem recriar
+    a tabela (o novo clustering vale para os dados gravados depois). Se o
+    particionamento for outro, nada é alterado e o resultado indica
+    ``needs_migration`` (ver migrate_table).
+    """
+    from google.api_core.exceptions import NotFound
+
+    table_ref = _qualified(client, table_ref)
+    try:
+        table = client.get_table(table_ref)
+    except NotFound:
+        client.create_table(build_table(table_ref, layout, schema))
+        logger.info(f"✅ BigQuery: Tabela {table_ref} criada com partição {layout.partition_type} "
+                    f"em {layout.partition_field}")
+        return ProvisionResult(table_id=table_ref, created=True)
+
+    result = ProvisionResult(table_id=table_ref)
+    result.reason = partitioning_mismatch(table, layout)
+    if result.reason is not None:
+        result.needs_migration = True
+        logger.warning(f"⚠️ BigQuery: {table_ref} precisa de migração ({result.reason})")
+        return result
+
+    clustering = clustering_for(layout, table.schema)
+    if (table.clustering_fields or None) != clustering:
+        table.clustering_fields = clustering
+        result.updated_fields.append("clustering_fields")
+    if bool(table.require_partition_filter) != layout.require_partition_filter:
+        table.require_partition_filter = layout.require_partition_filter
+        result.updated_fields.append("require_partition_filter")
+    if table.time_partitioning.expiration_ms != layout.expiration_ms:
+        table.time_partitioning.expiration_ms = layout.expiration_ms
+        result.updated_fields.append("time_partitioning")
+    if result.updated_fields:
+        client.update_table(table, result.updated_fields)
+        logger.info(f"✅ BigQuery: {table_ref} atualizada ({', '.join(result.updated_fields)})")
+    return result
+
+
+def migrate_table(client: bigquery.Client, table_ref: str, layout: TableLayout, swap: bool = True,
+                  keep_backup: bool = True, dry_run: bool = False) -> MigrationResult:
+    """Copia uma tabela existente para uma nova com o layout e troca os nomes.
+
+    A cópia vai para ``<tabela>__particionada`` com o esquema atual (INSERT ...
+    SELECT, um único job) e o total de linhas é conferido com a origem. Com
+    ``swap`` a original vira ``<tabela>__backup_<data>`` e a cópia assume o
+    nome; sem ``keep_backup`` o backup é apagado. Pare as gravações na tabela
+    antes: linhas que chegarem durante a cópia ficam só no backup, e o
+    BigQuery não renomeia tabelas com dados no buffer de streaming. Com
+    ``dry_run`` só estima os bytes que a cópia leria.
+    """
+    from google.cloud import bigquery
+
+    source = client.get_table(table_ref)
+    source_name = _full_name(source)
+    staging_name = f"{source.project}.{source.dataset_id}.{source.table_id}{STAGING_SUFFIX}"
+    target = build_table(staging_name, layout, source.schema)
+    columns = ", ".join(f"`{schema_field.name}`" for schema_field in source.schema)
+    result = MigrationResult(source=source_name, target=staging_name, dry_run=dry_run,
+                             source_rows=source.num_rows or 0)
+
+    if dry_run:
+        job = client.query(f"SELECT {columns} FROM `{source_name}`",
+                           job_config=bigquery.QueryJobConfig(dry_run=True, use_query_cache=False))
+        result.bytes_processed = job.total_bytes_processed or 0
+        return result
+
+    client.create_table(target)
+    logger.debug(f"🔧 BigQuery: Copiando {source_name} para {staging_name}...")
+    job = client.query(f"INSERT INTO `{staging_name}` ({columns}) SELECT {columns} FROM `{source_name}`")
+    job.result()
+    result.jobs.append(job.job_id)
+    result.bytes_processed = job.total_bytes_processed or 0
+    result.copied_rows = job.num_dml_affected_rows or 0
+
+    count_job = client.query(f"SELECT COUNT(*) AS total FROM `{source_name}`")
+    result.source_rows = next(iter(count_job.result()))["total"]
+    result.jobs.append(count_job.job_id)
+    if result.copied_rows != result.source_rows:
+        raise RuntimeError(f"Error migrating {source_name}: copied {result.copied_rows} of {result.source_rows} rows "
+                           f"(the copy was kept in {staging_name})")
+    logger.info(f"✅ BigQuery: {result.copied_rows} linhas copiadas para {staging_name}")
+
+    if not swap:
+        return result
+
+    backup_id = f"{source.table_id}{BACKUP_SUFFIX}{time.strftime('%Y%m%d%H%M%S')}"
+    for statement in (f"ALTER TABLE `{source_name}` RENAME TO `{backup_id}`",
+                      f"ALTER TABLE `{staging_name}` RENAME TO `{source.table_id}`"):
+        job = client.query(statement)
+        job.result()
+        result.jobs.append(job.job_id)
+    result.target = source_name
+    result.backup = f"{source.project}.{source.dataset_id}.{backup_id}"
+    result.swapped = True
+    logger.info(f"✅ BigQuery: {source_name} agora é particionada; original em {result.backup}")
+
+    if not keep_backup:
+        client.delete_table(result.backup)
+        result.backup = None
+    return result
+
+
+def main(argv: list = None) -> int:
+    """Linha de comando: provisiona ou migra tabelas com um dos layouts (sales/logs)"""
+    from BigQueryPool import get_pool
+
+    parser = argparse.ArgumentParser(description="Cria ou migra tabelas do BigQuery com partição e clustering")
+    parser.add_argument("command", choices=["provision", "migrate"])
+    parser.add_argument("tables", nargs="+", help="tabelas como dataset.tabela ou projeto.dataset.tabela")
+    parser.add_argument("--credentials", required=True, help="arquivo JSON da conta de serviço")
+    parser.add_argument("--layout", choices=sorted(LAYOUTS), default="sales")
+    parser.add_argument("--partition-type", choices=PARTITION_TYPES, help="substitui o tipo de partição do layout")
+    parser.add_argument("--require-partition-filter", action="store_true",
+                        help="recusa consultas sem filtro na coluna de partição")
+    parser.add_argument("--no-swap", action="store_true", help="migrate: só copia, sem trocar os nomes")
+    parser.add_argument("--drop-backup", action="store_true", help="migrate: apaga a tabela original depois da troca")
+    parser.add_argument("--dry-run", action="store_true", help="migrate: só estima os bytes da cópia")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    layout = LAYOUTS[args.layout]
+    overrides = {}
+    if args.partition_type:
+        overrides["partition_type"] = args.partition_type
+    if args.require_partition_filter:
+        overrides["require_partition_filter"] = True
+    if overrides:
+        layout = TableLayout(**{**layout.__dict__, **overrides})
+
+    client = get_pool().acquire(args.credentials)
+    failed = False
+    for table_ref in args.tables:
+        try:
+            if args.command == "provision":
+                result = provision_table(client, table_ref, layout)
+                status = "criada" if result.created else ("precisa de migração: " + result.reason
+                                                          if result.needs_migration else "ok")
+                print(f"{table_ref}: {status} {', '.join(result.updated_fields)}".rstrip())
+            else:
+                result = migrate_table(client, table_ref, layout, swap=not args.no_swap,
+                                       keep_backup=not args.drop_backup, dry_run=args.dry_run)
+                if result.dry_run:
+                    print(f"{table_ref}: {result.source_rows} linhas, cópia leria "
+                          f"{result.bytes_processed / 1024 ** 3:.4f} GiB")
+                else:
+                    print(f"{table_ref}: {result.copied_rows} linhas em {result.target}"
+                          + (f" (backup em {result.backup})" if result.backup else ""))
+        except Exception as e:
+            failed = True
+            logger.error(f"❌ BigQuery: {table_ref}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
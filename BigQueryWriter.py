@@ -0,0 +1,318 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from BigQueryRetry import DeadLetterFile, RetryPolicy, is_retryable_exception, is_retryable_row
+from BigQuerySql import table_name
+
+# Limites do streaming insert (tabledata.insertAll): 10 MB por requisição e
+# 50.000 linhas, com recomendação do Google de ~500 linhas por requisição.
+# Ficamos um pouco abaixo do limite de bytes por causa do envelope JSON.
+DEFAULT_MAX_BYTES = 9 * 1024 * 1024
+DEFAULT_MAX_ROWS = 500
+DEFAULT_MAX_WORKERS = 4
+
+# Bytes extras por linha no corpo da requisição ({"json": ..., "insertId": ...})
+ROW_OVERHEAD_BYTES = 64
+
+DEFAULT_SEEN_ENTRIES = 1_000_000
+
+
+def encoded_size(row: dict) -> int:
+    """Tamanho aproximado (em bytes) da linha serializada no corpo do insertAll"""
+    return len(json.dumps(row, separators=(",", ":"), default=str).encode("utf-8")) + ROW_OVERHEAD_BYTES
+
+
+def insert_id(row: dict, key):
+    """insertId determinístico a partir da chave da linha; None se a linha não tem a chave.
+
+    ``key`` pode ser o nome de uma coluna (ex.: "_id"), uma tupla de colunas ou
+    uma função que recebe a linha. O valor é resumido num hash de 32
+    caracteres, então chaves longas ou compostas respeitam o limite do insertId.
+    """
+    if callable(key):
+        value = key(row)
+    elif isinstance(key, (tuple, list)):
+        if any(column not in row for column in key):
+            return None
+        value = [row[column] for column in key]
+    else:
+        value = row.get(key)
+    if value is None:
+        return None
+    text = json.dumps(value, separators=(",", ":"), sort_keys=True, default=str)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def row_content(row: dict) -> dict:
+    """Chave com a linha inteira: insertId pelo conteúdo, para tabelas sem coluna de id (ex.: logs)"""
+    return row
+
+
+def insert_ids(rows: list, key) -> list:
+    """insertIds das linhas; linhas sem a chave recebem um UUID (comportamento padrão do cliente)"""
+    return [insert_id(row, key) or uuid.uuid4().hex for row in rows]
+
+
+class SeenIdIndex:
+    """Conjunto LRU limitado dos insertIds já gravados, por tabela.
+
+    A deduplicação do BigQuery pelo insertId é best-effort e só vale por alguns
+    minutos; o índice descarta localmente as linhas que já foram gravadas, antes
+    de gastar bytes de streaming insert. Guarda no máximo ``max_entries`` ids
+    (os usados há mais tempo saem primeiro) e, com ``path``, é carregado do
+    disco na criação e salvo com ``save()``.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_SEEN_ENTRIES, path: str = None):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+
+        self.max_entries = max_entries
+        self.path = path
+        self.__entries: OrderedDict = OrderedDict()
+        self.__lock = threading.Lock()
+        self.hits = 0
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    @staticmethod
+    def namespace(table) -> str:
+        """'dataset.tabela' para Table, TableReference ou nome com/sem projeto"""
+        return ".".join(table_name(table).strip("`").split(".")[-2:])
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def seen(self, table, insert_id: str) -> bool:
+        return f"{self.namespace(table)}:{insert_id}" in self.__entries
+
+    def filter_new(self, table, ids: list) -> list:
+        """Posições dos ids ainda não gravados (repetidos no próprio lote ficam só na primeira)"""
+        namespace = self.namespace(table)
+        positions = []
+        batch = set()
+        with self.__lock:
+            for position, insert_id in enumerate(ids):
+                entry = f"{namespace}:{insert_id}"
+                if entry in self.__entries:
+                    self.__entries.move_to_end(entry)
+                    self.hits += 1
+                elif entry in batch:
+                    self.hits += 1
+                else:
+                    batch.add(entry)
+                    positions.append(position)
+        return positions
+
+    def add(self, table, ids) -> None:
+        namespace = self.namespace(table)
+        with self.__lock:
+            for insert_id in ids:
+                entry = f"{namespace}:{insert_id}"
+                self.__entries[entry] = None
+                self.__entries.move_to_end(entry)
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+            self.hits = 0
+
+    def load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:
+            entries = [line.rstrip("\n") for line in f if line.strip()]
+        with self.__lock:
+            self.__entries = OrderedDict.fromkeys(entries[-self.max_entries:])
+
+    def save(self) -> None:
+        """Grava o índice (um id por linha, do mais antigo ao mais recente) de forma atômica"""
+        if self.path is None:
+            raise ValueError("SeenIdIndex has no path")
+        with self.__lock:
+            entries = list(self.__entries)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.writelines(f"{entry}\n" for entry in entries)
+        os.replace(temporary, self.path)
+
+    def stats(self) -> dict:
+        return {"entries": len(self.__entries), "max_entries": self.max_entries, "hits": self.hits}
+
+
+@dataclass
+class ChunkResult:
+    """Resultado do envio de um lote de linhas"""
+    index: int
+    start: int
+    rows: int
+    bytes: int
+    errors: list = field(default_factory=list)
+    exception: Exception = None
+    attempts: int = 0
+    retried_rows: int = 0
+    dead_lettered: int = 0
+    # Linhas ainda pendentes quando a exceção interrompeu o lote
+    lost_rows: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and self.exception is None
+
+
+def collect_errors(results: list) -> list:
+    """Junta os erros de todos os lotes, com o índice relativo ao payload original.
+
+    A exceção que encerra um lote entra com ``rows`` = linhas que ainda estavam
+    pendentes; as que já tinham falhado antes aparecem nos erros por linha.
+    """
+    errors = []
+    for result in results:
+        if result.exception is not None:
+            errors.append({"chunk": result.index, "start": result.start, "rows": result.lost_rows,
+                           "errors": [{"reason": "exception", "message": str(result.exception)}]})
+        errors.extend(result.errors)
+    return errors
+
+
+class ChunkedWriter:
+    """Divide payloads grandes em lotes por tamanho/quantidade e envia em paralelo.
+
+    Com ``seen_index`` e insertIds conhecidos (``row_ids`` ou ``row_key``), as
+    linhas já gravadas são descartadas antes do envio e os ids das linhas
+    aceitas entram no índice. Com ``retry``, só as linhas com erro temporário
+    são reenviadas (com o mesmo insertId); as que falham de vez vão para
+    ``dead_letter``.
+    """
+
+    def __init__(self, client, max_bytes: int = DEFAULT_MAX_BYTES, max_rows: int = DEFAULT_MAX_ROWS,
+                 max_workers: int = DEFAULT_MAX_WORKERS, seen_index: SeenIdIndex = None,
+                 retry: RetryPolicy = None, dead_letter: DeadLetterFile = None):
+        if max_bytes <= 0 or max_rows <= 0 or max_workers <= 0:
+            raise ValueError("max_bytes, max_rows and max_workers must be positive")
+
+        self.__client = client
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.max_workers = max_workers
+        self.seen_index = seen_index
+        self.retry = retry
+        self.dead_letter = dead_letter
+
+    def split(self, rows: list) -> list:
+        """Retorna os lotes como tuplas (inicio, fim, bytes) sobre a lista de linhas"""
+        chunks = []
+        start, size = 0, 0
+        for i, row in enumerate(rows):
+            row_size = encoded_size(row)
+            if i > start and (size + row_size > self.max_bytes or i - start >= self.max_rows):
+                chunks.append((start, i, size))
+                start, size = i, 0
+            size += row_size
+        if start < len(rows):
+            chunks.append((start, len(rows), size))
+        return chunks
+
+    def write(self, table, rows: list, row_ids: list = None, row_key=None) -> list:
+        """Envia as linhas em lotes e retorna um ChunkResult por lote, na ordem original.
+
+        ``row_key`` (coluna, tupla de colunas ou função) gera insertIds
+        determinísticos quando ``row_ids`` não é informado. Os índices nos erros
+        sempre se referem à lista ``rows`` recebida.
+        """
+        if row_ids is not None and len(row_ids) != len(rows):
+            raise ValueError("row_ids must have the same length as rows")
+        if row_ids is None and row_key is not None:
+            row_ids = insert_ids(rows, row_key)
+        if row_ids is None and self.retry is not None:
+            # Reenvios precisam do mesmo insertId para não duplicar o que já entrou
+            row_ids = [uuid.uuid4().hex for _ in rows]
+
+        positions = None
+        if self.seen_index is not None and row_ids is not None:
+            positions = self.seen_index.filter_new(table, row_ids)
+            if len(positions) == len(rows):
+                positions = None
+            else:
+                rows = [rows[i] for i in positions]
+                row_ids = [row_ids[i] for i in positions]
+
+        chunks = self.split(rows)
+        if not chunks:
+            return []
+
+        def original(index: int) -> int:
+            return index if positions is None else positions[index]
+
+        def send(index: int, chunk: tuple) -> ChunkResult:
+            start, end, size = chunk
+            result = ChunkResult(index=index, start=original(start), rows=end - start, bytes=size)
+            pending = list(range(start, end))
+            failed = {}
+            started = time.monotonic()
+
+            while True:
+                result.attempts += 1
+                retryable = {}
+                kwargs = {}
+                if row_ids is not None:
+                    kwargs["row_ids"] = [row_ids[i] for i in pending]
+                try:
+                    errors = self.__client.insert_rows_json(table, [rows[i] for i in pending], **kwargs)
+                except Exception as e:
+                    if self.retry is None or not is_retryable_exception(e) \
+                            or not self.retry.allows(result.attempts, started):
+                        result.exception = e
+                        result.lost_rows = len(pending)
+                        break
+                    retryable = {i: None for i in pending}
+                else:
+                    for error in errors or []:
+                        position = pending[error.get("index", 0)]
+                        if self.retry is not None and is_retryable_row(error):
+                            retryable[position] = error
+                        else:
+                            failed[position] = error
+                    if self.seen_index is not None and row_ids is not None:
+                        self.seen_index.add(table, [row_ids[i] for i in pending
+                                                    if i not in failed and i not in retryable])
+
+                if not retryable:
+                    break
+                if not self.retry.allows(result.attempts, started):
+                    failed.update(retryable)
+                    break
+                result.retried_rows += len(retryable)
+                self.retry.wait(result.attempts, started)
+                pending = sorted(retryable)
+
+            for position in sorted(failed):
+                error = dict(failed[position])
+                error["index"] = original(position)
+                result.errors.append(error)
+
+            if result.exception is not None:
+                # As linhas que estavam sendo enviadas quando a exceção aconteceu se perderam
+                message = [{"reason": "exception", "message": str(result.exception)}]
+                failed.update((i, {"errors": message}) for i in pending)
+            if self.dead_letter is not None and failed:
+                self.dead_letter.write(table, [
+                    (rows[i], row_ids[i] if row_ids is not None else None, failed[i].get("errors", []))
+                    for i in sorted(failed)
+                ], result.attempts)
+                result.dead_lettered = len(failed)
+            return result
+
+        if len(chunks) == 1 or self.max_workers == 1:
+            return [send(i, chunk) for i, chunk in enumerate(chunks)]
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as pool:
+            futures = [pool.submit(send, i, chunk) for i, chunk in enumerate(chunks)]
+            return [future.result() for future in futures]
@@ -1,19 +1,32 @@
 # 1. Instalar no seu venv as bibliotecas necessarias do google: 
 # pip install google-cloud-bigquery
 
-# 2. importar modulos referentes ao bigquery e autenticação:
+# 2. importar modulos referentes ao bigquery e autenticação
+# (a biblioteca do BigQuery só é carregada quando o cliente é criado, então
+# importar este módulo é rápido):
 
-from google.cloud import bigquery
-from google.oauth2 import service_account
-import json
+import datetime
+import functools
+import logging
+import os
+from BigQueryBuilder import QueryBuilder
+from BigQueryCost import GIB, ByteBudget, estimate_pruning, estimate_query, estimate_sql_file, format_report
+from BigQueryLoader import WRITE_APPEND, load_files, load_records
+from BigQueryMutations import BatchMutation, delete_where, insert_rows_dml
+from BigQueryPool import get_pool
+from BigQuerySummaries import provision_summaries, refresh_summaries
+from BigQueryTables import SALES_LAYOUT, migrate_table, provision_table
+from BigQueryWriter import SeenIdIndex, insert_ids
 # 3. Configurar a autenticação com o arquivo de credenciais criado no Google Cloud Platform 
 # e realizar a conexão com o BigQuery:
 
-credenciais  = service_account.Credentials.from_service_account_file(
-   "teste5-465314-5743e2d188a4.json"
-)
+CREDENCIAIS = "teste5-465314-5743e2d188a4.json"
 
-cliente = bigquery.Client(credentials=credenciais)
+# O cliente é criado na primeira chamada (lê as credenciais e abre a conexão só
+# quando alguma função realmente usa o BigQuery) e vem do pool do processo
+@functools.lru_cache(maxsize=1)
+def get_cliente():
+    return get_pool().acquire(CREDENCIAIS)
 
 exemplos = [
   {
@@ -482,95 +495,250 @@ exemplos = [
 
 dataset_id = "teste5-465314.TesteBigQuery.VendasLBC2"
 
+
+# Limite de bytes das consultas da demonstração: cada consulta passa antes por um
+# dry run (gratuito) e só avisa se passar do limite; use mode="raise" para recusar
+orcamento = ByteBudget(per_query_bytes=1 * GIB, per_session_bytes=10 * GIB, mode="warn")
+
+# Executa uma consulta parametrizada (Query do BigQueryBuilder): o texto SQL é
+# sempre o mesmo e os valores vão como parâmetros, o que aproveita o cache do
+# BigQuery e evita injeção de SQL (ex.: nomes com aspas simples).
+# Com verificar_poda=True a consulta precisa de um período (where_window): um
+# segundo dry run sem o período mostra quanto da tabela a poda deixou de ler
+def _executar(consulta, verificar_poda=False):
+    _conferir_orcamento(consulta, verificar_poda)
+    return get_cliente().query(consulta.sql, job_config=consulta.job_config())
+
+
+# Dry run da consulta, mostra a estimativa e confere o orçamento antes de executar
+# (usado também pelos DELETE que rodam via delete_where)
+def _conferir_orcamento(consulta, verificar_poda=False):
+    if verificar_poda:
+        poda = estimate_pruning(get_cliente(), consulta.sql, consulta.parameters)
+        estimativa = poda.window
+        if poda.ok:
+            print(f"🗂️ Período lê {poda.window.bytes_processed / 1024 ** 2:.2f} MB de "
+                  f"{poda.full_scan.bytes_processed / 1024 ** 2:.2f} MB da tabela ({poda.scanned_fraction:.0%})")
+    else:
+        estimativa = estimate_query(get_cliente(), consulta.sql, consulta.parameters)
+    if estimativa.ok:
+        print(f"💰 Consulta vai ler {estimativa.bytes_processed / 1024 ** 2:.2f} MB "
+              f"(~US$ {estimativa.cost_usd:.6f})")
+    orcamento.check(estimativa)
+
+
+# Estima (sem executar) o custo de todas as consultas do arquivo usado no Looker Studio
+def relatorio_custos_looker(arquivo="queries_looker_studio.sql"):
+    try:
+        estimativas = estimate_sql_file(get_cliente(), arquivo)
+        print(f"💰 CUSTO ESTIMADO POR EXECUÇÃO - {arquivo}:")
+        print(format_report(estimativas))
+        return estimativas
+    except Exception as e:
+        print(f"Erro ao estimar custos: {e}")
+
+# Resumos diários (por dia/hora, cliente e produto) usados pelo dashboard em
+# queries_looker_studio_resumos.sql: cada atualização recalcula só os dias a
+# partir do último created_at já resumido, então o custo do dashboard não
+# cresce com o histórico. Compare: relatorio_custos_looker("queries_looker_studio_resumos.sql")
+def atualizar_resumos_vendas(desde=None):
+    try:
+        provision_summaries(get_cliente(), dataset_id)
+        resultado = refresh_summaries(get_cliente(), dataset_id, since=desde)
+        print(f"Resumos atualizados desde {resultado.start.date() if resultado.start else 'o início'} "
+              f"({resultado.bytes_processed / 1024 ** 2:.2f} MB lidos)")
+        for tabela, linhas in resultado.affected_rows.items():
+            print(f"   {tabela}: {linhas} linhas")
+        return resultado
+    except Exception as e:
+        print(f"Erro ao atualizar resumos: {e}")
+
+# Tabela particionada por dia em created_at e clusterizada por name/_id: consultas
+# com período leem só as partições do período e buscas por cliente/pedido leem
+# menos blocos. Cria a tabela se não existir; se ela já existir sem partição,
+# avisa que é preciso migrar (migrar_tabela_vendas)
+def provisionar_tabela_vendas():
+    try:
+        resultado = provision_table(get_cliente(), dataset_id, SALES_LAYOUT)
+        _periodo_obrigatorio.cache_clear()
+        if resultado.created:
+            print("Tabela criada com partição por dia e clustering")
+        elif resultado.needs_migration:
+            print(f"Tabela precisa ser migrada: {resultado.reason}")
+        else:
+            print(f"Tabela já particionada; ajustes: {', '.join(resultado.updated_fields) or 'nenhum'}")
+        return resultado
+    except Exception as e:
+        print(f"Erro ao provisionar tabela: {e}")
+
+# Copia a tabela atual para uma nova particionada e troca os nomes (a original
+# fica como backup). Com simular=True só estima os bytes da cópia. Pare as
+# inserções antes de migrar: o que chegar durante a cópia fica só no backup
+def migrar_tabela_vendas(simular=True):
+    try:
+        resultado = migrate_table(get_cliente(), dataset_id, SALES_LAYOUT, dry_run=simular)
+        _periodo_obrigatorio.cache_clear()
+        if simular:
+            print(f"Migração copiaria {resultado.source_rows} linhas "
+                  f"({resultado.bytes_processed / 1024 ** 2:.2f} MB lidos)")
+        else:
+            print(f"Tabela migrada: {resultado.copied_rows} linhas, backup em {resultado.backup}")
+        return resultado
+    except Exception as e:
+        print(f"Erro ao migrar tabela: {e}")
+
 # 4. Inserir dados no BigQuery:
-def inserir_dados_bigquery():
+# ids já gravados por esta máquina (salvo em disco para valer entre execuções);
+# o arquivo só é lido na primeira inserção, como o cliente
+@functools.lru_cache(maxsize=1)
+def get_indice_ids():
+    return SeenIdIndex(max_entries=100_000, path=".ids_inseridos")
+
+def inserir_dados_bigquery(dados=None):
    try:
-      
-      # Nao possui controle de ids, logo e bom gerar uma flag no banco que gera os dados para nao salvar ids repetidos
-      # para nao perder a eficiencia do insert_rows_json
-      cliente.insert_rows_json(
+      dados = exemplos if dados is None else dados
+
+      # O insertId vem do _id: se o mesmo pedido for reenviado (retry ou nova
+      # execução) o BigQuery descarta a cópia, e o índice local nem chega a enviá-la
+      ids = insert_ids(dados, "_id")
+      novos = get_indice_ids().filter_new(dataset_id, ids)
+      if not novos:
+         print("Nenhum dado novo para inserir")
+         return
+
+      erros = get_cliente().insert_rows_json(
          dataset_id,
-         exemplos,
-         
+         [dados[i] for i in novos],
+         row_ids=[ids[i] for i in novos],
       )
-    
-      print("Dados inseridos com sucesso")
+      if erros:
+         print(f"Erros ao inserir dados: {erros}")
+         return
+
+      indice_ids = get_indice_ids()
+      indice_ids.add(dataset_id, [ids[i] for i in novos])
+      indice_ids.save()
+      print(f"Dados inseridos com sucesso ({len(novos)} novos, {len(dados) - len(novos)} repetidos ignorados)")
    except Exception as e:
       print(f"Erro ao inserir dados: {e}")
 
 # 4.1 Inserir dados usando Job Loading (permite UPDATE/DELETE imediatos)
-def inserir_dados_bigquery_job_loading():
-    """Insere dados usando job loading - permite UPDATE/DELETE imediatos"""
+@functools.lru_cache(maxsize=1)
+def _schema_tabela():
+    # Buscar o schema da tabela uma única vez para evitar conflitos
+    return get_cliente().get_table(dataset_id).schema
+
+
+def inserir_dados_bigquery_job_loading(arquivos="exemplos.json", max_jobs=4):
+    """Insere dados usando job loading - permite UPDATE/DELETE imediatos
+    
+    ``arquivos`` pode ser um arquivo, um diretório ou um glob (ex.: "dados/*.json")
+    com arquivos NDJSON, CSV ou Parquet; eles são agrupados em load jobs de
+    tamanho parecido que rodam em paralelo (no máximo ``max_jobs`` ao mesmo tempo).
+    """
     try:
-        # Buscar o schema da tabela para evitar conflitos
-        table_schema = cliente.get_table(dataset_id).schema
-       
-        
-        with open("exemplos.json", 'rb') as source_file:
-            job = cliente.load_table_from_file(
-                source_file,
-                dataset_id,
-                job_config=bigquery.LoadJobConfig(
-                    source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
-                    schema=table_schema,  # Schema definido manualmente
-                    write_disposition=bigquery.WriteDisposition.WRITE_APPEND  # Adiciona aos dados existentes
-                )
-            )
+        resultados = load_files(
+            get_cliente(),
+            arquivos,
+            dataset_id,
+            schema=_schema_tabela(),  # Schema definido manualmente
+            max_concurrent=max_jobs,
+            write_disposition=WRITE_APPEND  # Adiciona aos dados existentes
+        )
         
-        # Aguardar o job terminar
-        job.result()
+        if not resultados:
+            print(f"✗ Nenhum arquivo encontrado em {arquivos}")
+            return resultados
         
+        for resultado in resultados:
+            if resultado.ok:
+                print(f"✓ {resultado.path} carregado (job {resultado.job_id})")
+            else:
+                print(f"✗ {resultado.path}: {resultado.error}")
         
         print("✓ Dados inseridos via Job Loading - UPDATE/DELETE disponíveis imediatamente!")
+        return resultados
         
     except Exception as e:
         print(f"✗ Erro ao inserir dados via job loading: {e}")
 
-# 4.2 Inserir dados usando query INSERT (permite UPDATE/DELETE imediatos)
-def inserir_dados_bigquery_via_query():
-    """Insere dados usando INSERT query - permite UPDATE/DELETE imediatos"""
+# 4.1.1 Inserir a lista em memória usando Job Loading, sem gravar arquivo em disco
+def inserir_dados_bigquery_job_loading_em_memoria(dados=None, formato="NEWLINE_DELIMITED_JSON"):
+    """Insere uma lista de dicts (ou DataFrame) via job loading - codifica direto num buffer em memória"""
     try:
+        resultados = load_records(
+            get_cliente(),
+            dataset_id,
+            exemplos if dados is None else dados,
+            source_format=formato,
+            schema=_schema_tabela(),
+        )
         
-        valores_insert = []
-        for exemplo in exemplos: 
-            # Converter products para formato JSON string
-            struct = f"STRUCT('{exemplo['name']}' as name, '{exemplo['sku']}' as sku, {exemplo['price']} as price, {exemplo['quantity']} as quantity)"
-            products_json = str(exemplo['products']).replace("'", '"')
-            
-            valor = f"""(
-                '{exemplo['_id']}',
-                '{exemplo['name']}',
-                TIMESTAMP('{exemplo['created_at']}'),
-                PARSE_JSON('{products_json}')
-            )"""
-            valores_insert.append(valor)
-        
-        valores_str = ',\n'.join(valores_insert)
+        for resultado in resultados:
+            if not resultado.ok:
+                print(f"✗ Load job com {resultado.rows} registros falhou: {resultado.error}")
         
-        query = f"""
-        INSERT INTO `{dataset_id}` (_id, name, created_at, products)
-        VALUES {valores_str}
-        """
+        print(f"✓ {sum(r.rows for r in resultados if r.ok)} registros inseridos via Job Loading em memória!")
+        return resultados
         
+    except Exception as e:
+        print(f"✗ Erro ao inserir dados via job loading em memória: {e}")
+
+# 4.2 Inserir dados usando query INSERT (permite UPDATE/DELETE imediatos)
+def inserir_dados_bigquery_via_query(dados=None):
+    """Insere dados usando INSERT query - permite UPDATE/DELETE imediatos
+    
+    As linhas vão como um único parâmetro ARRAY<STRUCT> (INSERT ... SELECT FROM
+    UNNEST(@rows)) em vez de um VALUES gigante montado com strings: o texto da
+    query não cresce com o número de linhas, aspas nos nomes não quebram nada e
+    lotes grandes são divididos automaticamente em vários jobs.
+    """
+    try:
+        resultado = insert_rows_dml(get_cliente(), dataset_id, exemplos if dados is None else dados, _schema_tabela())
         
-        job = cliente.query(query)
-        result = job.result()
-        
-        print("✓ Dados inseridos via INSERT query - UPDATE/DELETE disponíveis imediatamente!")
+        print(f"✓ {resultado.affected_rows} linhas inseridas via INSERT query em {len(resultado.jobs)} job(s)"
+              " - UPDATE/DELETE disponíveis imediatamente!")
         
     except Exception as e:
         print(f"✗ Erro ao inserir dados via query: {e}")
 
       
+# Limites de TIMESTAMP do BigQuery: o período que cobre todas as partições
+PRIMEIRO_INSTANTE = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+ULTIMO_INSTANTE = datetime.datetime.max.replace(tzinfo=datetime.timezone.utc)
+
+
+# A tabela foi criada com require_partition_filter (BigQueryTables --require-partition-filter)?
+# Lido uma vez dos metadados da tabela
+@functools.lru_cache(maxsize=1)
+def _periodo_obrigatorio():
+    return bool(get_cliente().get_table(dataset_id).require_partition_filter)
+
+
+# Período opcional das consultas: com a tabela particionada, informar a data do
+# pedido faz a consulta ler só a partição daquele dia. Sem período, a consulta
+# lê a tabela toda; se a tabela exige filtro de partição, o filtro entra com o
+# período inteiro para o BigQuery aceitar a consulta
+def _no_periodo(consulta, data_inicio=None, data_fim=None):
+    if data_inicio is not None:
+        consulta.where_window("created_at", data_inicio, data_fim)
+    elif _periodo_obrigatorio():
+        consulta.where_window("created_at", PRIMEIRO_INSTANTE, ULTIMO_INSTANTE)
+    return consulta
+
+      
 # 5. Ler dados da tabela - FORMA SIMPLES SEM PANDAS:
-def ler_dados_bigquery():
-   """Visualização simples dos dados - SEM pandas"""
+# data_inicio/data_fim são datas ("2025-07-01") inclusivas ou horários (fim
+# exclusivo); sem data_fim lê só o dia de data_inicio e sem data_inicio lê tudo
+def ler_dados_bigquery(data_inicio=None, data_fim=None):
+   """Visualização simples dos dados (do período, se informado) - SEM pandas"""
    try:
-      query = f"""
-      SELECT * FROM `{dataset_id}`
-      ORDER BY created_at
-      """
-      job = cliente.query(query)
+      # Colunas explícitas: o BigQuery cobra por coluna lida, então SELECT * só
+      # quando todas são usadas (aqui todas são exibidas). O período compara
+      # created_at direto com os parâmetros, então só as partições dele são lidas
+      consulta = _no_periodo(QueryBuilder.select(dataset_id, ["_id", "name", "created_at", "products"]),
+                             data_inicio, data_fim).order_by("created_at").build()
+      job = _executar(consulta, verificar_poda=data_inicio is not None)
       results = job.result()
       
       print("📊 DADOS DA TABELA:")
@@ -588,7 +756,7 @@ def ler_dados_bigquery():
           if row.products:
               print(f"   Produtos: {row.products}")
           else:
-              print(f"   Produtos: Nenhum")
+              print("   Produtos: Nenhum")
           
           print("-" * 60)
       
@@ -599,14 +767,12 @@ def ler_dados_bigquery():
 
 
 # 5.1. Visualização ainda mais simples - só os valores
-def ler_dados_simples():
-   """Mostra apenas os valores básicos"""
+def ler_dados_simples(data_inicio=None, data_fim=None):
+   """Mostra apenas os valores básicos dos pedidos (do período, se informado)"""
    try:
-      query = f"""
-      SELECT _id, name, created_at FROM `{dataset_id}`
-      ORDER BY created_at
-      """
-      job = cliente.query(query)
+      consulta = _no_periodo(QueryBuilder.select(dataset_id, ["_id", "name", "created_at"]),
+                             data_inicio, data_fim).order_by("created_at").build()
+      job = _executar(consulta, verificar_poda=data_inicio is not None)
       results = job.result()
       
       print("📋 RESUMO DOS PEDIDOS:")
@@ -631,11 +797,9 @@ def ler_dados_simples():
 def ler_um_registro():
    """Mostra apenas um registro para verificar se está funcionando"""
    try:
-      query = f"""
-      SELECT * FROM `{dataset_id}`
-      LIMIT 1
-      """
-      job = cliente.query(query)
+      # LIMIT não reduz os bytes lidos; só as colunas escolhidas reduzem
+      consulta = _no_periodo(QueryBuilder.select(dataset_id, ["_id", "name", "created_at", "products"])).limit(1).build()
+      job = _executar(consulta)
       results = job.result()
       
       print("🔍 TESTANDO - APENAS 1 REGISTRO:")
@@ -656,10 +820,7 @@ def ler_um_registro():
 def contar_registros():
    """Apenas conta quantos registros existem na tabela"""
    try:
-      query = f"""
-      SELECT COUNT(*) as total FROM `{dataset_id}`
-      """
-      job = cliente.query(query)
+      job = _executar(_no_periodo(QueryBuilder.select(dataset_id, ["COUNT(*) as total"])).build())
       results = job.result()
       
       for row in results:
@@ -671,14 +832,11 @@ def contar_registros():
 
 
 # 5.4. Buscar pedido específico - FORMA SIMPLES
-def buscar_pedido_simples(id_pedido):
-   """Busca um pedido específico sem pandas"""
+def buscar_pedido_simples(id_pedido, data_inicio=None, data_fim=None):
+   """Busca um pedido específico sem pandas (no período, se informado)"""
    try:
-      query = f"""
-      SELECT * FROM `{dataset_id}`
-      WHERE _id = '{id_pedido}'
-      """
-      job = cliente.query(query)
+      consulta = _no_periodo(QueryBuilder.select(dataset_id).where_eq("_id", id_pedido), data_inicio, data_fim).build()
+      job = _executar(consulta)
       results = job.result()
       
       encontrou = False
@@ -699,20 +857,21 @@ def buscar_pedido_simples(id_pedido):
 
 
 # 5.5. Mostrar produtos de um pedido específico
-def ver_produtos_pedido(id_pedido):
-   """Mostra apenas os produtos de um pedido específico"""
+def ver_produtos_pedido(id_pedido, data_inicio=None, data_fim=None):
+   """Mostra apenas os produtos de um pedido específico (no período, se informado)"""
    try:
-      query = f"""
-      SELECT 
-          produto.name as produto,
-          produto.sku,
-          produto.price as preco,
-          produto.quantity as quantidade
-      FROM `{dataset_id}`,
-      UNNEST(products) as produto
-      WHERE _id = '{id_pedido}'
-      """
-      job = cliente.query(query)
+      consulta = (
+          _no_periodo(QueryBuilder.select(dataset_id, [
+              "produto.name as produto",
+              "produto.sku",
+              "produto.price as preco",
+              "produto.quantity as quantidade",
+          ])
+          .unnest("products", "produto")
+          .where_eq("_id", id_pedido), data_inicio, data_fim)
+          .build()
+      )
+      job = _executar(consulta)
       results = job.result()
       
       print(f"🛒 PRODUTOS DO PEDIDO {id_pedido}:")
@@ -747,23 +906,20 @@ def ver_produtos_pedido(id_pedido):
 
 def deletar_dados_bigquery():
    try:
-      cliente.delete_table(dataset_id)
+      get_cliente().delete_table(dataset_id)
       print("Dados deletados com sucesso")
    except Exception as e:
       print(f"Erro ao deletar dados: {e}")
 
 
 # 5.1.1 Deletar um registro específico por ID
-def deletar_por_id(id_pedido):
-    """Deleta um pedido específico pelo ID"""
+def deletar_por_id(id_pedido, data_inicio=None, data_fim=None):
+    """Deleta um pedido específico pelo ID (no período, se informado)"""
     try:
-        query = f"""
-        DELETE FROM `{dataset_id}`
-        WHERE _id = '{id_pedido}'
-        """
+        consulta = _no_periodo(QueryBuilder.delete(dataset_id).where_eq("_id", id_pedido), data_inicio, data_fim).build()
         
-        job = cliente.query(query)
-        result = job.result()
+        job = _executar(consulta)
+        job.result()
         
         print(f"✓ Pedido com ID '{id_pedido}' deletado com sucesso!")
         print(f"Total de linhas afetadas: {job.num_dml_affected_rows}")
@@ -772,17 +928,34 @@ def deletar_por_id(id_pedido):
         print(f"✗ Erro ao deletar pedido: {e}")
 
 
+# 5.1.1.1 Deletar vários IDs de uma vez (um único job em vez de um por ID)
+def deletar_varios_ids(ids_pedidos):
+    """Deleta vários pedidos em lote - MERGE único para lotes grandes"""
+    try:
+        lote = BatchMutation(dataset_id)
+        for id_pedido in ids_pedidos:
+            lote.delete(id_pedido)
+        
+        # Cada DML do lote passa por um dry run e pelo orçamento antes de rodar
+        resultado = lote.apply(get_cliente(), budget=orcamento)
+        
+        print(f"💰 Lote leu ~{resultado.estimated_bytes / 1024 ** 2:.2f} MB (estimativa dos dry runs)")
+        print(f"✓ {len(ids_pedidos)} pedidos deletados via {resultado.strategy}!")
+        print(f"Total de linhas afetadas: {resultado.affected_rows} ({len(resultado.jobs)} job(s))")
+        
+    except Exception as e:
+        print(f"✗ Erro ao deletar pedidos em lote: {e}")
+
+
 # 5.1.2 Deletar por nome do cliente
-def deletar_por_cliente(nome_cliente):
-    """Deleta todos os pedidos de um cliente específico"""
+def deletar_por_cliente(nome_cliente, data_inicio=None, data_fim=None):
+    """Deleta todos os pedidos de um cliente específico (no período, se informado)"""
     try:
-        query = f"""
-        DELETE FROM `{dataset_id}`
-        WHERE name = '{nome_cliente}'
-        """
+        consulta = _no_periodo(QueryBuilder.delete(dataset_id).where_eq("name", nome_cliente),
+                               data_inicio, data_fim).build()
         
-        job = cliente.query(query)
-        result = job.result()
+        job = _executar(consulta)
+        job.result()
         
         print(f"✓ Todos os pedidos do cliente '{nome_cliente}' foram deletados!")
         print(f"Total de linhas afetadas: {job.num_dml_affected_rows}")
@@ -793,27 +966,17 @@ def deletar_por_cliente(nome_cliente):
 
 # 5.1.3 Deletar por data específica
 def deletar_por_data(data_inicio, data_fim=None):
-    """Deleta pedidos dentro de um período específico"""
+    """Deleta pedidos de um dia (só data_inicio) ou de data_inicio até data_fim (inclusive, se for data)"""
     try:
-        if data_fim:
-            # Deletar entre duas datas
-            query = f"""
-            DELETE FROM `{dataset_id}`
-            WHERE created_at BETWEEN '{data_inicio}' AND '{data_fim}'
-            """
-            print(f"Deletando pedidos entre {data_inicio} e {data_fim}")
-        else:
-            # Deletar apenas de uma data específica
-            query = f"""
-            DELETE FROM `{dataset_id}`
-            WHERE DATE(created_at) = '{data_inicio}'
-            """
-            print(f"Deletando pedidos da data {data_inicio}")
+        # created_at >= @início AND created_at < @fim: com a tabela particionada por
+        # dia o DELETE só toca as partições do período (dias inteiros saem sem ler dados)
+        consulta = QueryBuilder.delete(dataset_id).where_window("created_at", data_inicio, data_fim).build()
+        print(f"Deletando pedidos de {data_inicio} até {data_fim or data_inicio}")
         
-        job = cliente.query(query)
-        result = job.result()
+        job = _executar(consulta, verificar_poda=True)
+        job.result()
         
-        print(f"✓ Pedidos deletados com sucesso!")
+        print("✓ Pedidos deletados com sucesso!")
         print(f"Total de linhas afetadas: {job.num_dml_affected_rows}")
         
     except Exception as e:
@@ -821,84 +984,82 @@ def deletar_por_data(data_inicio, data_fim=None):
 
 
 # 5.1.4 Deletar pedidos com produtos específicos
-def deletar_por_produto(nome_produto):
-    """Deleta pedidos que contêm um produto específico"""
+def deletar_por_produto(nome_produto, dry_run=False):
+    """Deleta pedidos que contêm um produto específico.
+    
+    Um único DELETE com EXISTS sobre UNNEST(products): o BigQuery filtra e
+    apaga na mesma varredura, sem SELECT prévio nem lista de IDs na query.
+    Com dry_run=True apenas mostra quantos bytes seriam lidos.
+    """
     try:
-        # Primeiro, vamos consultar os IDs dos pedidos que contêm o produto
-        query_consulta = f"""
-        SELECT DISTINCT _id
-        FROM `{dataset_id}`,
-        UNNEST(products) AS produto
-        WHERE produto.name = '{nome_produto}'
-        """
+        consulta = _no_periodo(
+            QueryBuilder.delete(dataset_id)
+            .where_exists("products", "produto", "name", "=", nome_produto)
+        ).build()
         
-        # Executar consulta para obter os IDs
-        job_consulta = cliente.query(query_consulta)
-        results = job_consulta.result()
+        if not dry_run:
+            _conferir_orcamento(consulta)
+        resultado = delete_where(get_cliente(), consulta, dry_run=dry_run)
         
-        ids_para_deletar = [row._id for row in results]
+        if dry_run:
+            print(f"🔍 DRY RUN: deletar pedidos com produto '{nome_produto}' leria {resultado.bytes_processed} bytes")
+            return
         
-        if not ids_para_deletar:
+        if not resultado.affected_rows:
             print(f"Nenhum pedido encontrado com o produto '{nome_produto}'")
             return
         
-        # Criar lista de IDs para a query DELETE
-        ids_str = "', '".join(ids_para_deletar)
-        
-        query_delete = f"""
-        DELETE FROM `{dataset_id}`
-        WHERE _id IN ('{ids_str}')
-        """
-        
-        job_delete = cliente.query(query_delete)
-        result = job_delete.result()
-        
         print(f"✓ Pedidos com produto '{nome_produto}' deletados com sucesso!")
-        print(f"IDs deletados: {ids_para_deletar}")
-        print(f"Total de linhas afetadas: {job_delete.num_dml_affected_rows}")
+        print(f"Total de linhas afetadas: {resultado.affected_rows} ({resultado.bytes_processed} bytes lidos)")
         
     except Exception as e:
         print(f"✗ Erro ao deletar pedidos por produto: {e}")
 
 
 # 5.1.5 Deletar com múltiplas condições
-def deletar_por_multiplas_condicoes(nome_cliente=None, data_inicio=None, valor_minimo=None):
-    """Deleta pedidos baseado em múltiplas condições"""
+def deletar_por_multiplas_condicoes(nome_cliente=None, data_inicio=None, valor_minimo=None, dry_run=False):
+    """Deleta pedidos baseado em múltiplas condições (dry_run=True só estima os bytes lidos)"""
     try:
         # Construir a query dinamicamente baseada nos parâmetros fornecidos
-        condicoes = []
+        consulta = QueryBuilder.delete(dataset_id)
+        possui_condicao = False
         
         if nome_cliente:
-            condicoes.append(f"name = '{nome_cliente}'")
+            consulta.where_eq("name", nome_cliente)
+            possui_condicao = True
         
         if data_inicio:
-            condicoes.append(f"created_at >= '{data_inicio}'")
+            consulta.where("created_at", ">=", data_inicio, type_="TIMESTAMP")
+            possui_condicao = True
+        else:
+            _no_periodo(consulta)
         
         if valor_minimo:
             # Para valor, precisamos calcular o total dos produtos
-            condicoes.append(f"""
-            (SELECT SUM(produto.price * produto.quantity) 
-             FROM UNNEST(products) AS produto) >= {valor_minimo}
-            """)
+            consulta.where_raw(
+                "(SELECT SUM(produto.price * produto.quantity) FROM UNNEST(products) AS produto) >= @valor_minimo",
+                valor_minimo=float(valor_minimo),
+            )
+            possui_condicao = True
         
-        if not condicoes:
+        if not possui_condicao:
             print("❌ Nenhuma condição fornecida!")
             return
         
-        where_clause = " AND ".join(condicoes)
+        consulta = consulta.build()
         
-        query = f"""
-        DELETE FROM `{dataset_id}`
-        WHERE {where_clause}
-        """
+        print(f"Executando query: {consulta}")
         
-        print(f"Executando query: {query}")
+        if not dry_run:
+            _conferir_orcamento(consulta)
+        resultado = delete_where(get_cliente(), consulta, dry_run=dry_run)
         
-        job = cliente.query(query)
-        result = job.result()
+        if dry_run:
+            print(f"🔍 DRY RUN: a deleção leria {resultado.bytes_processed} bytes")
+            return
         
-        print(f"✓ Pedidos deletados com base nas condições especificadas!")
-        print(f"Total de linhas afetadas: {job.num_dml_affected_rows}")
+        print("✓ Pedidos deletados com base nas condições especificadas!")
+        print(f"Total de linhas afetadas: {resultado.affected_rows} ({resultado.bytes_processed} bytes lidos)")
         
     except Exception as e:
         print(f"✗ Erro ao deletar com múltiplas condições: {e}")
@@ -907,36 +1068,55 @@ def deletar_por_multiplas_condicoes(nome_cliente=None, data_inicio=None, valor_m
 # 6 Atualizar os dados da tabela: 
 def atualizar_dados_bigquery_setar_novo_nome_no_pedido(id_pedido, novo_nome):
    try:
-      query = f"""
-      UPDATE `{dataset_id}`
-      SET name = '{novo_nome}'
-      WHERE _id = '{id_pedido}'
-      """
+      consulta = _no_periodo(QueryBuilder.update(dataset_id).set("name", novo_nome).where_eq("_id", id_pedido)).build()
       
-      print("executando query: ", query)
+      print("executando query: ", consulta)
       
-      job = cliente.query(query)
-      result = job.result()
+      job = _executar(consulta)
+      job.result()
       
       print("Dados atualizados com sucesso")
       
 
    except Exception as e:
       print(f"Erro ao atualizar dados: {e}")
+
+
+
+# 6.1 Atualizar vários pedidos de uma vez: {id_pedido: novo_nome}
+def atualizar_nomes_em_lote(novos_nomes):
+   """Atualiza o nome de vários pedidos com um único MERGE (ou poucos UPDATEs para lotes pequenos)"""
+   try:
+      lote = BatchMutation(dataset_id)
+      for id_pedido, novo_nome in novos_nomes.items():
+         lote.update(id_pedido, {"name": novo_nome})
+      
+      # Cada DML do lote passa por um dry run e pelo orçamento antes de rodar
+      resultado = lote.apply(get_cliente(), budget=orcamento)
+      
+      print(f"💰 Lote leu ~{resultado.estimated_bytes / 1024 ** 2:.2f} MB (estimativa dos dry runs)")
+      print(f"Dados atualizados com sucesso via {resultado.strategy}")
+      print(f"Total de linhas afetadas: {resultado.affected_rows} ({len(resultado.jobs)} job(s))")
+
+   except Exception as e:
+      print(f"Erro ao atualizar dados em lote: {e}")
    
 
 if __name__ == "__main__":
+    # Mensagens das classes BigQuery* vão para o logging; LOG_LEVEL=DEBUG mostra cada etapa
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     
     inserir_dados_bigquery()
     inserir_dados_bigquery_job_loading()
     inserir_dados_bigquery_via_query()
-    ler_dados_bigquery()
-    ler_dados_simples()
+    ler_dados_bigquery("2025-06-01", "2025-08-31")
+    ler_dados_simples("2025-08-01", "2025-08-05")
     contar_registros()
-    buscar_pedido_simples("1")
-    ver_produtos_pedido("1")
+    buscar_pedido_simples("1", "2025-06-20")
+    ver_produtos_pedido("1", "2025-06-20")
     atualizar_dados_bigquery_setar_novo_nome_no_pedido("1", "João Silva Atualizado")
-    buscar_pedido_simples("1")
-    deletar_por_id("2")
+    buscar_pedido_simples("1", "2025-06-20")
+    deletar_por_id("2", "2025-06-22")
     contar_registros()
 
@@ -0,0 +1,109 @@
+"""Compara o caminho atual (to_dataframe) com o caminho Arrow de make_query_arrow.
+
+O resultado é servido por um stub local: um RowIterator real do
+google-cloud-bigquery cujo ``api_request`` gera páginas sintéticas sob
+demanda (formato REST tabledata.list), então a conversão passa pelo mesmo
+código da biblioteca que roda em produção. A Storage Read API não é
+simulada; o caminho Arrow aqui é o fallback REST.
+
+Cada variante roda num subprocesso para medir o pico de memória (ru_maxrss).
+
+    python benchmarks/bench_arrow.py --rows 2000000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+VARIANTS = ("to_dataframe", "to_arrow", "arrow_to_pandas", "arrow_iterable")
+NAMES = ["João Silva", "Maria Oliveira", "Carlos Lima", "Ana Souza", "Bruna Rocha"]
+
+
+def make_row_iterator(rows: int, page_size: int):
+    from google.cloud.bigquery import SchemaField
+    from google.cloud.bigquery.table import RowIterator
+
+    schema = [
+        SchemaField("_id", "STRING"),
+        SchemaField("name", "STRING"),
+        SchemaField("created_at", "TIMESTAMP"),
+        SchemaField("total", "FLOAT"),
+        SchemaField("itens", "INTEGER"),
+    ]
+
+    def api_request(method, path, query_params=None, **kwargs):
+        start = int(query_params.get("pageToken") or 0) if query_params else 0
+        end = min(start + page_size, rows)
+        page = [
+            {"f": [
+                {"v": str(i)},
+                {"v": NAMES[i % len(NAMES)]},
+                {"v": str(1751328000 + i * 60)},
+                {"v": str((i % 97) * 1.5)},
+                {"v": str(i % 7)},
+            ]}
+            for i in range(start, end)
+        ]
+        response = {"rows": page, "totalRows": str(rows)}
+        if end < rows:
+            response["pageToken"] = str(end)
+        return response
+
+    return RowIterator(client=None, api_request=api_request, path="/stub", schema=schema,
+                       page_size=page_size, total_rows=rows)
+
+
+def run_variant(variant: str, rows: int, page_size: int) -> dict:
+    from BigQueryArrow import arrow_to_pandas
+
+    iterator = make_row_iterator(rows, page_size)
+    started = time.perf_counter()
+    if variant == "to_dataframe":
+        result = len(iterator.to_dataframe(create_bqstorage_client=False))
+    elif variant == "to_arrow":
+        result = iterator.to_arrow(create_bqstorage_client=False).num_rows
+    elif variant == "arrow_to_pandas":
+        result = len(arrow_to_pandas(iterator.to_arrow(create_bqstorage_client=False)))
+    else:
+        result = sum(batch.num_rows for batch in iterator.to_arrow_iterable())
+    elapsed = time.perf_counter() - started
+
+    return {
+        "variant": variant,
+        "rows": result,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": int(result / elapsed) if elapsed else None,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--page-size", type=int, default=50_000)
+    parser.add_argument("--variant", choices=VARIANTS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.rows, args.page_size)))
+        return
+
+    print(f"{'VARIANTE':<18} {'LINHAS':>10} {'SEGUNDOS':>10} {'LINHAS/S':>12} {'PICO RSS (MB)':>14}")
+    for variant in VARIANTS:
+        output = subprocess.run(
+            [sys.executable, __file__, "--variant", variant, "--rows", str(args.rows),
+             "--page-size", str(args.page_size)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{result['variant']:<18} {result['rows']:>10} {result['seconds']:>10} "
+              f"{result['rows_per_second']:>12} {result['peak_rss_mb']:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""INSERT com VALUES literal (versão anterior de inserir_dados_bigquery_via_query)
+contra INSERT com parâmetro ARRAY<STRUCT> (insert_rows_dml), num cliente local.
+
+Mede o tempo para montar a requisição (texto SQL ou parâmetros codificados),
+o tamanho total enviado e o número de jobs. O BigQuery recusa consultas com
+texto acima de 1.024 mil caracteres, marcado na coluna LIMITE.
+
+    python benchmarks/bench_dml_insert.py --rows 1000 10000 100000
+"""
+import argparse
+import time
+
+from common import RecordingClient, esquema_pedidos, gerar_pedidos
+
+from BigQueryMutations import insert_rows_dml
+
+MAX_QUERY_CHARS = 1024 * 1024
+TABELA = "projeto.dataset.VendasLBC2"
+
+
+def insert_values_literal(client, tabela: str, pedidos: list) -> None:
+    # Mesma montagem de string da versão anterior (sem o STRUCT que lia exemplo['sku'])
+    valores_insert = []
+    for exemplo in pedidos:
+        products_json = str(exemplo['products']).replace("'", '"')
+        valor = f"""(
+                '{exemplo['_id']}',
+                '{exemplo['name']}',
+                TIMESTAMP('{exemplo['created_at']}'),
+                PARSE_JSON('{products_json}')
+            )"""
+        valores_insert.append(valor)
+    valores_str = ',\n'.join(valores_insert)
+    query = f"""
+        INSERT INTO `{tabela}` (_id, name, created_at, products)
+        VALUES {valores_str}
+        """
+    client.query(query)
+    return len(query)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    esquema = esquema_pedidos()
+    print(f"{'LINHAS':>8} {'CAMINHO':<16} {'SEGUNDOS':>9} {'MB ENVIADOS':>12} {'JOBS':>5} {'LIMITE':>7}")
+    for quantidade in args.rows:
+        pedidos = gerar_pedidos(quantidade)
+
+        client = RecordingClient()
+        inicio = time.perf_counter()
+        tamanho_query = insert_values_literal(client, TABELA, pedidos)
+        tempo = time.perf_counter() - inicio
+        resumo = client.summary()
+        limite = "ESTOUROU" if tamanho_query > MAX_QUERY_CHARS else "ok"
+        print(f"{quantidade:>8} {'values_literal':<16} {tempo:>9.3f} {resumo['request_bytes'] / 1e6:>12.2f} "
+              f"{resumo['requests']:>5} {limite:>7}")
+
+        client = RecordingClient()
+        inicio = time.perf_counter()
+        insert_rows_dml(client, TABELA, pedidos, esquema)
+        tempo = time.perf_counter() - inicio
+        resumo = client.summary()
+        print(f"{quantidade:>8} {'array_struct':<16} {tempo:>9.3f} {resumo['request_bytes'] / 1e6:>12.2f} "
+              f"{resumo['requests']:>5} {'ok':>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Streaming insert com falhas injetadas: sem novas tentativas contra RetryPolicy.
+
+FlakyClient falha requisições inteiras (503) e linhas individuais
+(backendError temporário ou invalid permanente) com as probabilidades
+informadas. Como no insertAll real, se alguma linha do lote falha as demais
+voltam com "stopped" e nada do lote é gravado. Mostra as linhas gravadas,
+perdidas, enviadas ao dead-letter, requisições e vazão efetiva.
+
+    python benchmarks/bench_retry.py --rows 20000 --request-failure 0.1 --row-failure 0.001
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from common import RecordingClient, gerar_pedidos
+
+from google.api_core import exceptions
+
+from BigQueryRetry import DeadLetterFile, RetryPolicy
+from BigQueryWriter import ChunkedWriter, collect_errors
+
+TABELA = "projeto.dataset.VendasLBC2"
+
+
+class FlakyClient(RecordingClient):
+    def __init__(self, request_failure: float, row_failure: float, invalid: float, latency: float, seed: int):
+        super().__init__(latency=latency)
+        self.request_failure = request_failure
+        self.row_failure = row_failure
+        self.invalid = invalid
+        self.written = {}
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+
+    def insert_rows_json(self, table, json_rows, row_ids=None, **kwargs):
+        super().insert_rows_json(table, json_rows, row_ids=row_ids, **kwargs)
+        with self.__lock:
+            if self.__random.random() < self.request_failure:
+                raise exceptions.ServiceUnavailable("injected 503")
+            errors = []
+            for index, row in enumerate(json_rows):
+                if row.get("_invalid"):
+                    errors.append({"index": index, "errors": [{"reason": "invalid", "message": "injected"}]})
+                elif self.__random.random() < self.row_failure:
+                    errors.append({"index": index, "errors": [{"reason": "backendError", "message": "injected"}]})
+            if errors:
+                failed = {error["index"] for error in errors}
+                errors.extend({"index": index, "errors": [{"reason": "stopped", "message": ""}]}
+                              for index in range(len(json_rows)) if index not in failed)
+                return sorted(errors, key=lambda error: error["index"])
+            for row_id in row_ids or [None] * len(json_rows):
+                self.written[row_id] = self.written.get(row_id, 0) + 1
+            return []
+
+
+def executar(nome: str, pedidos: list, retry: RetryPolicy, args) -> None:
+    client = FlakyClient(args.request_failure, args.row_failure, args.invalid, args.latency, args.seed)
+    with tempfile.TemporaryDirectory() as pasta:
+        dead_letter = DeadLetterFile(os.path.join(pasta, "dead_letter.ndjson")) if retry else None
+        writer = ChunkedWriter(client, max_rows=500, max_workers=4, retry=retry, dead_letter=dead_letter)
+
+        inicio = time.perf_counter()
+        resultados = writer.write(TABELA, pedidos, row_key="_id")
+        tempo = time.perf_counter() - inicio
+
+    gravadas = len(client.written)
+    duplicadas = sum(vezes - 1 for vezes in client.written.values())
+    erros = collect_errors(resultados)
+    print(f"{nome:<12} {gravadas:>9} {len(pedidos) - gravadas:>8} {duplicadas:>6} "
+          f"{sum(r.retried_rows for r in resultados):>10} {sum(r.dead_lettered for r in resultados):>11} "
+          f"{client.summary()['requests']:>6} {len(erros):>6} {gravadas / tempo:>10.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--request-failure", type=float, default=0.1)
+    parser.add_argument("--row-failure", type=float, default=0.001)
+    parser.add_argument("--invalid", type=float, default=0.0005, help="fração de linhas permanentemente inválidas")
+    parser.add_argument("--latency", type=float, default=0.005, help="segundos por requisição")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    pedidos = gerar_pedidos(args.rows)
+    aleatorio = random.Random(args.seed)
+    for pedido in pedidos:
+        if aleatorio.random() < args.invalid:
+            pedido["_invalid"] = True
+
+    print(f"{'POLITICA':<12} {'GRAVADAS':>9} {'PERDIDAS':>8} {'DUPLIC':>6} {'REENVIADAS':>10} "
+          f"{'DEAD-LETTER':>11} {'REQS':>6} {'ERROS':>6} {'LINHAS/S':>10}")
+    executar("sem_retry", pedidos, None, args)
+    executar("retry", pedidos, RetryPolicy(max_attempts=6, initial_delay=0.01, max_delay=0.2), args)
+
+
+if __name__ == "__main__":
+    main()
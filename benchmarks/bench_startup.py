@@ -0,0 +1,86 @@
+"""Tempo de importação dos módulos do projeto (python -X importtime).
+
+Para cada módulo roda um interpretador novo, soma o tempo cumulativo
+informado pelo -X importtime e lista as dependências mais pesadas que ele
+carregou. Também mede o tempo total do processo (mediana de --repeat
+execuções) e informa se google.cloud.bigquery/pandas foram carregados.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --modules BigQueryClasse --top 10
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULOS = ["BigQueryClasse", "BigQueryAsync", "BigQueryBuilder", "BigQueryLoader", "BigQueryLocal", "BigQueryMutations",
+           "BigQuerySummaries", "BigQueryTables", "BigQueryWriter", "BigQueryCache", "Demonstracao_Big_Query"]
+PESADOS = ["google.cloud.bigquery", "pandas", "pyarrow"]
+
+_LINHA = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def importtime(modulo: str) -> list:
+    """Linhas do -X importtime como tuplas (próprio_us, cumulativo_us, nível, nome)"""
+    processo = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+                              cwd=RAIZ, capture_output=True, text=True)
+    if processo.returncode != 0:
+        raise RuntimeError(f"falha ao importar {modulo}: {processo.stderr.strip().splitlines()[-1]}")
+    linhas = []
+    for linha in processo.stderr.splitlines():
+        encontrado = _LINHA.match(linha)
+        if encontrado:
+            proprio, cumulativo, espacos, nome = encontrado.groups()
+            linhas.append((int(proprio), int(cumulativo), (len(espacos) - 1) // 2, nome))
+    return linhas
+
+
+def tempo_processo(modulo: str, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import {modulo}"], cwd=RAIZ, check=True, capture_output=True)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=MODULOS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=3, help="dependências mais pesadas mostradas por módulo")
+    args = parser.parse_args()
+
+    vazio = tempo_processo("sys", args.repeat)
+    print(f"interpretador vazio: {vazio * 1000:.0f} ms\n")
+    print(f"{'MODULO':<24} {'IMPORT MS':>10} {'PROCESSO MS':>12}  CARREGOU")
+    detalhes = []
+    for modulo in args.modules:
+        linhas = importtime(modulo)
+        posicao = max(i for i, (_, _, nivel, nome) in enumerate(linhas) if nivel == 0 and nome == modulo)
+        total = linhas[posicao][1]
+        carregados = {nome for *_, nome in linhas}
+        pesados = [nome for nome in PESADOS if nome in carregados] or ["-"]
+        processo = tempo_processo(modulo, args.repeat)
+        print(f"{modulo:<24} {total / 1000:>10.1f} {processo * 1000:>12.0f}  {', '.join(pesados)}")
+        # Imports diretos do módulo (as linhas de nível 1 logo antes dele), exceto os do projeto
+        externos = []
+        for _, cumulativo, nivel, nome in reversed(linhas[:posicao]):
+            if nivel == 0:
+                break
+            if nivel == 1 and not nome.startswith(("BigQuery", "Demonstracao")):
+                externos.append((cumulativo, nome))
+        detalhes.append((modulo, sorted(externos, reverse=True)[:args.top]))
+
+    print()
+    for modulo, externos in detalhes:
+        resumo = ", ".join(f"{nome} {cumulativo / 1000:.1f} ms" for cumulativo, nome in externos)
+        print(f"{modulo}: {resumo or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""Suíte de benchmarks dos caminhos de ingestão e de leitura, com baselines.
+
+Cada caso roda num subprocesso próprio (pico de RSS isolado), --repeat vezes
+(vale a mediana do tempo), com pedidos sintéticos no formato do exemplos.json,
+contra o LocalClient (DuckDB em memória, ver BigQueryLocal) com latência
+simulada opcional. Para cada caso e
+tamanho a suíte informa linhas/s, pico de RSS, requisições, bytes enviados e,
+nos casos de ingestão, o tempo de serialização: o mesmo caminho rodado contra
+o RecordingClient, que só monta e codifica as requisições.
+
+Ingestão: inserir_dados_bigquery (um insertAll), set_data (ChunkedWriter),
+inserir_dados_bigquery_job_loading (arquivo NDJSON),
+inserir_dados_bigquery_job_loading_em_memoria e inserir_dados_bigquery_via_query.
+Leitura: ler_dados_bigquery, make_query, make_query_arrow, iter_query e
+iter_data (list_rows).
+
+    python benchmarks/bench_suite.py --rows 1000 10000 --save local
+    python benchmarks/bench_suite.py --rows 1000 10000 --compare local
+    python benchmarks/bench_suite.py --cases job_loading --rows 10000000 --repeat 1
+
+Os resultados ficam em benchmarks/baselines/<nome>.json; com --compare, casos
+que perderem mais de --tolerance de vazão (ou ganharem em RSS/requisições)
+são marcados e o processo termina com código 1. Acima de ~1M linhas só os
+casos que leem de arquivo cabem com folga na memória.
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import RecordingClient, esquema_pedidos, iterar_pedidos
+
+from BigQueryLocal import LocalClient, LocalPool
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+DATASET, TABELA = "TesteBigQuery", "VendasLBC2"
+# Abaixo disso (segundos) a vazão não entra na comparação com a baseline
+TEMPO_MINIMO = 0.05
+
+CASOS = {}
+
+
+def caso(tipo: str):
+    """Registra um caso; ``tipo`` é "ingestao" (recebe os pedidos prontos), "arquivo" (NDJSON em
+    ``pasta``) ou "leitura" (tabela já carregada)"""
+    def registrar(funcao):
+        CASOS[funcao.__name__] = (tipo, funcao)
+        return funcao
+    return registrar
+
+
+def demonstracao(client, pasta: str):
+    """Módulo da demonstração apontando para ``client``, com o índice de ids na pasta temporária"""
+    import Demonstracao_Big_Query as demo
+    from BigQueryWriter import SeenIdIndex
+
+    demo.get_cliente = lambda: client
+    demo._schema_tabela.cache_clear()
+    demo._periodo_obrigatorio.cache_clear()
+    indice_ids = SeenIdIndex(max_entries=10_000_000, path=os.path.join(pasta, "ids_inseridos"))
+    demo.get_indice_ids = lambda: indice_ids
+    return demo
+
+
+def bigquery(client):
+    from BigQueryClasse import BigQuery
+
+    instancia = BigQuery(pool=LocalPool(client), use_storage_api=False)
+    instancia.initialize()
+    return instancia
+
+
+# ----- ingestão -----
+
+@caso("ingestao")
+def inserir_dados_bigquery(client, pedidos: list, pasta: str) -> int:
+    demonstracao(client, pasta).inserir_dados_bigquery(pedidos)
+    return len(pedidos)
+
+
+@caso("ingestao")
+def set_data(client, pedidos: list, pasta: str) -> int:
+    instancia = bigquery(client)
+    instancia.set_data(instancia.get_table(DATASET, TABELA), pedidos)
+    return len(pedidos)
+
+
+@caso("arquivo")
+def job_loading(client, linhas: int, pasta: str) -> int:
+    demonstracao(client, pasta).inserir_dados_bigquery_job_loading(os.path.join(pasta, "pedidos.json"))
+    return linhas
+
+
+@caso("ingestao")
+def job_loading_em_memoria(client, pedidos: list, pasta: str) -> int:
+    demonstracao(client, pasta).inserir_dados_bigquery_job_loading_em_memoria(pedidos)
+    return len(pedidos)
+
+
+@caso("ingestao")
+def via_query(client, pedidos: list, pasta: str) -> int:
+    demonstracao(client, pasta).inserir_dados_bigquery_via_query(pedidos)
+    return len(pedidos)
+
+
+# ----- leitura -----
+
+CONSULTA = f"SELECT _id, name, created_at, products FROM `{DATASET}.{TABELA}` ORDER BY created_at"
+
+
+@caso("leitura")
+def ler_dados_bigquery(client, linhas: int, pasta: str) -> int:
+    # A função imprime cada linha; a saída vai para /dev/null, mas a formatação conta
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        demonstracao(client, pasta).ler_dados_bigquery("2025-01-01", "2025-12-31")
+    return linhas
+
+
+@caso("leitura")
+def make_query(client, linhas: int, pasta: str) -> int:
+    return len(bigquery(client).make_query(CONSULTA, use_cache=False))
+
+
+@caso("leitura")
+def make_query_arrow(client, linhas: int, pasta: str) -> int:
+    return bigquery(client).make_query_arrow(CONSULTA).num_rows
+
+
+@caso("leitura")
+def iter_query(client, linhas: int, pasta: str) -> int:
+    return sum(len(lote) for lote in bigquery(client).iter_query(CONSULTA, page_size=10_000, batch_size=10_000))
+
+
+@caso("leitura")
+def iter_data(client, linhas: int, pasta: str) -> int:
+    instancia = bigquery(client)
+    tabela = instancia.get_table(DATASET, TABELA)
+    return sum(len(lote) for lote in instancia.iter_data(tabela, page_size=10_000, batch_size=10_000))
+
+
+def preparar(nome: str, client, linhas: int, pasta: str):
+    """Cria a tabela e os dados do caso fora da medição; retorna o que o caso recebe"""
+    from google.cloud import bigquery as bq
+
+    tipo, _ = CASOS[nome]
+    if isinstance(client, LocalClient):
+        client.create_table(bq.Table(f"{client.project}.{DATASET}.{TABELA}", schema=esquema_pedidos()))
+        if tipo == "leitura":
+            caminho = os.path.join(pasta, "carga.json")
+            escrever_ndjson(caminho, linhas)
+            with open(caminho, "rb") as arquivo:
+                client.load_table_from_file(arquivo, f"{DATASET}.{TABELA}", job_config=bq.LoadJobConfig(
+                    source_format="NEWLINE_DELIMITED_JSON")).result()
+    if tipo == "arquivo":
+        escrever_ndjson(os.path.join(pasta, "pedidos.json"), linhas)
+    if tipo == "ingestao":
+        return list(iterar_pedidos(linhas))
+    return linhas
+
+
+def escrever_ndjson(caminho: str, linhas: int) -> None:
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        for pedido in iterar_pedidos(linhas):
+            arquivo.write(json.dumps(pedido, ensure_ascii=False))
+            arquivo.write("\n")
+
+
+def medir(nome: str, linhas: int, cliente: str, latencia: float) -> dict:
+    """Uma execução do caso com um cliente novo: segundos, linhas, requisições e bytes enviados"""
+    tipo, funcao = CASOS[nome]
+    client = LocalClient(latency=latencia) if cliente == "local" else RecordingClient(latency=latencia)
+    with tempfile.TemporaryDirectory() as pasta:
+        dados = preparar(nome, client, linhas, pasta)
+        if isinstance(client, LocalClient):
+            client.reset_stats()
+        else:
+            client.reset()
+
+        inicio = time.perf_counter()
+        processadas = funcao(client, dados, pasta)
+        tempo = time.perf_counter() - inicio
+        del dados
+
+    if isinstance(client, LocalClient):
+        estatisticas = client.stats()
+        requisicoes, enviados = estatisticas["total_requests"], estatisticas["bytes_sent"]
+        # As funções da demonstração só imprimem os erros; confere se as linhas chegaram
+        gravadas = client.get_table(f"{DATASET}.{TABELA}").num_rows
+        client.close()
+        if tipo != "leitura" and gravadas != linhas:
+            raise RuntimeError(f"{nome}: {gravadas} de {linhas} linhas gravadas")
+    else:
+        resumo = client.summary()
+        requisicoes, enviados = resumo["requests"], resumo["request_bytes"]
+    return {"seconds": tempo, "rows": processadas, "requests": requisicoes, "bytes_sent": enviados}
+
+
+def executar_caso(nome: str, linhas: int, cliente: str, latencia: float, repeticoes: int) -> dict:
+    """Roda o caso ``repeticoes`` vezes neste processo; o tempo informado é a mediana"""
+    execucoes = [medir(nome, linhas, cliente, latencia) for _ in range(repeticoes)]
+    tempo = statistics.median(execucao["seconds"] for execucao in execucoes)
+    ultima = execucoes[-1]
+    return {
+        "case": nome,
+        "rows": ultima["rows"],
+        "repeat": repeticoes,
+        "seconds": round(tempo, 4),
+        "min_seconds": round(min(execucao["seconds"] for execucao in execucoes), 4),
+        "rows_per_second": int(ultima["rows"] / tempo) if tempo else None,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "requests": ultima["requests"],
+        "bytes_sent": ultima["bytes_sent"],
+    }
+
+
+def em_subprocesso(nome: str, linhas: int, cliente: str, latencia: float, repeticoes: int) -> dict:
+    processo = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", nome, "--rows", str(linhas),
+         "--client", cliente, "--latency", str(latencia), "--repeat", str(repeticoes)],
+        cwd=RAIZ, capture_output=True, text=True,
+    )
+    if processo.returncode != 0:
+        erro = (processo.stderr.strip().splitlines() or ["sem saída"])[-1]
+        raise RuntimeError(f"caso {nome} com {linhas} linhas falhou: {erro}")
+    return json.loads(processo.stdout.strip().splitlines()[-1])
+
+
+def ambiente() -> dict:
+    commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True)
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "commit": commit.stdout.strip() or None,
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def comparar(atual: dict, anterior: dict, tolerancia: float) -> list:
+    """Motivos de regressão de um resultado em relação à baseline (lista vazia se está ok)"""
+    motivos = []
+    # O melhor tempo varia bem menos que a mediana entre execuções da suíte; casos
+    # de poucos milissegundos são só ruído e ficam fora da comparação de vazão
+    if anterior.get("min_seconds", 0) >= TEMPO_MINIMO and atual["min_seconds"]:
+        variacao = anterior["min_seconds"] / atual["min_seconds"] - 1
+        if variacao < -tolerancia:
+            motivos.append(f"vazão {variacao:+.0%}")
+    if anterior.get("peak_rss_mb"):
+        variacao = atual["peak_rss_mb"] / anterior["peak_rss_mb"] - 1
+        if variacao > tolerancia:
+            motivos.append(f"RSS {variacao:+.0%}")
+    if atual["requests"] > anterior.get("requests", atual["requests"]):
+        motivos.append(f"requisições {anterior['requests']} -> {atual['requests']}")
+    return motivos
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASOS), default=list(CASOS))
+    parser.add_argument("--latency", type=float, default=0.0, help="segundos por requisição no cliente local")
+    parser.add_argument("--repeat", type=int, default=5, help="execuções por caso (vale a mediana)")
+    parser.add_argument("--save", metavar="NOME", help="grava os resultados em baselines/NOME.json")
+    parser.add_argument("--compare", metavar="NOME", help="compara com baselines/NOME.json")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="variação aceita antes de acusar regressão")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--client", choices=("local", "recording"), default="local", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(executar_caso(args.worker, args.rows[0], args.client, args.latency, args.repeat)))
+        return
+
+    anterior = {}
+    if args.compare:
+        with open(os.path.join(BASELINES, f"{args.compare}.json"), encoding="utf-8") as arquivo:
+            anterior = json.load(arquivo)["results"]
+
+    print(f"{'CASO':<24} {'LINHAS':>9} {'SEGUNDOS':>9} {'LINHAS/S':>10} {'SERIALIZ S':>10} {'PICO MB':>8} "
+          f"{'REQS':>5} {'MB ENVIADOS':>11}  BASELINE")
+    resultados, regressoes = {}, 0
+    for linhas in args.rows:
+        for nome in args.cases:
+            resultado = em_subprocesso(nome, linhas, "local", args.latency, args.repeat)
+            resultado["serialize_seconds"] = None
+            if CASOS[nome][0] != "leitura":
+                resultado["serialize_seconds"] = em_subprocesso(nome, linhas, "recording", 0.0, args.repeat)["seconds"]
+            chave = f"{nome}@{linhas}"
+            resultados[chave] = resultado
+
+            situacao = ""
+            if chave in anterior:
+                motivos = comparar(resultado, anterior[chave], args.tolerance)
+                regressoes += bool(motivos)
+                situacao = "REGRESSÃO: " + ", ".join(motivos) if motivos else "ok"
+            serializacao = resultado["serialize_seconds"]
+            print(f"{nome:<24} {linhas:>9} {resultado['seconds']:>9.3f} {resultado['rows_per_second']:>10} "
+                  f"{'-' if serializacao is None else f'{serializacao:.3f}':>10} {resultado['peak_rss_mb']:>8} "
+                  f"{resultado['requests']:>5} {resultado['bytes_sent'] / 1e6:>11.2f}  {situacao}")
+
+    if args.save:
+        os.makedirs(BASELINES, exist_ok=True)
+        caminho = os.path.join(BASELINES, f"{args.save}.json")
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            json.dump({"environment": ambiente(), "latency": args.latency, "results": resultados},
+                      arquivo, indent=2, sort_keys=True)
+        print(f"\nbaseline gravada em {os.path.relpath(caminho, RAIZ)}")
+    if regressoes:
+        print(f"\n{regressoes} caso(s) com regressão acima de {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Dados sintéticos e cliente de gravação usados pelos benchmarks.
+
+RecordingClient implementa só o que os benchmarks chamam (query,
+insert_rows_json, load_table_from_file, load_table_from_json, get_table com
+o esquema dos pedidos) e, em vez de
+falar com o BigQuery, registra cada chamada com o tamanho do corpo que seria
+enviado. Nenhuma credencial é necessária.
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+NOMES = ["João Silva", "Maria Oliveira", "Carlos Lima", "Ana Souza", "Bruna Rocha", "Pedro Santos",
+         "Lucia Costa", "Roberto Ferreira", "Fernanda Alves", "D'Ávila Souza"]
+PRODUTOS = [("Coxinha", "CX-001", 6.0), ("Guaraná 1L", "GUA-1L", 6.5), ("Pão de Queijo", "PQ-001", 5.0),
+            ("Coca-Cola 2L", "CC-2L", 8.5), ("Suco Natural", "SN-001", 7.0), ("Esfiha de Carne", "EF-001", 4.5),
+            ("Açaí 500ml", "AC-500", 12.0), ("Café Expresso", "CF-001", 4.0)]
+
+
+def iterar_pedidos(quantidade: int, semente: int = 42):
+    """Gera os pedidos um a um (para arquivos de milhões de linhas sem montar a lista)"""
+    aleatorio = random.Random(semente)
+    for i in range(quantidade):
+        produtos = [
+            {"name": nome, "sku": sku, "price": preco, "quantity": aleatorio.randint(1, 5)}
+            for nome, sku, preco in aleatorio.sample(PRODUTOS, aleatorio.randint(1, 3))
+        ]
+        yield {
+            "_id": str(i + 1),
+            "name": aleatorio.choice(NOMES),
+            "created_at": f"2025-{aleatorio.randint(1, 12):02d}-{aleatorio.randint(1, 28):02d}T"
+                          f"{aleatorio.randint(0, 23):02d}:{aleatorio.randint(0, 59):02d}:00Z",
+            "products": produtos,
+        }
+
+
+def gerar_pedidos(quantidade: int, semente: int = 42) -> list:
+    """Pedidos no mesmo formato do exemplos.json"""
+    return list(iterar_pedidos(quantidade, semente))
+
+
+def esquema_pedidos() -> list:
+    from google.cloud import bigquery
+
+    return [
+        bigquery.SchemaField("_id", "STRING"),
+        bigquery.SchemaField("name", "STRING"),
+        bigquery.SchemaField("created_at", "TIMESTAMP"),
+        bigquery.SchemaField("products", "RECORD", mode="REPEATED", fields=[
+            bigquery.SchemaField("name", "STRING"),
+            bigquery.SchemaField("sku", "STRING"),
+            bigquery.SchemaField("price", "FLOAT"),
+            bigquery.SchemaField("quantity", "INTEGER"),
+        ]),
+    ]
+
+
+class RecordingJob:
+    def __init__(self, rows: int = 0):
+        self.job_id = uuid.uuid4().hex
+        self.num_dml_affected_rows = rows
+        self.output_rows = rows
+        self.total_bytes_processed = 0
+        self.total_bytes_billed = 0
+        self.slot_millis = 0
+        self.cache_hit = False
+
+    def result(self, *args, **kwargs):
+        return self
+
+    def done(self, *args, **kwargs) -> bool:
+        return True
+
+
+class RecordingClient:
+    """Cliente falso que registra as chamadas e o tamanho dos corpos das requisições"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = []
+        self.__lock = threading.Lock()
+
+    def __record(self, method: str, request_bytes: int, rows: int) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        with self.__lock:
+            self.calls.append({"method": method, "request_bytes": request_bytes, "rows": rows})
+
+    def query(self, query, job_config=None, **kwargs):
+        # Mesmo corpo que o cliente real serializa (jobs.insert com configuration.query)
+        configuration = job_config.to_api_repr() if job_config is not None else {"query": {}}
+        configuration["query"]["query"] = query
+        parameters = configuration["query"].get("queryParameters", [])
+        body = json.dumps({"configuration": configuration}, default=str)
+        rows = sum(len(p["parameterValue"].get("arrayValues", [])) for p in parameters)
+        self.__record("query", len(body.encode("utf-8")), rows)
+        return RecordingJob(rows)
+
+    def insert_rows_json(self, table, json_rows, row_ids=None, **kwargs):
+        rows = [{"json": row} for row in json_rows]
+        if row_ids is not None:
+            for row, row_id in zip(rows, row_ids):
+                row["insertId"] = row_id
+        body = json.dumps({"rows": rows}, default=str)
+        self.__record("insert_rows_json", len(body.encode("utf-8")), len(json_rows))
+        return []
+
+    def load_table_from_file(self, file_obj, destination, job_config=None, rewind=False, **kwargs):
+        if rewind:
+            file_obj.seek(0)
+        size = 0
+        lines = 0
+        while True:
+            data = file_obj.read(1024 * 1024)
+            if not data:
+                break
+            size += len(data)
+            lines += data.count(b"\n")
+        self.__record("load_table_from_file", size, lines)
+        return RecordingJob(lines)
+
+    def load_table_from_json(self, json_rows, destination, job_config=None, **kwargs):
+        body = "\n".join(json.dumps(row, default=str) for row in json_rows)
+        self.__record("load_table_from_json", len(body.encode("utf-8")), len(json_rows))
+        return RecordingJob(len(json_rows))
+
+    def delete_table(self, table, not_found_ok=False, **kwargs):
+        self.__record("delete_table", 0, 0)
+
+    def get_table(self, table, **kwargs):
+        from google.cloud import bigquery
+
+        self.__record("get_table", 0, 0)
+        name = table if isinstance(table, str) else f"{table.project}.{table.dataset_id}.{table.table_id}"
+        if name.count(".") == 1:
+            name = f"projeto.{name}"
+        return bigquery.Table(name, schema=esquema_pedidos())
+
+    def summary(self) -> dict:
+        with self.__lock:
+            return {
+                "requests": len(self.calls),
+                "request_bytes": sum(call["request_bytes"] for call in self.calls),
+            }
+
+    def reset(self) -> None:
+        with self.__lock:
+            self.calls.clear()
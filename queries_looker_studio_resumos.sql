@@ -0,0 +1,167 @@
+-- ===============================================
+-- QUERIES PARA LOOKER STUDIO - ANÁLISE DE VENDAS (TABELAS DE RESUMO)
+-- Origem: probable-bebop-386417.TesteBigQuery.VendasLBC
+-- Gerado por: python BigQuerySummaries.py sql <tabela>
+-- Atualize os resumos antes com: python BigQuerySummaries.py refresh <tabela>
+-- As consultas 7 e 11 listam pedidos individuais e ficam em queries_looker_studio.sql
+-- ===============================================
+
+-- 📊 QUERY 1: RESUMO GERAL (KPIs)
+SELECT
+    SUM(pedidos) as total_pedidos,
+    (SELECT COUNT(DISTINCT cliente) FROM `probable-bebop-386417.TesteBigQuery.VendasLBC_resumo_clientes`) as clientes_unicos,
+    SUM(itens) as total_itens_vendidos,
+    ROUND(SUM(receita), 2) as receita_total,
+    ROUND(SAFE_DIVIDE(SUM(receita), SUM(pedidos_com_valor)), 2) as ticket_medio,
+    MIN(data) as primeira_venda,
+    MAX(data) as ultima_venda
+FROM `probable-bebop-386417.TesteBigQuery.VendasLBC_resumo_diario`;
+
+-- ===============================================
+
+-- 📈 QUERY 2: VENDAS DIÁRIAS
+SELECT
+    data,
+    EXTRACT(YEAR FROM data) as ano,
+    EXTRACT(MONTH FROM data) as mes,
+    EXTRACT(DAY FROM data) as dia,
+    FORMAT_DATE('%A', data) as dia_semana,
+    SUM(pedidos_distintos) as num_pedidos,
+    SUM(itens) as total_itens,
+    ROUND(SUM(receita), 2) as receita_dia
+FROM `probable-bebop-386417.TesteBigQuery.VendasLBC_resumo_diario`
+GROUP BY data, ano, mes, dia, dia_semana
+ORDER BY data;
+
+-- ===============================================
+
+-- 🏆 QUERY 3: TOP PRODUTOS MAIS VENDIDOS
+SELECT
+    produto,
+    sku,
+    SUM(quantidade) as total_vendido,
+    SUM(pedidos) as num_pedidos,
+    ROUND(SAFE_DIVIDE(SUM(soma_precos), SUM(linhas)), 2) as preco_medio,
+    ROUND(SUM(receita), 2) as receita_total
+FROM `probable-bebop-386417.TesteBigQuery.VendasLBC_resumo_produtos`
+GROUP BY produto, sku
+ORDER BY total_vendido DESC;
+
+-- ===============================================
+
+-- 💰 QUERY 4: RANKING DE CLIENTES
+SELECT
+    cliente,
+    SUM(pedidos) as num_pedidos,
+    SUM(itens) as total_itens,
+    ROUND(SUM(receita), 2) as total_gasto,
+    ROUND(SAFE_DIVIDE(SUM(receita), SUM(pedidos_com_valor)), 2) as ticket_medio
+FROM `probable-bebop-386417.TesteBigQuery.VendasLBC_resumo_clientes`
+GROUP BY cliente
+ORDER BY total_gasto DESC;
+
+-- ===============================================
+
+-- 🕐 QUERY 5: VENDAS POR HORA E DIA DA SEMANA
+SELECT
+    FORMAT_DATE('%A', data) as dia_semana,
+    hora,
+    SUM(pedidos) as num_pedidos,
+    ROUND(SUM(receita), 2) as receita,
+    ROUND(SAFE_DIVIDE(SUM(receita), SUM(pedidos_com_valor)), 2) as ticket_medio
+FROM `probable-bebop-386417.TesteBigQuery.VendasLBC_resumo_diario`
+GROUP BY dia_semana, hora
+ORDER BY
+    CASE dia_semana
+        WHEN 'Monday' THEN 1
+        WHEN 'Tuesday' THEN 2
+        WHEN 'Wednesday' THEN 3
+        WHEN 'Thursday' THEN 4
+        WHEN 'Friday' THEN 5
+        WHEN 'Saturday' THEN 6
+        WHEN 'Sunday' THEN 7
+    END, hora;
+
+-- ===============================================
+
+-- 📅 QUERY 6: VENDAS DOS ÚLTIMOS 30 DIAS
+WITH dias AS (
+    SELECT data, SUM(pedidos) as pedidos, SUM(itens) as itens, SUM(receita) as receita
+    FROM `probable-bebop-386417.TesteBigQuery.VendasLBC_resumo_diario`
+    WHERE data >= DATE_SUB(CURRENT_DATE(), INTERVAL 30 DAY)
+    GROUP BY data
+),
+clientes AS (
+    SELECT data, STRING_AGG(DISTINCT cliente, ', ' LIMIT 3) as clientes_exemplo
+    FROM `probable-bebop-386417.TesteBigQuery.VendasLBC_resumo_clientes`
+    WHERE data >= DATE_SUB(CURRENT_DATE(), INTERVAL 30 DAY)
+    GROUP BY data
+)
+SELECT
+    dias.data,
+    FORMAT_DATE('%A', dias.data) as dia_semana,
+    dias.pedidos,
+    dias.itens,
+    ROUND(dias.receita, 2) as receita,
+    clientes.clientes_exemplo
+FROM dias
+LEFT JOIN clientes ON clientes.data = dias.data
+ORDER BY data DESC;
+
+-- ===============================================
+
+-- 👤 QUERY 8: PRODUTOS POR CLIENTE
+SELECT
+    cliente,
+    produto,
+    SUM(quantidade) as qtd_comprada,
+    SUM(pedidos_cliente) as vezes_comprou,
+    ROUND(SUM(receita), 2) as valor_gasto_produto,
+    ROUND(SAFE_DIVIDE(SUM(soma_precos), SUM(linhas)), 2) as preco_medio_pago
+FROM `probable-bebop-386417.TesteBigQuery.VendasLBC_resumo_produtos`
+GROUP BY cliente, produto
+ORDER BY cliente, qtd_comprada DESC;
+
+-- ===============================================
+
+-- 📈 QUERY 9: CRESCIMENTO MENSAL
+WITH vendas_mensais AS (
+    SELECT
+        FORMAT_DATE('%Y-%m', data) as mes,
+        SUM(pedidos) as pedidos,
+        ROUND(SUM(receita), 2) as receita
+    FROM `probable-bebop-386417.TesteBigQuery.VendasLBC_resumo_diario`
+    GROUP BY mes
+),
+vendas_com_lag AS (
+    SELECT
+        mes,
+        pedidos,
+        receita,
+        LAG(receita) OVER (ORDER BY mes) as receita_mes_anterior
+    FROM vendas_mensais
+)
+SELECT
+    mes,
+    pedidos,
+    receita,
+    receita_mes_anterior,
+    CASE
+        WHEN receita_mes_anterior IS NOT NULL THEN
+            ROUND(((receita - receita_mes_anterior) / receita_mes_anterior) * 100, 2)
+        ELSE NULL
+    END as crescimento_percentual
+FROM vendas_com_lag
+ORDER BY mes;
+
+-- ===============================================
+
+-- ⏰ QUERY 10: VENDAS POR HORA (SIMPLES)
+SELECT
+    hora,
+    SUM(pedidos) as num_pedidos,
+    ROUND(SUM(receita), 2) as receita_hora,
+    ROUND(SAFE_DIVIDE(SUM(receita), SUM(pedidos_com_valor)), 2) as ticket_medio_hora
+FROM `probable-bebop-386417.TesteBigQuery.VendasLBC_resumo_diario`
+GROUP BY hora
+ORDER BY hora;
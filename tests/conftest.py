@@ -0,0 +1,7 @@
+"""Os testes importam os módulos da raiz e os clientes falsos de benchmarks/common.py"""
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
@@ -0,0 +1,239 @@
+"""AsyncBigQuery.make_query: métricas, orçamento, timeout e cancelamento do job (user-005)"""
+import asyncio
+import threading
+import time
+
+import pytest
+from common import gerar_pedidos
+
+from BigQueryAsync import AsyncBigQuery
+from BigQueryCache import QueryResultCache
+from BigQueryClasse import BigQuery
+from BigQueryCost import BudgetExceeded, ByteBudget
+from BigQueryLocal import LocalClient, LocalPool
+from BigQueryMetrics import InMemoryCollector, Metrics
+from BigQueryTables import SALES_LAYOUT, provision_table
+
+TABELA = "projeto.dataset.vendas"
+CONSULTA = f"SELECT name, COUNT(*) AS pedidos FROM `{TABELA}` GROUP BY name ORDER BY name"
+
+
+class SlowJob:
+    """Job que só termina quando ``finish`` é chamado"""
+
+    def __init__(self):
+        self.job_id = f"lento_{id(self)}"
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+
+    def done(self, *args, **kwargs) -> bool:
+        return self.finished.is_set()
+
+    def cancel(self, *args, **kwargs) -> bool:
+        self.cancelled.set()
+        return True
+
+
+class SlowClient:
+    """Cliente cujo jobs.insert espera ``release`` e cujos jobs nunca terminam sozinhos"""
+
+    project = "projeto"
+
+    def __init__(self, block_submit: bool = False):
+        self.release = threading.Event()
+        if not block_submit:
+            self.release.set()
+        self.jobs = []
+
+    def query(self, query, job_config=None, **kwargs):
+        self.release.wait(5)
+        job = SlowJob()
+        self.jobs.append(job)
+        return job
+
+
+def bigquery_local(client, **kwargs):
+    collector = InMemoryCollector()
+    bigquery_client = BigQuery(pool=LocalPool(client), metrics=Metrics([collector]), **kwargs)
+    bigquery_client.initialize()
+    return bigquery_client, collector
+
+
+@pytest.fixture
+def vendas():
+    client = LocalClient(project="projeto")
+    provision_table(client, TABELA, SALES_LAYOUT)
+    assert client.insert_rows_json(TABELA, gerar_pedidos(40)) == []
+    return client
+
+
+def esperar(condicao, timeout: float = 5.0) -> bool:
+    limite = time.monotonic() + timeout
+    while not condicao():
+        if time.monotonic() > limite:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_make_query_returns_frame_and_emits_metrics(vendas):
+    bigquery_client, collector = bigquery_local(vendas)
+
+    async def main():
+        async with AsyncBigQuery(bigquery_client, poll_interval=0.01) as async_client:
+            return await async_client.make_query(CONSULTA)
+
+    frame = asyncio.run(main())
+    assert frame["pedidos"].sum() == 40
+    assert frame.equals(bigquery_client.make_query(CONSULTA))
+
+    evento = collector.events[0]
+    assert evento.operation == "make_query"
+    assert evento.target == TABELA
+    assert evento.ok and evento.rows == len(frame)
+    assert evento.job_id is not None
+
+
+def test_make_query_cache_hit_is_recorded(vendas):
+    bigquery_client, collector = bigquery_local(vendas, query_cache=QueryResultCache())
+
+    async def main():
+        async with AsyncBigQuery(bigquery_client, poll_interval=0.01) as async_client:
+            return [await async_client.make_query(CONSULTA) for _ in range(2)]
+
+    primeiro, segundo = asyncio.run(main())
+    assert primeiro.equals(segundo)
+    assert [evento.cache_hit for evento in collector.events] == [False, True]
+    assert collector.events[1].rows == len(segundo)
+
+
+def test_cache_lookup_runs_off_the_event_loop(vendas, monkeypatch):
+    bigquery_client, _ = bigquery_local(vendas, query_cache=QueryResultCache())
+    threads = []
+    original = bigquery_client.get_cached_result
+
+    def get_cached_result(query, query_parameters=None):
+        threads.append(threading.current_thread())
+        return original(query, query_parameters)
+
+    monkeypatch.setattr(bigquery_client, "get_cached_result", get_cached_result)
+
+    async def main():
+        async with AsyncBigQuery(bigquery_client, poll_interval=0.01) as async_client:
+            await async_client.make_query(CONSULTA)
+
+    asyncio.run(main())
+    assert threads and threading.main_thread() not in threads
+
+
+def test_instance_can_be_reused_across_event_loops(vendas):
+    bigquery_client, _ = bigquery_local(vendas)
+    async_client = AsyncBigQuery(bigquery_client, max_concurrency=1, poll_interval=0.01)
+
+    async def main():
+        return await async_client.gather_queries([CONSULTA, CONSULTA])
+
+    try:
+        for _ in range(2):
+            assert all(frame["pedidos"].sum() == 40 for frame in asyncio.run(main()))
+    finally:
+        async_client.close()
+
+
+def test_budget_exceeded_is_raised_unchanged(vendas):
+    bigquery_client, collector = bigquery_local(vendas, budget=ByteBudget(per_query_bytes=1))
+
+    async def main():
+        async with AsyncBigQuery(bigquery_client, poll_interval=0.01) as async_client:
+            await async_client.make_query(CONSULTA)
+
+    with pytest.raises(BudgetExceeded):
+        asyncio.run(main())
+    assert not collector.events[0].ok
+    assert collector.events[0].error.startswith("BudgetExceeded")
+
+
+def test_query_errors_become_runtime_error(vendas):
+    bigquery_client, collector = bigquery_local(vendas)
+
+    async def main():
+        async with AsyncBigQuery(bigquery_client, poll_interval=0.01) as async_client:
+            await async_client.make_query("SELECT coluna_que_nao_existe FROM `projeto.dataset.vendas`")
+
+    with pytest.raises(RuntimeError, match="Error executing BigQuery query"):
+        asyncio.run(main())
+    assert not collector.events[0].ok
+
+
+def test_timeout_while_polling_cancels_the_job():
+    client = SlowClient()
+    bigquery_client, collector = bigquery_local(client)
+
+    async def main():
+        async with AsyncBigQuery(bigquery_client, poll_interval=0.01) as async_client:
+            await asyncio.wait_for(async_client.make_query("SELECT 1"), timeout=0.2)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(main())
+    assert len(client.jobs) == 1
+    assert client.jobs[0].cancelled.is_set()
+    assert collector.events[0].error.startswith("CancelledError")
+
+
+def test_timeout_during_submit_cancels_the_job_once_created():
+    client = SlowClient(block_submit=True)
+    bigquery_client, collector = bigquery_local(client)
+
+    async def main():
+        async with AsyncBigQuery(bigquery_client, poll_interval=0.01) as async_client:
+            await asyncio.wait_for(async_client.make_query("SELECT 1"), timeout=0.05)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(main())
+    assert client.jobs == []
+    assert not collector.events[0].ok
+
+    # A thread termina o jobs.insert depois do timeout; o job criado é cancelado em seguida
+    client.release.set()
+    assert esperar(lambda: client.jobs and client.jobs[0].cancelled.is_set())
+
+
+def test_cancelled_task_cancels_only_its_own_job():
+    client = SlowClient()
+    bigquery_client, _ = bigquery_local(client)
+
+    async def main():
+        async with AsyncBigQuery(bigquery_client, poll_interval=0.01) as async_client:
+            cancelada = asyncio.ensure_future(async_client.make_query("SELECT 1"))
+            seguinte = asyncio.ensure_future(async_client.make_query("SELECT 2"))
+            while len(client.jobs) < 2:
+                await asyncio.sleep(0.01)
+            cancelada.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await cancelada
+            assert not seguinte.done()
+            assert [job.cancelled.is_set() for job in client.jobs].count(True) == 1
+            seguinte.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await seguinte
+
+    asyncio.run(main())
+    assert all(job.cancelled.is_set() for job in client.jobs)
+
+
+def test_gather_queries_keeps_order(vendas):
+    bigquery_client, collector = bigquery_local(vendas)
+    consultas = [f"SELECT {numero} AS numero" for numero in range(6)]
+
+    async def main():
+        async with AsyncBigQuery(bigquery_client, max_concurrency=2, poll_interval=0.01) as async_client:
+            return await async_client.gather_queries(consultas)
+
+    frames = asyncio.run(main())
+    assert [int(frame["numero"][0]) for frame in frames] == list(range(6))
+    assert len(collector.events) == 6 and all(evento.ok for evento in collector.events)
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        AsyncBigQuery(bigquery_local(SlowClient())[0], poll_interval=0)
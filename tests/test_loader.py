@@ -0,0 +1,90 @@
+"""load_files: shards com vários arquivos enviados num arquivo posicionável (user-012)"""
+import io
+import json
+
+import pytest
+from common import esquema_pedidos, gerar_pedidos
+from google.cloud import bigquery
+
+from BigQueryLoader import _ConcatenatedFiles, load_files
+from BigQueryLocal import LocalClient
+
+TABELA = "projeto.dataset.vendas"
+
+
+class StreamSpy(LocalClient):
+    """Guarda se cada arquivo recebido aceitava seek/tell"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.streams = []
+
+    def load_table_from_file(self, file_obj, destination, **kwargs):
+        self.streams.append((file_obj.seekable(), getattr(file_obj, "mode", None)))
+        return super().load_table_from_file(file_obj, destination, **kwargs)
+
+
+@pytest.fixture
+def client():
+    client = StreamSpy(project="projeto")
+    client.create_table(bigquery.Table(TABELA, schema=esquema_pedidos()))
+    return client
+
+
+def total(client) -> int:
+    return list(client.query(f"SELECT COUNT(*) AS total FROM `{TABELA}`").result())[0]["total"]
+
+
+def escrever_ndjson(path, pedidos, newline_final: bool = True):
+    texto = "\n".join(json.dumps(pedido) for pedido in pedidos)
+    path.write_text(texto + ("\n" if newline_final else ""), encoding="utf-8")
+
+
+def test_local_client_rejects_streams_without_tell(client, tmp_path):
+    arquivo = tmp_path / "a.json"
+    escrever_ndjson(arquivo, gerar_pedidos(2))
+    with pytest.raises(io.UnsupportedOperation):
+        client.load_table_from_file(io.BufferedReader(_ConcatenatedFiles([str(arquivo)])), TABELA)
+    with open(arquivo, "r", encoding="utf-8") as texto, pytest.raises(ValueError):
+        client.load_table_from_file(texto, TABELA)
+
+
+def test_multi_file_shard_is_loaded_from_a_seekable_file(client, tmp_path):
+    pedidos = gerar_pedidos(30)
+    for numero, inicio in enumerate(range(0, 30, 10)):
+        escrever_ndjson(tmp_path / f"parte_{numero}.json", pedidos[inicio:inicio + 10], newline_final=numero != 1)
+
+    outcomes = load_files(client, str(tmp_path / "*.json"), TABELA, schema=esquema_pedidos(),
+                          target_shard_bytes=1024 * 1024)
+
+    assert all(outcome.ok for outcome in outcomes), [outcome.error for outcome in outcomes]
+    assert len({outcome.shard for outcome in outcomes}) == 1
+    assert client.streams == [(True, "rb+")]
+    assert total(client) == 30
+
+
+def test_single_file_shards_are_sent_directly(client, tmp_path):
+    pedidos = gerar_pedidos(20)
+    escrever_ndjson(tmp_path / "a.json", pedidos[:10])
+    escrever_ndjson(tmp_path / "b.json", pedidos[10:])
+
+    outcomes = load_files(client, str(tmp_path), TABELA, schema=esquema_pedidos(), target_shard_bytes=1)
+
+    assert all(outcome.ok for outcome in outcomes)
+    assert sorted(client.streams) == [(True, "rb"), (True, "rb")]
+    assert total(client) == 20
+
+
+def test_csv_headers_are_skipped_after_the_first_file(tmp_path):
+    client = StreamSpy(project="projeto")
+    schema = [bigquery.SchemaField("_id", "STRING"), bigquery.SchemaField("valor", "INTEGER")]
+    client.create_table(bigquery.Table(TABELA, schema=schema))
+    (tmp_path / "a.csv").write_text("_id,valor\n1,10\n2,20\n", encoding="utf-8")
+    (tmp_path / "b.csv").write_text("_id,valor\n3,30", encoding="utf-8")
+    (tmp_path / "c.csv").write_text("_id,valor\n4,40\n", encoding="utf-8")
+
+    outcomes = load_files(client, str(tmp_path / "*.csv"), TABELA, schema=schema, target_shard_bytes=1024)
+
+    assert all(outcome.ok for outcome in outcomes), [outcome.error for outcome in outcomes]
+    rows = client.query(f"SELECT SUM(valor) AS soma, COUNT(*) AS linhas FROM `{TABELA}`").result()
+    assert [(row["soma"], row["linhas"]) for row in rows] == [(100, 4)]
@@ -0,0 +1,123 @@
+"""BatchMutation contra colunas REQUIRED (user-010) e insert_rows_dml com RECORD NULL e REPEATED (user-014)"""
+import pytest
+from google.api_core import exceptions
+from google.cloud import bigquery
+
+from BigQueryLocal import LocalClient
+from BigQueryMutations import BatchMutation, _plan, _value_sql, insert_rows_dml
+
+TABELA = "projeto.dataset.clientes"
+ESQUEMA = [
+    bigquery.SchemaField("_id", "STRING", mode="REQUIRED"),
+    bigquery.SchemaField("name", "STRING", mode="REQUIRED"),
+    bigquery.SchemaField("total", "FLOAT", mode="REQUIRED"),
+    bigquery.SchemaField("tags", "STRING", mode="REPEATED"),
+    bigquery.SchemaField("nota", "STRING"),
+]
+
+
+@pytest.fixture
+def clientes():
+    client = LocalClient(project="projeto")
+    client.create_table(bigquery.Table(TABELA, schema=ESQUEMA))
+    linhas = [{"_id": str(i), "name": f"Cliente {i}", "total": float(i), "tags": ["a"], "nota": None}
+              for i in range(10)]
+    assert client.insert_rows_json(TABELA, linhas) == []
+    return client
+
+
+def ler(client) -> dict:
+    rows = client.query(f"SELECT _id, name, total, tags FROM `{TABELA}`").result()
+    return {row["_id"]: (row["name"], row["total"], list(row["tags"])) for row in rows}
+
+
+def test_local_client_enforces_required_columns(clientes):
+    errors = clientes.insert_rows_json(TABELA, [{"_id": "x", "name": None, "total": 1.0},
+                                                {"_id": "y", "name": "ok", "total": 1.0}])
+    assert [error["errors"][0]["reason"] for error in errors] == ["invalid", "stopped"]
+    assert errors[0]["errors"][0]["location"] == "name"
+
+    with pytest.raises(exceptions.BadRequest):
+        clientes.load_table_from_json([{"_id": "z", "total": 1.0}], TABELA).result()
+    assert len(ler(clientes)) == 10
+
+
+@pytest.mark.parametrize("merge_threshold", [1, 1000])
+def test_partial_updates_and_deletes_on_required_columns(clientes, merge_threshold):
+    lote = BatchMutation(TABELA, merge_threshold=merge_threshold)
+    lote.update("1", {"name": "Novo 1"})
+    lote.update("2", {"total": 20.0})
+    lote.update("3", {"tags": ["b", "c"]})
+    lote.delete("4")
+    lote.delete("5")
+    resultado = lote.apply(clientes)
+
+    assert resultado.strategy == ("merge" if merge_threshold == 1 else "chunked")
+    linhas = ler(clientes)
+    assert "4" not in linhas and "5" not in linhas
+    assert linhas["1"] == ("Novo 1", 1.0, ["a"])
+    assert linhas["2"] == ("Cliente 2", 20.0, ["a"])
+    assert linhas["3"] == ("Cliente 3", 3.0, ["b", "c"])
+    assert linhas["6"] == ("Cliente 6", 6.0, ["a"])
+    assert [table.table_id for table in clientes.list_tables("dataset")] == ["clientes"]
+
+
+ENDERECO = bigquery.SchemaField("endereco", "RECORD", fields=[
+    bigquery.SchemaField("rua", "STRING"),
+    bigquery.SchemaField("extra", "JSON"),
+    bigquery.SchemaField("geo", "RECORD", fields=[bigquery.SchemaField("lat", "FLOAT")]),
+])
+ESQUEMA_DML = [
+    bigquery.SchemaField("_id", "STRING"),
+    ENDERECO,
+    bigquery.SchemaField("tags", "STRING", mode="REPEATED"),
+]
+TABELA_DML = "projeto.dataset.cadastros"
+
+
+@pytest.fixture
+def cadastros():
+    client = LocalClient(project="projeto")
+    client.create_table(bigquery.Table(TABELA_DML, schema=ESQUEMA_DML))
+    return client
+
+
+def test_insert_rows_dml_keeps_null_records_null(cadastros):
+    insert_rows_dml(cadastros, TABELA_DML, [
+        {"_id": "1", "endereco": None, "tags": ["a"]},
+        {"_id": "2", "endereco": {"rua": "Rua A", "extra": {"andar": 2}, "geo": None}, "tags": []},
+        {"_id": "3", "endereco": {"rua": "Rua B", "geo": {"lat": -23.5}}},
+    ], ESQUEMA_DML)
+
+    rows = cadastros.query(f"SELECT _id, endereco IS NULL AS sem_endereco, endereco.geo IS NULL AS sem_geo, "
+                           f"endereco.rua AS rua, endereco.geo.lat AS lat FROM `{TABELA_DML}` ORDER BY _id").result()
+    assert [(row["_id"], row["sem_endereco"], row["sem_geo"], row["rua"], row["lat"]) for row in rows] == [
+        ("1", True, True, None, None),
+        ("2", False, True, "Rua A", None),
+        ("3", False, False, "Rua B", -23.5),
+    ]
+
+
+def test_insert_rows_dml_parses_repeated_values_sent_as_json_text(cadastros):
+    insert_rows_dml(cadastros, TABELA_DML, [{"_id": "1", "tags": '["a", "b"]'}, {"_id": "2", "tags": ("c",)}],
+                    ESQUEMA_DML)
+
+    rows = cadastros.query(f"SELECT _id, tags FROM `{TABELA_DML}` ORDER BY _id").result()
+    assert [(row["_id"], list(row["tags"])) for row in rows] == [("1", ["a", "b"]), ("2", ["c"])]
+
+
+@pytest.mark.parametrize("valor", ["a,b", '{"a": 1}', {"a": 1}])
+def test_insert_rows_dml_rejects_repeated_values_that_are_not_lists(cadastros, valor):
+    with pytest.raises(ValueError, match="REPEATED field tags"):
+        insert_rows_dml(cadastros, TABELA_DML, [{"_id": "1", "tags": valor}], ESQUEMA_DML)
+    assert list(cadastros.query(f"SELECT COUNT(*) AS total FROM `{TABELA_DML}`").result())[0]["total"] == 0
+
+
+def test_insert_rows_dml_rebuilds_repeated_records_with_nullable_members():
+    itens = bigquery.SchemaField("itens", "RECORD", mode="REPEATED", fields=[ENDERECO])
+    sql = _value_sql(_plan([itens])[0], "r")
+
+    assert sql.startswith("ARRAY(SELECT AS STRUCT IF(e0._null_endereco, NULL, STRUCT(")
+    assert "PARSE_JSON(e0.endereco.extra) AS extra" in sql
+    assert "IF(e0.endereco._null_geo, NULL, e0.endereco.geo) AS geo" in sql
+    assert sql.endswith("FROM UNNEST(r.itens) AS e0 WITH OFFSET AS o0 ORDER BY o0)")
@@ -0,0 +1,200 @@
+"""Novas tentativas só das linhas com erro temporário, backoff e dead-letter (user-016)"""
+import pytest
+from common import RecordingClient, gerar_pedidos
+
+from google.api_core import exceptions
+
+import BigQueryRetry
+from BigQueryRetry import DeadLetterFile, RetryPolicy, is_retryable_exception, is_retryable_row
+from BigQueryWriter import ChunkedWriter, collect_errors, insert_ids
+
+TABELA = "projeto.dataset.vendas"
+SEM_ESPERA = RetryPolicy(max_attempts=4, initial_delay=0.0)
+
+
+class ScriptedClient(RecordingClient):
+    """insertAll com falhas roteirizadas.
+
+    ``falhas`` mapeia o _id para os motivos de erro das próximas tentativas em
+    que a linha for enviada (None = a linha passa); ``excecoes`` são lançadas,
+    em ordem, no lugar das próximas requisições. Como no insertAll real, se
+    alguma linha falha as demais voltam com "stopped" e nada é gravado.
+    """
+
+    def __init__(self, falhas: dict = None, excecoes: list = None):
+        super().__init__()
+        self.falhas = {chave: list(motivos) for chave, motivos in (falhas or {}).items()}
+        self.excecoes = list(excecoes or [])
+        self.enviados = []
+        self.gravados = {}
+
+    def insert_rows_json(self, table, json_rows, row_ids=None, **kwargs):
+        super().insert_rows_json(table, json_rows, row_ids=row_ids, **kwargs)
+        self.enviados.append([(row["_id"], row_id) for row, row_id in zip(json_rows, row_ids)])
+        if self.excecoes:
+            excecao = self.excecoes.pop(0)
+            if excecao is not None:
+                raise excecao
+        errors = []
+        for index, row in enumerate(json_rows):
+            motivos = self.falhas.get(row["_id"])
+            motivo = motivos.pop(0) if motivos else None
+            if motivo is not None:
+                errors.append({"index": index, "errors": [{"reason": motivo, "message": "roteiro"}]})
+        if errors:
+            failed = {error["index"] for error in errors}
+            errors.extend({"index": index, "errors": [{"reason": "stopped", "message": ""}]}
+                          for index in range(len(json_rows)) if index not in failed)
+            return sorted(errors, key=lambda error: error["index"])
+        for row_id in row_ids:
+            self.gravados[row_id] = self.gravados.get(row_id, 0) + 1
+        return []
+
+
+def test_classification():
+    assert is_retryable_row({"errors": [{"reason": "backendError"}, {"reason": "stopped"}]})
+    assert not is_retryable_row({"errors": [{"reason": "backendError"}, {"reason": "invalid"}]})
+    assert not is_retryable_row({"errors": []})
+    assert is_retryable_exception(exceptions.ServiceUnavailable("503"))
+    assert is_retryable_exception(exceptions.TooManyRequests("429"))
+    assert is_retryable_exception(ConnectionError())
+    assert not is_retryable_exception(exceptions.BadRequest("400"))
+    assert not is_retryable_exception(ValueError())
+
+
+def test_retries_only_failed_rows_with_the_same_insert_ids():
+    pedidos = gerar_pedidos(4)
+    client = ScriptedClient(falhas={"2": ["backendError"]})
+    resultados = ChunkedWriter(client, retry=SEM_ESPERA).write(TABELA, pedidos, row_key="_id")
+
+    ids = insert_ids(pedidos, "_id")
+    assert client.enviados[0] == list(zip(["1", "2", "3", "4"], ids))
+    assert client.enviados[1] == list(zip(["1", "2", "3", "4"], ids))
+    assert len(client.enviados) == 2
+    assert resultados[0].ok
+    assert resultados[0].attempts == 2
+    assert resultados[0].retried_rows == 4
+    assert sorted(client.gravados) == sorted(ids)
+    assert set(client.gravados.values()) == {1}
+
+
+def test_permanent_row_error_is_not_retried_and_goes_to_dead_letter(tmp_path):
+    pedidos = gerar_pedidos(3)
+    client = ScriptedClient(falhas={"2": ["invalid"]})
+    dead_letter = DeadLetterFile(str(tmp_path / "dead_letter.ndjson"))
+    resultados = ChunkedWriter(client, retry=SEM_ESPERA, dead_letter=dead_letter).write(
+        TABELA, pedidos, row_key="_id")
+
+    # Só as linhas "stopped" voltam na segunda tentativa
+    assert [_id for _id, _ in client.enviados[1]] == ["1", "3"]
+    assert resultados[0].attempts == 2
+    assert [error["index"] for error in resultados[0].errors] == [1]
+    assert resultados[0].dead_lettered == 1
+
+    registros = list(dead_letter.read())
+    assert [registro["row"]["_id"] for registro in registros] == ["2"]
+    assert registros[0]["insert_id"] == insert_ids(pedidos, "_id")[1]
+    assert registros[0]["errors"][0]["reason"] == "invalid"
+    assert registros[0]["attempts"] == 2
+    assert registros[0]["table"] == TABELA
+
+
+def test_rows_failing_on_every_attempt_go_to_dead_letter(tmp_path):
+    pedidos = gerar_pedidos(5)
+    client = ScriptedClient(falhas={"4": ["backendError"] * 10})
+    dead_letter = DeadLetterFile(str(tmp_path / "dead_letter.ndjson"))
+    resultados = ChunkedWriter(client, max_rows=2, retry=SEM_ESPERA, dead_letter=dead_letter).write(
+        TABELA, pedidos, row_key="_id")
+
+    assert [resultado.ok for resultado in resultados] == [True, False, True]
+    assert resultados[1].attempts == SEM_ESPERA.max_attempts
+    assert [error["index"] for error in resultados[1].errors] == [2, 3]
+    assert sorted(registro["row"]["_id"] for registro in dead_letter.read()) == ["3", "4"]
+    assert dead_letter.rows == 2
+    assert len(client.gravados) == 3
+    assert [error["index"] for error in collect_errors(resultados)] == [2, 3]
+
+
+def test_retryable_exception_resends_the_whole_chunk():
+    pedidos = gerar_pedidos(3)
+    client = ScriptedClient(excecoes=[exceptions.ServiceUnavailable("503"), exceptions.InternalServerError("500")])
+    resultados = ChunkedWriter(client, retry=SEM_ESPERA).write(TABELA, pedidos, row_key="_id")
+
+    assert resultados[0].ok
+    assert resultados[0].attempts == 3
+    assert len({tuple(enviado) for enviado in client.enviados}) == 1
+    assert len(client.gravados) == 3
+
+
+def test_exception_counts_only_pending_rows(tmp_path):
+    pedidos = gerar_pedidos(4)
+    client = ScriptedClient(falhas={"1": ["invalid"], "2": ["backendError"]},
+                            excecoes=[None, exceptions.BadRequest("400")])
+    dead_letter = DeadLetterFile(str(tmp_path / "dead_letter.ndjson"))
+    resultados = ChunkedWriter(client, retry=SEM_ESPERA, dead_letter=dead_letter).write(
+        TABELA, pedidos, row_key="_id")
+
+    resultado = resultados[0]
+    assert isinstance(resultado.exception, exceptions.BadRequest)
+    assert resultado.lost_rows == 3
+    assert [error["index"] for error in resultado.errors] == [0]
+
+    errors = collect_errors(resultados)
+    assert errors[0]["rows"] == 3
+    assert errors[0]["errors"][0]["reason"] == "exception"
+    assert errors[0]["rows"] + len(errors) - 1 == len(pedidos)
+    assert sorted(registro["row"]["_id"] for registro in dead_letter.read()) == ["1", "2", "3", "4"]
+
+
+def test_without_retry_policy_nothing_is_resent():
+    client = ScriptedClient(falhas={"1": ["backendError"]})
+    resultados = ChunkedWriter(client).write(TABELA, gerar_pedidos(2), row_key="_id")
+
+    assert len(client.enviados) == 1
+    assert resultados[0].attempts == 1
+    assert [error["index"] for error in resultados[0].errors] == [0, 1]
+
+
+def test_backoff_delays_grow_up_to_max_delay(monkeypatch):
+    monkeypatch.setattr(BigQueryRetry.random, "uniform", lambda low, high: high)
+    policy = RetryPolicy(initial_delay=0.5, multiplier=2.0, max_delay=3.0)
+    assert [policy.delay(attempt) for attempt in range(1, 6)] == [0.5, 1.0, 2.0, 3.0, 3.0]
+
+
+def test_backoff_is_jittered_between_zero_and_the_cap():
+    policy = RetryPolicy(initial_delay=1.0, multiplier=2.0, max_delay=10.0)
+    for attempt in range(1, 8):
+        assert all(0 <= policy.delay(attempt) <= min(10.0, 2 ** (attempt - 1)) for _ in range(50))
+
+
+def test_writer_waits_between_attempts(monkeypatch):
+    esperas = []
+    monkeypatch.setattr(BigQueryRetry.time, "sleep", esperas.append)
+    monkeypatch.setattr(BigQueryRetry.random, "uniform", lambda low, high: high)
+    client = ScriptedClient(falhas={"1": ["rateLimitExceeded"] * 3})
+    policy = RetryPolicy(max_attempts=5, initial_delay=0.25, multiplier=2.0, max_delay=1.0)
+    resultados = ChunkedWriter(client, retry=policy).write(TABELA, gerar_pedidos(1), row_key="_id")
+
+    assert resultados[0].ok
+    assert esperas == [0.25, 0.5, 1.0]
+
+
+def test_wait_never_passes_the_deadline(monkeypatch):
+    esperas = []
+    monkeypatch.setattr(BigQueryRetry.time, "sleep", esperas.append)
+    monkeypatch.setattr(BigQueryRetry.time, "monotonic", lambda: 100.0)
+    policy = RetryPolicy(initial_delay=30.0, max_delay=30.0, deadline=10.0)
+    monkeypatch.setattr(BigQueryRetry.random, "uniform", lambda low, high: high)
+
+    policy.wait(1, started=95.0)
+    assert esperas == [5.0]
+    assert policy.allows(1, started=95.0)
+    assert not policy.allows(1, started=89.0)
+    assert not policy.allows(policy.max_attempts, started=100.0)
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        RetryPolicy(max_attempts=0)
+    with pytest.raises(ValueError):
+        RetryPolicy(multiplier=0.5)
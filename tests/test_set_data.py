@@ -0,0 +1,75 @@
+"""insertIds estáveis em BigQuery.set_data para tabelas sem _id (user-015)"""
+import logging
+
+import pytest
+from google.cloud import bigquery
+
+from BigQueryClasse import BigQuery, LOGIN_LOGS_TABLE, LOGS_DATASET, USERS_TABLE
+from BigQueryLocal import LocalClient, LocalPool
+
+LOGIN = [{"email": f"usuario{i}@exemplo.com", "evento": "login", "created_at": f"2025-06-0{i + 1}T10:00:00Z"}
+         for i in range(3)]
+
+
+@pytest.fixture
+def client():
+    client = LocalClient(project="projeto")
+    client.create_table(bigquery.Table(f"projeto.{LOGS_DATASET}.{LOGIN_LOGS_TABLE}", schema=[
+        bigquery.SchemaField("email", "STRING"),
+        bigquery.SchemaField("evento", "STRING"),
+        bigquery.SchemaField("created_at", "TIMESTAMP"),
+    ]))
+    client.create_table(bigquery.Table(f"projeto.{LOGS_DATASET}.{USERS_TABLE}", schema=[
+        bigquery.SchemaField("_id", "STRING"),
+        bigquery.SchemaField("nome", "STRING"),
+    ]))
+    return client
+
+
+def contar(client, table_id: str) -> int:
+    return list(client.query(f"SELECT COUNT(*) AS total FROM `{LOGS_DATASET}.{table_id}`").result())[0]["total"]
+
+
+def bigquery_local(client, **kwargs) -> BigQuery:
+    bigquery_client = BigQuery(pool=LocalPool(client), **kwargs)
+    bigquery_client.initialize()
+    return bigquery_client
+
+
+def test_resent_login_logs_are_deduplicated_by_content(client, caplog):
+    bigquery_client = bigquery_local(client)
+    with caplog.at_level(logging.WARNING):
+        bigquery_client.saveLoginLogsInBigQuery(LOGIN)
+        bigquery_client.saveLoginLogsInBigQuery([dict(log) for log in LOGIN])
+
+    assert contar(client, LOGIN_LOGS_TABLE) == len(LOGIN)
+    assert "sem a chave" not in caplog.text
+
+
+def test_rows_without_the_key_fall_back_to_content_with_a_warning(client, caplog):
+    bigquery_client = bigquery_local(client)
+    table = bigquery_client.get_table(LOGS_DATASET, USERS_TABLE)
+    usuarios = [{"_id": "1", "nome": "Ana"}, {"nome": "Sem id"}]
+
+    with caplog.at_level(logging.WARNING):
+        for _ in range(2):
+            assert all(result.ok for result in bigquery_client.set_data(table, usuarios, row_key="_id"))
+
+    assert contar(client, USERS_TABLE) == 2
+    assert "1 linha(s) de GASMONITOR_LOGS_USUARIOS sem a chave '_id'" in caplog.text
+
+
+def test_configured_row_keys_override_the_defaults(client):
+    bigquery_client = bigquery_local(client, row_keys={LOGIN_LOGS_TABLE: "email"})
+    bigquery_client.saveLoginLogsInBigQuery(LOGIN)
+    bigquery_client.saveLoginLogsInBigQuery([dict(log, evento="logout") for log in LOGIN])
+
+    assert contar(client, LOGIN_LOGS_TABLE) == len(LOGIN)
+
+
+def test_without_row_key_every_send_is_a_new_row(client):
+    bigquery_client = bigquery_local(client, row_keys={LOGIN_LOGS_TABLE: None})
+    bigquery_client.saveLoginLogsInBigQuery(LOGIN)
+    bigquery_client.saveLoginLogsInBigQuery(LOGIN)
+
+    assert contar(client, LOGIN_LOGS_TABLE) == 2 * len(LOGIN)
@@ -0,0 +1,109 @@
+"""Resumos incrementais: pedidos distintos e ticket médio iguais aos das consultas originais (user-025)"""
+import pandas as pd
+import pytest
+
+from BigQueryLocal import LocalClient
+from BigQuerySummaries import dashboard_queries, provision_summaries, refresh_summaries
+from BigQueryTables import SALES_LAYOUT, provision_table
+
+TABELA = "projeto.dataset.vendas"
+COXINHA = ("Coxinha", "CX-001", 6.0)
+GUARANA = ("Guaraná 1L", "GUA-1L", 6.5)
+
+
+def pedido(_id: str, cliente: str, quando: str, *itens) -> dict:
+    return {"_id": _id, "name": cliente, "created_at": quando,
+            "products": [{"name": nome, "sku": sku, "price": preco, "quantity": quantidade}
+                         for (nome, sku, preco), quantidade in itens]}
+
+
+# O mesmo pedido gravado mais de uma vez (repetido, ou em outra hora do mesmo dia) e
+# dias recalculados por mais de uma atualização
+LOTES = [
+    [
+        pedido("A", "Ana", "2025-06-01T10:00:00Z", (COXINHA, 2)),
+        pedido("A", "Ana", "2025-06-01T10:00:00Z", (COXINHA, 2)),
+        pedido("B", "Bruno", "2025-06-02T09:00:00Z", (GUARANA, 1), (COXINHA, 1)),
+        pedido("C", "Ana", "2025-06-02T11:00:00Z"),
+    ],
+    [
+        pedido("B", "Bruno", "2025-06-02T15:00:00Z", (GUARANA, 1), (COXINHA, 1)),
+        pedido("E", "Carla", "2025-06-02T20:00:00Z", (COXINHA, 3)),
+        pedido("D", "Bruno", "2025-06-03T08:00:00Z", (COXINHA, 1)),
+    ],
+    [
+        pedido("D", "Bruno", "2025-06-03T09:00:00Z", (COXINHA, 1)),
+    ],
+]
+
+
+@pytest.fixture
+def client():
+    client = LocalClient(project="projeto")
+    provision_table(client, TABELA, SALES_LAYOUT)
+    provision_summaries(client, TABELA)
+    return client
+
+
+def consultar(client) -> dict:
+    return {nome: client.query(sql).result().to_dataframe() for nome, sql in dashboard_queries(TABELA).items()}
+
+
+def atualizar_em_lotes(client) -> list:
+    resultados = []
+    for lote in LOTES:
+        assert client.insert_rows_json(TABELA, lote) == []
+        resultados.append(refresh_summaries(client, TABELA, lookback_days=0))
+    return resultados
+
+
+def test_incremental_refreshes_do_not_double_count_orders(client):
+    resultados = atualizar_em_lotes(client)
+    assert [str(resultado.start.date()) if resultado.start else None for resultado in resultados] == \
+        [None, "2025-06-02", "2025-06-03"]
+    frames = consultar(client)
+
+    # QUERY 2: COUNT(DISTINCT _id) por dia, com o dia 01 fora das duas últimas atualizações
+    diario = frames["QUERY 2"]
+    assert [str(data) for data in diario["data"]] == ["2025-06-01", "2025-06-02", "2025-06-03"]
+    assert list(diario["num_pedidos"]) == [1, 3, 1]
+    assert list(diario["total_itens"]) == [2, 5, 2]
+    assert list(diario["receita_dia"]) == [24.0, 43.0, 12.0]
+
+    # QUERY 1: COUNT(_id) conta linhas; o ticket é o AVG do valor dos pedidos com produtos
+    geral = frames["QUERY 1"].iloc[0]
+    assert geral["total_pedidos"] == 8
+    assert geral["clientes_unicos"] == 3
+    assert geral["total_itens_vendidos"] == 9
+    assert geral["receita_total"] == 79.0
+    assert geral["ticket_medio"] == round(79.0 / 7, 2)
+
+    # QUERY 3 e 8: pedidos distintos por produto e por cliente/produto
+    produtos = frames["QUERY 3"].set_index("produto")
+    assert produtos.loc["Coxinha", "total_vendido"] == 11
+    assert produtos.loc["Coxinha", "num_pedidos"] == 4
+    assert produtos.loc["Guaraná 1L", "num_pedidos"] == 1
+    por_cliente = {(linha.cliente, linha.produto): linha.vezes_comprou for linha in frames["QUERY 8"].itertuples()}
+    assert por_cliente == {("Ana", "Coxinha"): 1, ("Bruno", "Coxinha"): 2, ("Bruno", "Guaraná 1L"): 1,
+                           ("Carla", "Coxinha"): 1}
+
+    # QUERY 10: ticket por hora; a hora 11 só tem o pedido sem produtos
+    por_hora = frames["QUERY 10"].set_index("hora")
+    assert list(por_hora.loc[9, ["num_pedidos", "ticket_medio_hora"]]) == [2, 9.25]
+    assert por_hora.loc[11, "num_pedidos"] == 1
+    assert pd.isna(por_hora.loc[11, "ticket_medio_hora"])
+
+
+def test_incremental_result_matches_a_full_refresh(client):
+    atualizar_em_lotes(client)
+    incremental = consultar(client)
+    refresh_summaries(client, TABELA, full=True)
+    completo = consultar(client)
+
+    for nome, frame in completo.items():
+        if nome == "QUERY 6":
+            continue
+        colunas = list(frame.columns)
+        esperado = frame.sort_values(colunas).reset_index(drop=True)
+        obtido = incremental[nome].sort_values(colunas).reset_index(drop=True)
+        assert obtido.equals(esperado), nome
@@ -0,0 +1,114 @@
+"""ChunkedWriter: divisão em lotes por bytes/linhas e insertIds estáveis (user-001)"""
+import pytest
+from common import RecordingClient, gerar_pedidos
+
+from BigQueryLocal import LocalClient
+from BigQueryTables import SALES_LAYOUT, provision_table
+from BigQueryWriter import ChunkedWriter, encoded_size, insert_id, insert_ids
+
+TABELA = "projeto.dataset.vendas"
+
+
+class IdClient(RecordingClient):
+    """Guarda os insertIds de cada requisição"""
+
+    def __init__(self):
+        super().__init__()
+        self.row_ids = []
+
+    def insert_rows_json(self, table, json_rows, row_ids=None, **kwargs):
+        self.row_ids.append(list(row_ids) if row_ids is not None else None)
+        return super().insert_rows_json(table, json_rows, row_ids=row_ids, **kwargs)
+
+
+def test_split_by_rows():
+    writer = ChunkedWriter(RecordingClient(), max_rows=3)
+    chunks = writer.split(gerar_pedidos(10))
+    assert [(start, end) for start, end, _ in chunks] == [(0, 3), (3, 6), (6, 9), (9, 10)]
+
+
+def test_split_by_bytes():
+    pedidos = gerar_pedidos(50)
+    limite = max(encoded_size(pedido) for pedido in pedidos) * 3
+    chunks = ChunkedWriter(RecordingClient(), max_bytes=limite, max_rows=1000).split(pedidos)
+
+    assert len(chunks) > 1
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(pedidos)
+    assert all(anterior[1] == seguinte[0] for anterior, seguinte in zip(chunks, chunks[1:]))
+    for start, end, size in chunks:
+        assert size == sum(encoded_size(pedido) for pedido in pedidos[start:end])
+        assert size <= limite
+
+
+def test_split_keeps_oversized_row_alone():
+    pedidos = [{"_id": "1", "texto": "x" * 1000}, {"_id": "2"}, {"_id": "3"}]
+    chunks = ChunkedWriter(RecordingClient(), max_bytes=200).split(pedidos)
+    assert [(start, end) for start, end, _ in chunks] == [(0, 1), (1, 3)]
+
+
+def test_split_empty():
+    assert ChunkedWriter(RecordingClient()).split([]) == []
+
+
+def test_invalid_limits():
+    with pytest.raises(ValueError):
+        ChunkedWriter(RecordingClient(), max_rows=0)
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_write_returns_one_result_per_chunk_in_order(max_workers):
+    client = RecordingClient()
+    pedidos = gerar_pedidos(23)
+    resultados = ChunkedWriter(client, max_rows=5, max_workers=max_workers).write(TABELA, pedidos)
+
+    assert [resultado.index for resultado in resultados] == [0, 1, 2, 3, 4]
+    assert [resultado.start for resultado in resultados] == [0, 5, 10, 15, 20]
+    assert [resultado.rows for resultado in resultados] == [5, 5, 5, 5, 3]
+    assert all(resultado.ok and resultado.attempts == 1 for resultado in resultados)
+    assert sorted(call["rows"] for call in client.calls) == [3, 5, 5, 5, 5]
+
+
+def test_insert_id_is_deterministic():
+    pedido = {"_id": "42", "name": "Ana"}
+    assert insert_id(pedido, "_id") == insert_id(dict(pedido), "_id")
+    assert insert_id(pedido, "_id") != insert_id({"_id": "43"}, "_id")
+    assert len(insert_id(pedido, "_id")) == 32
+    assert insert_id(pedido, ("_id", "name")) == insert_id({"name": "Ana", "_id": "42"}, ("_id", "name"))
+    assert insert_id(pedido, lambda row: row["name"]) == insert_id({"name": "Ana"}, "name")
+    assert insert_id({"name": "Ana"}, "_id") is None
+    assert insert_id({"name": "Ana"}, ("_id", "name")) is None
+
+
+def test_insert_ids_fall_back_to_uuid():
+    primeira = insert_ids([{"_id": "1"}, {"name": "sem chave"}], "_id")
+    segunda = insert_ids([{"_id": "1"}, {"name": "sem chave"}], "_id")
+    assert primeira[0] == segunda[0]
+    assert primeira[1] != segunda[1]
+
+
+def test_write_sends_row_key_ids_regardless_of_chunking():
+    pedidos = gerar_pedidos(12)
+    esperado = insert_ids(pedidos, "_id")
+
+    for max_rows in (12, 5, 1):
+        client = IdClient()
+        ChunkedWriter(client, max_rows=max_rows, max_workers=1).write(TABELA, pedidos, row_key="_id")
+        assert [row_id for ids in client.row_ids for row_id in ids] == esperado
+
+
+def test_write_rejects_row_ids_of_other_length():
+    with pytest.raises(ValueError):
+        ChunkedWriter(RecordingClient()).write(TABELA, gerar_pedidos(3), row_ids=["a"])
+
+
+def test_resent_payload_is_deduplicated_by_insert_id():
+    client = LocalClient(project="projeto")
+    provision_table(client, TABELA, SALES_LAYOUT)
+    pedidos = gerar_pedidos(30)
+    writer = ChunkedWriter(client, max_rows=7)
+
+    assert all(resultado.ok for resultado in writer.write(TABELA, pedidos, row_key="_id"))
+    assert all(resultado.ok for resultado in writer.write(TABELA, pedidos, row_key="_id"))
+
+    total = list(client.query(f"SELECT COUNT(*) AS total FROM `{TABELA}`").result())[0]["total"]
+    assert total == len(pedidos)